@@ -3,7 +3,7 @@
 Adaptive Strategy Router (AI Registry integration)
 
 This router enhances the base signal generated by TradingEngine using:
-- AI inference from Model Registry (active XGB/LGBM, optional)
+- AI inference from Model Registry (active XGB/LGBM/LSTM, optional)
 - A safe adjustment logic that never breaks when models are missing
 """
 
@@ -52,10 +52,12 @@ class AdaptiveStrategyRouter:
         base_score = float(base_signal.get("score") or 0.0)
         action = str(base_signal.get("action") or "NEUTRAL")
 
-        # Pull db from context (TradingEngine passes it)
+        # Pull db / recent closes from context (TradingEngine passes them)
         db = None
+        closes = None
         if isinstance(context, dict):
             db = context.get("db")
+            closes = context.get("closes")
 
         # AI registry inference (returns None if no db or no active models)
         reg_pred = await predict_from_registry(
@@ -63,6 +65,7 @@ class AdaptiveStrategyRouter:
             symbol=symbol,
             timeframe=str(timeframe or "M15"),
             feature_vector=features,
+            closes=closes,
         )
 
         # Default AI result (safe)
@@ -1,18 +1,38 @@
 """
 AI System for Revolution X Trading Platform
 LSTM + XGBoost + LightGBM Ensemble
+
+Exports are resolved lazily (PEP 562) so importing ``app.ai`` or any of its
+submodules does not pull in TensorFlow / XGBoost / LightGBM.
 """
 
-from .lstm_model import LSTMModel
-from .xgboost_model import XGBoostModel
-from .lightgbm_model import LightGBMModel
-from .ensemble import EnsembleFusion
-from .scanner import SmartOpportunityScanner
+import importlib
+
+_LAZY_EXPORTS = {
+    'LSTMModel': '.lstm_model',
+    'XGBoostModel': '.xgboost_model',
+    'LightGBMModel': '.lightgbm_model',
+    'EnsembleFusion': '.ensemble',
+    'SmartOpportunityScanner': '.scanner',
+}
 
 __all__ = [
     'LSTMModel',
-    'XGBoostModel', 
+    'XGBoostModel',
     'LightGBMModel',
     'EnsembleFusion',
     'SmartOpportunityScanner'
 ]
+
+
+def __getattr__(name):
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals().keys()) + __all__)
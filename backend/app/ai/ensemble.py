@@ -33,6 +33,47 @@ class EnsemblePrediction:
     recommended_action: str
     risk_level: str
 
+# Integer codes used by the array API (EnsembleFusion.fuse_batch)
+SIGNAL_NAMES = {-1: "sell", 0: "hold", 1: "buy"}
+STRENGTH_CODES = {
+    2: SignalStrength.STRONG_BUY,
+    1: SignalStrength.BUY,
+    0: SignalStrength.NEUTRAL,
+    -1: SignalStrength.SELL,
+    -2: SignalStrength.STRONG_SELL
+}
+RISK_NAMES = {0: "low", 1: "medium", 2: "high"}
+
+ACTION_MAP = {
+    SignalStrength.STRONG_BUY: "Enter Long Position Immediately",
+    SignalStrength.BUY: "Consider Long Position",
+    SignalStrength.NEUTRAL: "Wait for Clearer Signal",
+    SignalStrength.SELL: "Consider Short Position",
+    SignalStrength.STRONG_SELL: "Enter Short Position Immediately"
+}
+
+@dataclass
+class EnsembleBatch:
+    """Fused result for N rows; every field is a length-N array"""
+    vote_score: np.ndarray   # weighted vote in [-1, 1]
+    signal: np.ndarray       # -1 sell / 0 hold / 1 buy
+    strength: np.ndarray     # -2..2, see STRENGTH_CODES
+    consensus: np.ndarray    # share of models agreeing with the majority
+    confidence: np.ndarray
+    risk: np.ndarray         # 0 low / 1 medium / 2 high, see RISK_NAMES
+    
+    def __len__(self) -> int:
+        return len(self.signal)
+    
+    def signal_name(self, i: int) -> str:
+        return SIGNAL_NAMES[int(self.signal[i])]
+    
+    def strength_enum(self, i: int) -> SignalStrength:
+        return STRENGTH_CODES[int(self.strength[i])]
+    
+    def risk_name(self, i: int) -> str:
+        return RISK_NAMES[int(self.risk[i])]
+
 class EnsembleFusion:
     """
     Fusion engine that combines predictions from multiple AI models
@@ -46,15 +87,47 @@ class EnsembleFusion:
         self.xgboost_weight = xgboost_weight
         self.lightgbm_weight = lightgbm_weight
         
-        self.lstm = LSTMModel()
-        self.xgboost = XGBoostModel()
-        self.lightgbm = LightGBMModel()
+        # Member models are created on first use (see properties below)
+        self._lstm: Optional[LSTMModel] = None
+        self._xgboost: Optional[XGBoostModel] = None
+        self._lightgbm: Optional[LightGBMModel] = None
         
         # Voting thresholds
         self.strong_threshold = 0.75
         self.moderate_threshold = 0.55
         self.min_consensus = 0.6
     
+    @property
+    def lstm(self) -> LSTMModel:
+        if self._lstm is None:
+            self._lstm = LSTMModel()
+        return self._lstm
+    
+    @property
+    def xgboost(self) -> XGBoostModel:
+        if self._xgboost is None:
+            self._xgboost = XGBoostModel()
+        return self._xgboost
+    
+    @property
+    def lightgbm(self) -> LightGBMModel:
+        if self._lightgbm is None:
+            self._lightgbm = LightGBMModel()
+        return self._lightgbm
+    
+    def warm_up(self) -> Dict[str, bool]:
+        """
+        Import ML backends and build member models ahead of the first request.
+        Blocking - run it in a worker thread (e.g. asyncio.to_thread) from startup.
+        """
+        ready = {
+            'lstm': self.lstm.model is not None,
+            'xgboost': self.xgboost.model is not None,
+            'lightgbm': self.lightgbm.model is not None
+        }
+        logger.info(f"Ensemble warm-up finished: {ready}")
+        return ready
+    
     def normalize_signal(self, signal: str) -> int:
         """Convert signal to numeric"""
         mapping = {
@@ -82,87 +155,96 @@ class EnsembleFusion:
         
         return most_common / len(predictions)
     
-    def fuse_predictions(self,
-                        lstm_pred: LSTMPrediction,
-                        xgb_pred: XGBoostPrediction,
-                        lgb_pred: LightGBMPrediction) -> EnsemblePrediction:
-        """Combine all predictions using weighted voting"""
+    @property
+    def weights(self) -> np.ndarray:
+        """Model weights in (lstm, xgboost, lightgbm) column order"""
+        return np.array([self.lstm_weight, self.xgboost_weight, self.lightgbm_weight], dtype=float)
+    
+    def fuse_batch(self,
+                   signals: np.ndarray,
+                   scores: np.ndarray,
+                   weights: Optional[np.ndarray] = None) -> EnsembleBatch:
+        """
+        Vectorized weighted vote for N rows x M models.
         
-        # Normalize all to buy/sell/hold
-        signals = {
-            'lstm': lstm_pred.direction,
-            'xgboost': xgb_pred.signal,
-            'lightgbm': lgb_pred.signal
-        }
+        signals: (N, M) in {-1, 0, 1}; scores: (N, M) per-model confidence
+        or probability; weights: (M,), defaults to the ensemble weights.
+        Same rules as fuse_predictions, applied to every row at once.
+        """
+        sig = np.asarray(signals, dtype=np.int8)
+        conf = np.asarray(scores, dtype=float)
+        if sig.ndim != 2 or sig.shape != conf.shape:
+            raise ValueError(f"signals and scores must be matching (N, M) arrays, got {sig.shape} and {conf.shape}")
+        w = self.weights if weights is None else np.asarray(weights, dtype=float)
         
-        # Weighted vote
-        vote_score = 0
-        total_confidence = 0
-        
-        # LSTM contribution
-        lstm_signal = self.normalize_signal(signals['lstm'])
-        vote_score += lstm_signal * self.lstm_weight * lstm_pred.confidence
-        total_confidence += lstm_pred.confidence * self.lstm_weight
-        
-        # XGBoost contribution
-        xgb_signal = self.normalize_signal(signals['xgboost'])
-        vote_score += xgb_signal * self.xgboost_weight * xgb_pred.probability
-        total_confidence += xgb_pred.probability * self.xgboost_weight
-        
-        # LightGBM contribution
-        lgb_signal = self.normalize_signal(signals['lightgbm'])
-        vote_score += lgb_signal * self.lightgbm_weight * lgb_pred.probability
-        total_confidence += lgb_pred.probability * self.lightgbm_weight
-        
-        # Normalize
-        if total_confidence > 0:
-            vote_score /= total_confidence
-        
-        # Determine final signal
-        if vote_score > 0.3:
-            final_signal = "buy"
-        elif vote_score < -0.3:
-            final_signal = "sell"
-        else:
-            final_signal = "hold"
+        # Weighted vote, normalized by total weighted confidence
+        wc = conf * w
+        total = wc.sum(axis=1)
+        vote = (sig * wc).sum(axis=1)
+        vote = np.divide(vote, total, out=vote, where=total > 0)
         
-        # Calculate consensus
-        consensus = self.calculate_consensus(list(signals.values()))
+        final = np.where(vote > 0.3, 1, np.where(vote < -0.3, -1, 0)).astype(np.int8)
         
-        # Determine strength
-        abs_score = abs(vote_score)
-        if abs_score > 0.7 and consensus > 0.8:
-            strength = SignalStrength.STRONG_BUY if vote_score > 0 else SignalStrength.STRONG_SELL
-        elif abs_score > 0.5 and consensus > 0.6:
-            strength = SignalStrength.BUY if vote_score > 0 else SignalStrength.SELL
+        # Consensus: share of the most common signal
+        n_models = sig.shape[1]
+        if n_models < 2:
+            consensus = np.ones(len(sig))
         else:
-            strength = SignalStrength.NEUTRAL
+            counts = np.stack([(sig == v).sum(axis=1) for v in (-1, 0, 1)], axis=1)
+            consensus = counts.max(axis=1) / n_models
+        
+        # Strength
+        abs_score = np.abs(vote)
+        direction = np.where(vote > 0, 1, -1)
+        strength = np.where(
+            (abs_score > 0.7) & (consensus > 0.8), 2 * direction,
+            np.where((abs_score > 0.5) & (consensus > 0.6), direction, 0)
+        ).astype(np.int8)
         
-        # Overall confidence
         confidence = (abs_score + consensus) / 2
+        risk = np.where(consensus < 0.6, 2, np.where(confidence < 0.6, 1, 0)).astype(np.int8)
         
-        # Recommended action
-        action_map = {
-            SignalStrength.STRONG_BUY: "Enter Long Position Immediately",
-            SignalStrength.BUY: "Consider Long Position",
-            SignalStrength.NEUTRAL: "Wait for Clearer Signal",
-            SignalStrength.SELL: "Consider Short Position",
-            SignalStrength.STRONG_SELL: "Enter Short Position Immediately"
-        }
+        return EnsembleBatch(
+            vote_score=vote,
+            signal=final,
+            strength=strength,
+            consensus=consensus,
+            confidence=confidence,
+            risk=risk
+        )
+    
+    def fuse_proba_batch(self,
+                         probas: List[np.ndarray],
+                         weights: Optional[np.ndarray] = None) -> EnsembleBatch:
+        """
+        Fuse per-model (N, 3) class-probability matrices (sell, hold, buy columns).
+        Each model votes its argmax class with the winning probability as score.
+        """
+        p = np.stack([np.asarray(m, dtype=float) for m in probas], axis=1)  # (N, M, 3)
+        if p.ndim != 3 or p.shape[2] != 3:
+            raise ValueError(f"expected (N, 3) probability matrices, got {p.shape}")
+        signals = p.argmax(axis=2) - 1
+        scores = p.max(axis=2)
+        return self.fuse_batch(signals, scores, weights)
+    
+    def fuse_predictions(self,
+                        lstm_pred: LSTMPrediction,
+                        xgb_pred: XGBoostPrediction,
+                        lgb_pred: LightGBMPrediction) -> EnsemblePrediction:
+        """Combine all predictions using weighted voting (single-row fuse_batch)"""
         
-        # Risk assessment
-        if consensus < 0.6:
-            risk = "high"
-        elif confidence < 0.6:
-            risk = "medium"
-        else:
-            risk = "low"
+        signals = [lstm_pred.direction, xgb_pred.signal, lgb_pred.signal]
+        fused = self.fuse_batch(
+            np.array([[self.normalize_signal(x) for x in signals]]),
+            np.array([[lstm_pred.confidence, xgb_pred.probability, lgb_pred.probability]])
+        )
+        strength = fused.strength_enum(0)
         
         return EnsemblePrediction(
-            final_signal=final_signal,
+            final_signal=fused.signal_name(0),
             signal_strength=strength,
-            confidence=round(confidence, 3),
-            consensus_score=round(consensus, 3),
+            confidence=round(float(fused.confidence[0]), 3),
+            consensus_score=round(float(fused.consensus[0]), 3),
             individual_predictions={
                 'lstm': {
                     'signal': lstm_pred.direction,
@@ -181,8 +263,8 @@ class EnsembleFusion:
                     'agreement': lgb_pred.agreement_with_xgboost
                 }
             },
-            recommended_action=action_map[strength],
-            risk_level=risk
+            recommended_action=ACTION_MAP[strength],
+            risk_level=fused.risk_name(0)
         )
     
     def get_trade_recommendation(self, 
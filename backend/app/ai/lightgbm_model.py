@@ -30,13 +30,25 @@ class LightGBMModel:
         self.n_estimators = n_estimators
         self.num_leaves = num_leaves
         self.learning_rate = learning_rate
-        self.model = None
+        self._model = None
+        self._model_initialized = False
         self.is_trained = False
-        
-        self._init_model()
+    
+    @property
+    def model(self):
+        """LightGBM estimator, created on first access (keeps the import off startup)"""
+        if self._model is None and not self._model_initialized:
+            self._init_model()
+        return self._model
+    
+    @model.setter
+    def model(self, value):
+        self._model = value
+        self._model_initialized = True
     
     def _init_model(self):
         """Initialize LightGBM"""
+        self._model_initialized = True
         try:
             import lightgbm as lgb
             self.model = lgb.LGBMClassifier(
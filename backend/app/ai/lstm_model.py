@@ -9,6 +9,8 @@ from typing import Dict, List, Tuple, Optional
 import logging
 from dataclasses import dataclass
 
+from .training.dataset import sliding_windows
+
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -30,14 +32,26 @@ class LSTMModel:
         self.sequence_length = sequence_length
         self.n_features = n_features
         self.model_path = model_path
-        self.model = None
+        self._model = None
+        self._model_built = False
         self.scaler = None
         self.is_trained = False
-        
-        self._build_model()
+    
+    @property
+    def model(self):
+        """Keras model, built on first access (keeps TensorFlow out of import/startup)"""
+        if self._model is None and not self._model_built:
+            self._build_model()
+        return self._model
+    
+    @model.setter
+    def model(self, value):
+        self._model = value
+        self._model_built = True
     
     def _build_model(self):
         """Build LSTM architecture"""
+        self._model_built = True
         try:
             import tensorflow as tf
             from tensorflow.keras.models import Sequential
@@ -119,22 +133,21 @@ class LSTMModel:
         return features.values
     
     def create_sequences(self, data: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
-        """Create sequences for LSTM training"""
-        X, y = [], []
+        """Create sequences for LSTM training (strided view, no per-window copies)"""
+        n = len(data) - self.sequence_length
+        if n <= 0:
+            return np.empty((0, self.sequence_length, data.shape[1])), np.empty((0, 3), dtype=int)
         
-        for i in range(len(data) - self.sequence_length):
-            X.append(data[i:(i + self.sequence_length)])
-            
-            # Label based on future returns
-            future_return = data[i + self.sequence_length][0]  # returns column
-            if future_return > 0.001:
-                y.append([1, 0, 0])  # up
-            elif future_return < -0.001:
-                y.append([0, 1, 0])  # down
-            else:
-                y.append([0, 0, 1])  # neutral
-        
-        return np.array(X), np.array(y)
+        X = sliding_windows(data, self.sequence_length)[:n]
+        
+        # Label based on future returns: up, down, neutral
+        future_return = data[self.sequence_length:, 0]  # returns column
+        idx = np.full(n, 2)
+        idx[future_return > 0.001] = 0
+        idx[future_return < -0.001] = 1
+        y = np.eye(3, dtype=int)[idx]
+        
+        return X, y
     
     def train(self, df: pd.DataFrame, epochs: int = 50, batch_size: int = 32):
         """Train LSTM model"""
@@ -177,7 +190,8 @@ class LSTMModel:
         features = self.prepare_features(df)
         last_sequence = features[-self.sequence_length:].reshape(1, self.sequence_length, -1)
         
-        prediction = self.model.predict(last_sequence, verbose=0)[0]
+        # direct call skips Keras predict() per-call setup (data adapter, callbacks)
+        prediction = self.model(last_sequence.astype(np.float32), training=False).numpy()[0]
         
         directions = ['up', 'down', 'neutral']
         direction_idx = np.argmax(prediction)
@@ -0,0 +1,189 @@
+# backend/app/ai/registry/lstm_service.py
+"""
+Batched LSTM inference for registry artifacts.
+
+- loads each registered `.keras` artifact once (per artifact_path + version)
+- wraps the model in a traced tf.function with a fixed input signature
+  (batch dim left open, so it is traced exactly once)
+- micro-batches concurrent requests into a single forward pass
+
+TensorFlow is imported only when the first LSTM artifact is loaded.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WINDOW = 64
+
+
+def returns_window(closes: Sequence[float], window: int) -> Optional[np.ndarray]:
+    """
+    Build the (window, 1) float32 input used by train_lstm: simple returns of the
+    last `window` bars. Returns None when there is not enough history.
+    """
+    c = np.asarray(closes, dtype=np.float64)
+    if c.ndim != 1 or len(c) < window + 1:
+        return None
+    tail = c[-(window + 1):]
+    prev = tail[:-1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ret = np.where(prev != 0, tail[1:] / prev - 1.0, 0.0)
+    ret = np.nan_to_num(ret, nan=0.0, posinf=0.0, neginf=0.0)
+    return ret.astype(np.float32)[:, None]
+
+
+class CompiledLSTM:
+    """A loaded Keras model behind a traced, fixed-signature forward function."""
+
+    def __init__(self, artifact_path: str):
+        import tensorflow as tf
+
+        model = tf.keras.models.load_model(artifact_path, compile=False)
+        _, window, n_features = model.input_shape
+        self.window = int(window)
+        self.n_features = int(n_features)
+
+        spec = tf.TensorSpec(shape=(None, self.window, self.n_features), dtype=tf.float32)
+        self._forward = tf.function(lambda x: model(x, training=False), input_signature=[spec])
+        # trace now so the first request does not pay for it
+        self._forward.get_concrete_function()
+
+    def __call__(self, batch: np.ndarray) -> np.ndarray:
+        return self._forward(np.asarray(batch, dtype=np.float32)).numpy()
+
+
+class MicroBatcher:
+    """
+    Collects concurrent submits and runs them as one batch once `max_batch`
+    requests are queued or `max_wait_ms` has passed since the first one.
+    The forward pass runs in a worker thread so the event loop stays free.
+    """
+
+    def __init__(self, runner: Any, max_batch: int = 64, max_wait_ms: float = 2.0):
+        self.runner = runner
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait_s = max(0.0, float(max_wait_ms)) / 1000.0
+        self._pending: List[Tuple[np.ndarray, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.batches_run = 0
+        self.rows_run = 0
+
+    async def submit(self, x: np.ndarray) -> np.ndarray:
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self._pending.append((x, fut))
+
+        if len(self._pending) >= self.max_batch:
+            loop.create_task(self._run(self._take()))
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait_s, self._on_timer, loop)
+
+        return await fut
+
+    def _take(self) -> List[Tuple[np.ndarray, asyncio.Future]]:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        return batch
+
+    def _on_timer(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._timer = None
+        loop.create_task(self._run(self._take()))
+
+    async def _run(self, batch: List[Tuple[np.ndarray, asyncio.Future]]) -> None:
+        if not batch:
+            return
+        try:
+            x = np.stack([item[0] for item in batch])
+            out = await asyncio.to_thread(self.runner, x)
+        except Exception as e:
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+
+        self.batches_run += 1
+        self.rows_run += len(batch)
+        for (_, fut), row in zip(batch, out):
+            if not fut.done():
+                fut.set_result(row)
+
+
+class LSTMInferenceService:
+    def __init__(self, max_batch: int = 64, max_wait_ms: float = 2.0, retry_seconds: float = 60.0):
+        self.max_batch = max_batch
+        self.max_wait_ms = max_wait_ms
+        # a failed load is retried after this long, or at once when the artifact file changes
+        self.retry_seconds = retry_seconds
+        self._batchers: Dict[str, MicroBatcher] = {}
+        # key -> (artifact mtime, monotonic retry time, error)
+        self._failed: Dict[str, Tuple[float, float, str]] = {}
+
+    @staticmethod
+    def _key(artifact_path: str, version: str) -> str:
+        return f"{artifact_path}@{version}"
+
+    async def _get_batcher(self, artifact_path: str, version: str) -> Optional[MicroBatcher]:
+        key = self._key(artifact_path, version)
+        batcher = self._batchers.get(key)
+        if batcher is not None:
+            return batcher
+        if not artifact_path:
+            return None
+        try:
+            mtime = os.path.getmtime(artifact_path)
+        except OSError:
+            return None
+        failed = self._failed.get(key)
+        if failed is not None and failed[0] == mtime and time.monotonic() < failed[1]:
+            return None
+
+        try:
+            compiled = await asyncio.to_thread(CompiledLSTM, artifact_path)
+        except Exception as e:
+            # missing TF or an unreadable (possibly half-written) artifact: don't retry
+            # every bar, but do once it is rewritten or the backoff has passed
+            logger.warning("LSTM artifact %s unavailable: %s", artifact_path, e)
+            self._failed[key] = (mtime, time.monotonic() + self.retry_seconds, str(e))
+            return None
+        self._failed.pop(key, None)
+
+        # another coroutine may have loaded it while we were waiting
+        batcher = self._batchers.setdefault(key, MicroBatcher(compiled, self.max_batch, self.max_wait_ms))
+        # drop stale versions of the same artifact path
+        for k in [k for k in self._batchers if k.startswith(f"{artifact_path}@") and k != key]:
+            self._batchers.pop(k, None)
+        return batcher
+
+    async def predict(self, artifact_path: str, version: str, closes: Sequence[float]) -> Optional[np.ndarray]:
+        """
+        Returns class probabilities [sell, hold, buy] for the latest window of
+        `closes`, or None if the model / enough history is not available.
+        """
+        batcher = await self._get_batcher(artifact_path, version)
+        if batcher is None:
+            return None
+        x = returns_window(closes, batcher.runner.window)
+        if x is None:
+            return None
+        return await batcher.submit(x)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "loaded": list(self._batchers.keys()),
+            "failed": {k: v[2] for k, v in self._failed.items()},
+            "batches": {k: b.batches_run for k, b in self._batchers.items()},
+            "rows": {k: b.rows_run for k, b in self._batchers.items()},
+        }
+
+
+lstm_service = LSTMInferenceService()
@@ -2,7 +2,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Dict, Any, Optional, Tuple
+from typing import Dict, Any, Optional, Sequence, Tuple
 import time
 import os
 
@@ -12,6 +12,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
 from app.models.model_registry import ModelRegistry
+from app.ai.registry.lstm_service import lstm_service
 
 
 @dataclass(frozen=True)
@@ -126,9 +127,11 @@ async def predict_from_registry(
     symbol: str,
     timeframe: str,
     feature_vector: Any,
+    closes: Optional[Sequence[float]] = None,
 ) -> Optional[RegistryPrediction]:
     """
-    Uses active XGB + LGBM models if present.
+    Uses active XGB + LGBM models if present, plus the active LSTM when
+    `closes` (recent close prices) are given.
     Returns None if DB not provided or no models available.
     """
     if db is None:
@@ -172,6 +175,24 @@ async def predict_from_registry(
         else:
             notes.append("lightgbm artifact missing model/features")
 
+    # LSTM (same mapping; batched + traced inference, artifact loaded once)
+    if closes is not None:
+        reg = await _cache.get_active(db, "lstm", symbol, timeframe)
+        if reg:
+            try:
+                p = await lstm_service.predict(reg.artifact_path, reg.version, closes)
+            except Exception as e:
+                p = None
+                notes.append(f"lstm inference failed: {e}")
+            if p is not None:
+                probs_acc["sell"] += float(p[0])
+                probs_acc["hold"] += float(p[1])
+                probs_acc["buy"] += float(p[2])
+                used["lstm"] = reg.version
+                n += 1
+            else:
+                notes.append("lstm artifact unavailable or not enough history")
+
     if n == 0:
         return None
 
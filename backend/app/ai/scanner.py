@@ -63,7 +63,7 @@ class SmartOpportunityScanner:
         tasks = []
         
         for symbol, config in self.ASSETS.items():
-            task = self._analyze_asset(
+            task = self._prepare_asset(
                 symbol, 
                 config,
                 data_fetcher,
@@ -74,13 +74,17 @@ class SmartOpportunityScanner:
         
         results = await asyncio.gather(*tasks, return_exceptions=True)
         
-        opportunities = []
+        prepared = []
         for result in results:
             if isinstance(result, Exception):
                 logger.error(f"Scan error: {result}")
                 continue
-            if result and result.ai_score >= self.min_score_threshold:
-                opportunities.append(result)
+            if result:
+                prepared.append(result)
+        
+        # One vectorized fusion for every asset
+        scored = self._score_assets(prepared)
+        opportunities = [o for o in scored if o.ai_score >= self.min_score_threshold]
         
         # Sort by score
         opportunities.sort(key=lambda x: x.ai_score, reverse=True)
@@ -106,6 +110,19 @@ class SmartOpportunityScanner:
                             smc_analyzer,
                             volume_analyzer) -> Optional[OpportunityScore]:
         """Analyze single asset"""
+        prepared = await self._prepare_asset(symbol, config, data_fetcher, smc_analyzer, volume_analyzer)
+        if prepared is None:
+            return None
+        scored = self._score_assets([prepared])
+        return scored[0] if scored else None
+    
+    async def _prepare_asset(self,
+                            symbol: str,
+                            config: Dict,
+                            data_fetcher,
+                            smc_analyzer,
+                            volume_analyzer) -> Optional[Dict]:
+        """Fetch data, run model predictions and component scores for one asset"""
         try:
             # Fetch data
             df = await data_fetcher(symbol, timeframe='1h', limit=500)
@@ -130,57 +147,70 @@ class SmartOpportunityScanner:
             xgb_pred = self.ensemble.xgboost.predict(df, smc_data, vp_data)
             lgb_pred = self.ensemble.lightgbm.predict(df, xgb_pred.signal)
             
-            # Fuse predictions
-            ensemble_pred = self.ensemble.fuse_predictions(lstm_pred, xgb_pred, lgb_pred)
-            
-            # Calculate component scores
-            trend_score = self._calculate_trend_score(df)
-            momentum_score = self._calculate_momentum_score(df)
-            volume_score = self._calculate_volume_score(df)
-            smc_score = self._calculate_smc_score(smc_data) if smc_data else 50
-            
-            # Calculate final AI score
-            base_score = ensemble_pred.confidence * 100
-            
-            # Adjust based on components
-            ai_score = (
-                base_score * 0.4 +
-                trend_score * 0.2 +
-                momentum_score * 0.2 +
-                volume_score * 0.1 +
-                smc_score * 0.1
-            ) * config['weight']
-            
-            # Cap at 100
-            ai_score = min(100, max(0, ai_score))
-            
-            # Determine action
-            if ensemble_pred.signal_strength.value in ['strong_buy', 'buy']:
-                action = 'BUY'
-            elif ensemble_pred.signal_strength.value in ['strong_sell', 'sell']:
-                action = 'SELL'
-            else:
-                action = 'HOLD'
-            
-            return OpportunityScore(
-                symbol=symbol,
-                name=config['name'],
-                current_price=round(current_price, 2),
-                daily_change=round(daily_change, 2),
-                ai_score=round(ai_score, 1),
-                trend_score=round(trend_score, 1),
-                momentum_score=round(momentum_score, 1),
-                volume_score=round(volume_score, 1),
-                smc_score=round(smc_score, 1),
-                risk_level=ensemble_pred.risk_level,
-                recommended_action=action,
-                confidence=round(ensemble_pred.confidence, 3)
-            )
+            return {
+                'symbol': symbol,
+                'config': config,
+                'current_price': current_price,
+                'daily_change': daily_change,
+                'signals': [self.ensemble.normalize_signal(p) for p in
+                            (lstm_pred.direction, xgb_pred.signal, lgb_pred.signal)],
+                'scores': [lstm_pred.confidence, xgb_pred.probability, lgb_pred.probability],
+                'trend_score': self._calculate_trend_score(df),
+                'momentum_score': self._calculate_momentum_score(df),
+                'volume_score': self._calculate_volume_score(df),
+                'smc_score': self._calculate_smc_score(smc_data) if smc_data else 50
+            }
             
         except Exception as e:
             logger.error(f"Error analyzing {symbol}: {e}")
             return None
     
+    def _score_assets(self, prepared: List[Dict]) -> List[OpportunityScore]:
+        """Fuse all prepared assets in one batch and build their opportunity scores"""
+        if not prepared:
+            return []
+        
+        fused = self.ensemble.fuse_batch(
+            np.array([p['signals'] for p in prepared]),
+            np.array([p['scores'] for p in prepared])
+        )
+        
+        # Calculate final AI score
+        components = np.array([
+            [p['trend_score'], p['momentum_score'], p['volume_score'], p['smc_score']]
+            for p in prepared
+        ], dtype=float)
+        asset_weight = np.array([p['config']['weight'] for p in prepared], dtype=float)
+        base_score = fused.confidence * 100
+        ai_score = (
+            base_score * 0.4 +
+            components @ np.array([0.2, 0.2, 0.1, 0.1])
+        ) * asset_weight
+        
+        # Cap at 100
+        ai_score = np.clip(ai_score, 0, 100)
+        
+        # Determine action
+        action = np.where(fused.strength > 0, 'BUY', np.where(fused.strength < 0, 'SELL', 'HOLD'))
+        
+        return [
+            OpportunityScore(
+                symbol=p['symbol'],
+                name=p['config']['name'],
+                current_price=round(p['current_price'], 2),
+                daily_change=round(p['daily_change'], 2),
+                ai_score=round(float(ai_score[i]), 1),
+                trend_score=round(p['trend_score'], 1),
+                momentum_score=round(p['momentum_score'], 1),
+                volume_score=round(p['volume_score'], 1),
+                smc_score=round(p['smc_score'], 1),
+                risk_level=fused.risk_name(i),
+                recommended_action=str(action[i]),
+                confidence=round(float(fused.confidence[i]), 3)
+            )
+            for i, p in enumerate(prepared)
+        ]
+    
     def _calculate_trend_score(self, df: pd.DataFrame) -> float:
         """Calculate trend strength score 0-100"""
         # Multiple timeframe trend alignment
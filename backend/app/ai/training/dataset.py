@@ -12,4 +12,28 @@ def build_labels(df: pd.DataFrame, horizon: int = 5, thr: float = 0.0015) -> pd.
 
 def to_multiclass(y: pd.Series) -> np.ndarray:
     # map -1,0,1 -> 0,1,2
-    return y.map({-1:0, 0:1, 1:2}).astype(int).values
\ No newline at end of file
+    return y.map({-1:0, 0:1, 1:2}).astype(int).values
+
+def sliding_windows(a: np.ndarray, window: int) -> np.ndarray:
+    # zero-copy view of every `window`-long slice along axis 0:
+    # shape (len(a) - window + 1, window, *a.shape[1:])
+    v = np.lib.stride_tricks.sliding_window_view(a, window, axis=0)
+    if a.ndim > 1:
+        v = np.moveaxis(v, -1, 1)
+    return v
+
+def threshold_labels(r: np.ndarray, thr: float) -> np.ndarray:
+    # vectorized 3-class labels: 0 sell, 1 hold, 2 buy
+    y = np.ones(len(r), dtype=np.int32)
+    y[r > thr] = 2
+    y[r < -thr] = 0
+    return y
+
+def return_sequences(ret: np.ndarray, window: int, thr: float = 0.0008) -> Tuple[np.ndarray, np.ndarray]:
+    # X[k] = ret[k:k+window] (strided view, no copy), y[k] = label of ret[k+window+1]
+    n = max(len(ret) - window - 1, 0)
+    if n == 0:
+        return np.empty((0, window), dtype=ret.dtype), np.empty(0, dtype=np.int32)
+    X = sliding_windows(ret, window)[:n]
+    y = threshold_labels(ret[window + 1:window + 1 + n], thr)
+    return X, y
@@ -0,0 +1,321 @@
+"""
+Incremental (warm-start) retraining for the boosted models.
+
+Instead of refitting XGBoost / LightGBM from scratch every day, keep boosting
+from the active booster (`xgb_model=` / `init_model=`) on the bars appended
+since the last activated ModelTrainingRun:
+
+- the newest labeled bars are held out; the candidate is activated only if its
+  holdout log-loss is not worse than the current model's (within tolerance)
+- held-out bars are not marked as trained, so they lead the next increment
+- every `full_refit_every` activated rounds a full refit resets the tree count;
+  it is compared with the current model only on bars that model never saw,
+  and a rejected full refit also restarts the count (no full refit every cycle)
+"""
+from __future__ import annotations
+
+import datetime
+import os
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+from sqlalchemy import desc, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.model_registry import ModelRegistry
+from app.models.model_training_run import ModelTrainingRun
+from app.ai.xgboost_model import XGBoostModel
+from app.ai.lightgbm_model import LightGBMModel
+from app.ai.training.dataset import build_labels, to_multiclass
+from app.ai.training.trainers import ARTIFACT_DIR, load_candles_df, load_candles_since, register_model
+
+BOOSTED_TYPES = ("xgboost", "lightgbm")
+_ARTIFACT_PREFIX = {"xgboost": "xgb", "lightgbm": "lgbm"}
+
+LABEL_HORIZON = 5          # build_labels default
+FEATURE_LOOKBACK = 200     # warm-up bars for rolling/ewm features
+MIN_NEW_BARS = 60
+MIN_HOLDOUT = 20
+FULL_HOLDOUT_BARS = 500
+
+
+def _wrapper(model_type: str):
+    if model_type == "xgboost":
+        return XGBoostModel()
+    if model_type == "lightgbm":
+        return LightGBMModel()
+    raise ValueError(f"unsupported model_type: {model_type}")
+
+
+def _labeled_xy(model_type: str, df: pd.DataFrame) -> Tuple[pd.DataFrame, np.ndarray, np.ndarray]:
+    """Features/labels for rows whose forward label is already known."""
+    X = _wrapper(model_type).extract_features(df).dropna()
+    y = to_multiclass(build_labels(df.loc[X.index]).loc[X.index])
+    times = pd.to_datetime(df.loc[X.index, "time"]).values
+
+    n = max(len(df) - LABEL_HORIZON, 0)
+    keep = X.index < n
+    return X[keep], y[keep], times[keep]
+
+
+def _holdout_logloss(model: Any, X: np.ndarray, y: np.ndarray) -> float:
+    from sklearn.metrics import log_loss
+
+    return float(log_loss(y, model.predict_proba(X), labels=[0, 1, 2]))
+
+
+def fit_boosted(
+    model_type: str,
+    df: pd.DataFrame,
+    symbol: str,
+    timeframe: str,
+    mode: str = "full",
+    since: Optional[str] = None,
+    prev_artifact: Optional[str] = None,
+    rounds: int = 25,
+    holdout_frac: float = 0.2,
+    tolerance: float = 0.01,
+    n_jobs: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Fit a candidate (full or warm-started), compare it with the previous model
+    on the newest bars, and write the artifact only if it wins. No DB access.
+    """
+    if df.empty or "time" not in df:
+        return {"ok": False, "reason": "not_enough_data"}
+
+    X_all, y_all, times = _labeled_xy(model_type, df)
+
+    prev = None
+    if prev_artifact and os.path.exists(prev_artifact):
+        prev = joblib.load(prev_artifact)
+        if list(prev.get("feature_names") or []) != list(X_all.columns):
+            prev = None  # feature set changed -> not comparable / not resumable
+
+    since_ts = np.datetime64(pd.Timestamp(since)) if since else None
+    if mode == "incremental" and (prev is None or since_ts is None or len(times) == 0 or since_ts < times[0]):
+        mode = "full"
+
+    if mode == "incremental":
+        mask = times > since_ts
+        X, y, t = X_all.values[mask], y_all[mask], times[mask]
+        if len(X) < MIN_NEW_BARS:
+            return {"ok": True, "skipped": True, "reason": "not_enough_new_bars", "new_bars": int(len(X))}
+        n_hold = max(MIN_HOLDOUT, int(len(X) * holdout_frac))
+    else:
+        if len(df) < 800:
+            return {"ok": False, "reason": "not_enough_data"}
+        X, y, t = X_all.values, y_all, times
+        n_hold = min(FULL_HOLDOUT_BARS, int(len(X) * holdout_frac))
+        if prev is not None and since_ts is not None:
+            # the previous model was fit through `since`: scoring it on those bars
+            # would favor it, so both models are judged on the bars after it only
+            unseen = int(np.count_nonzero(times > since_ts))
+            if unseen < MIN_HOLDOUT:
+                return {"ok": True, "skipped": True, "reason": "not_enough_new_bars", "new_bars": unseen}
+            n_hold = min(n_hold, unseen)
+
+    X_tr, y_tr, X_ho, y_ho = X[:-n_hold], y[:-n_hold], X[-n_hold:], y[-n_hold:]
+    if set(np.unique(y_tr).tolist()) != {0, 1, 2}:
+        # sklearn wrappers infer num_class from y; a partial slice can't extend a 3-class booster
+        return {"ok": True, "skipped": True, "reason": "missing_classes", "new_bars": int(len(X))}
+
+    t0 = time.perf_counter()
+    if mode == "incremental":
+        from sklearn.base import clone
+
+        est = clone(prev["model"])
+        est.set_params(n_estimators=int(rounds))
+        if n_jobs:
+            est.set_params(n_jobs=int(n_jobs))
+        if model_type == "xgboost":
+            est.fit(X_tr, y_tr, xgb_model=prev["model"].get_booster())
+        else:
+            est.fit(X_tr, y_tr, init_model=prev["model"].booster_)
+    elif prev is not None and prev.get("base_params"):
+        # full refit keeps the tuned config (see app.ai.training.search)
+        est = type(prev["model"])(**prev["base_params"])
+        if n_jobs:
+            est.set_params(n_jobs=int(n_jobs))
+        est.fit(X_tr, y_tr)
+    else:
+        est = _wrapper(model_type).model
+        if n_jobs:
+            est.set_params(n_jobs=int(n_jobs))
+        est.fit(X_tr, y_tr)
+    fit_s = time.perf_counter() - t0
+
+    new_loss = _holdout_logloss(est, X_ho, y_ho)
+    prev_loss = _holdout_logloss(prev["model"], X_ho, y_ho) if prev is not None else None
+    activated = prev_loss is None or new_loss <= prev_loss * (1.0 + tolerance)
+
+    rounds_since_full = 0
+    if mode == "incremental" and prev is not None:
+        rounds_since_full = int(prev.get("rounds_since_full", 0)) + 1
+
+    path = None
+    if activated:
+        os.makedirs(ARTIFACT_DIR, exist_ok=True)
+        path = os.path.join(ARTIFACT_DIR, f"{_ARTIFACT_PREFIX[model_type]}_{symbol}_{timeframe}.joblib")
+        joblib.dump({
+            "model": est,
+            "feature_names": list(X_all.columns),
+            "rounds_since_full": rounds_since_full,
+            "base_params": prev.get("base_params") if mode == "incremental" else est.get_params(),
+        }, path)
+
+    metrics = {
+        "samples": int(len(X_tr)),
+        "mode": mode,
+        "activated": bool(activated),
+        "rounds_since_full": rounds_since_full,
+        "trained_through": pd.Timestamp(t[len(X_tr) - 1]).isoformat(),
+        "fit_s": round(fit_s, 3),
+        "holdout": {
+            "bars": int(n_hold),
+            "logloss": round(new_loss, 5),
+            "prev_logloss": round(prev_loss, 5) if prev_loss is not None else None,
+            "tolerance": tolerance,
+        },
+    }
+    return {"ok": True, "activated": bool(activated), "artifact": path, "metrics": metrics}
+
+
+def count_rounds_since_full(runs, fallback: int = 0) -> int:
+    """
+    Activated incremental rounds since the last full refit attempt, newest run
+    first. A rejected full refit counts as an attempt, so the next one waits
+    another full_refit_every rounds instead of being retried every cycle.
+    """
+    n = 0
+    for run in runs:
+        metrics = run.metrics or {}
+        if metrics.get("mode") == "full":
+            return n
+        if run.status == "success":
+            n += 1
+    return max(n, fallback)
+
+
+async def plan_boosted(
+    db: AsyncSession,
+    model_type: str,
+    symbol: str,
+    timeframe: str,
+    full_refit_every: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Decide full vs incremental from the active model and the last activated run."""
+    every = int(full_refit_every or getattr(settings, "TRAIN_FULL_REFIT_EVERY", 7))
+
+    reg = (await db.execute(select(ModelRegistry).where(
+        (ModelRegistry.model_type == model_type) &
+        (ModelRegistry.symbol == symbol) &
+        (ModelRegistry.timeframe == timeframe) &
+        (ModelRegistry.is_active == True)
+    ))).scalar_one_or_none()
+
+    runs = (await db.execute(
+        select(ModelTrainingRun)
+        .where(
+            (ModelTrainingRun.model_type == model_type) &
+            (ModelTrainingRun.symbol == symbol) &
+            (ModelTrainingRun.timeframe == timeframe) &
+            (ModelTrainingRun.status == "success")
+        )
+        .order_by(desc(ModelTrainingRun.finished_at))
+        .limit(1)
+    )).scalars().all()
+    last = runs[0] if runs else None
+    last_metrics = (last.metrics or {}) if last else {}
+
+    since = last_metrics.get("trained_through")
+    prev_artifact = reg.artifact_path if reg else None
+
+    attempts = (await db.execute(
+        select(ModelTrainingRun)
+        .where(
+            (ModelTrainingRun.model_type == model_type) &
+            (ModelTrainingRun.symbol == symbol) &
+            (ModelTrainingRun.timeframe == timeframe) &
+            (ModelTrainingRun.status.in_(("success", "rejected")))
+        )
+        .order_by(desc(ModelTrainingRun.finished_at))
+        .limit(max(every, 1) * 4)
+    )).scalars().all()
+    rounds_since_full = count_rounds_since_full(attempts, int(last_metrics.get("rounds_since_full") or 0))
+
+    mode = "incremental"
+    if not prev_artifact or not since or rounds_since_full + 1 >= every:
+        mode = "full"
+
+    return {"mode": mode, "since": since, "prev_artifact": prev_artifact, "rounds_since_full": rounds_since_full}
+
+
+async def retrain_boosted(
+    db: AsyncSession,
+    model_type: str,
+    symbol: str,
+    timeframe: str,
+    full_refit_every: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Single-pair incremental retrain: plan, load only what is needed, fit, gate, record."""
+    plan = await plan_boosted(db, model_type, symbol, timeframe, full_refit_every)
+
+    run = ModelTrainingRun(model_type=model_type, symbol=symbol, timeframe=timeframe, status="started")
+    db.add(run)
+    await db.commit()
+
+    t0 = time.perf_counter()
+    if plan["mode"] == "incremental":
+        since = datetime.datetime.fromisoformat(plan["since"])
+        df = await load_candles_since(db, symbol, timeframe, since, lookback=FEATURE_LOOKBACK)
+    else:
+        df = await load_candles_df(db, symbol, timeframe)
+    load_s = round(time.perf_counter() - t0, 3)
+
+    try:
+        res = fit_boosted(
+            model_type, df, symbol, timeframe,
+            mode=plan["mode"],
+            since=plan["since"],
+            prev_artifact=plan["prev_artifact"],
+            rounds=int(getattr(settings, "TRAIN_INCREMENTAL_ROUNDS", 25)),
+            tolerance=float(getattr(settings, "TRAIN_HOLDOUT_TOLERANCE", 0.01)),
+        )
+    except Exception as e:
+        res = {"ok": False, "reason": "exception", "error": str(e)}
+
+    await record_boosted_result(db, run, model_type, symbol, timeframe, res, timings={"load_s": load_s})
+    return res
+
+
+def boosted_run_status(res: Dict[str, Any]) -> str:
+    if not res.get("ok"):
+        return "failed"
+    if res.get("skipped"):
+        return "skipped"
+    return "success" if res.get("activated") else "rejected"
+
+
+async def record_boosted_result(
+    db: AsyncSession,
+    run: ModelTrainingRun,
+    model_type: str,
+    symbol: str,
+    timeframe: str,
+    res: Dict[str, Any],
+    timings: Optional[Dict[str, Any]] = None,
+) -> None:
+    run.status = boosted_run_status(res)
+    run.metrics = {**(res.get("metrics") or {}), "reason": res.get("reason"), "timings": timings or {}}
+    run.error = str(res.get("error") or res.get("reason"))[:1024] if run.status == "failed" else None
+    run.finished_at = datetime.datetime.utcnow()
+
+    if run.status == "success":
+        await register_model(db, model_type, symbol, timeframe, res["artifact"], res["metrics"])
+    else:
+        await db.commit()
@@ -0,0 +1,205 @@
+"""
+Universe training orchestrator.
+
+Trains every (symbol, timeframe) of the scanner universe x model type, at
+most `max_workers` jobs at a time:
+- candles are loaded once per pair in the parent and shared by all model types
+- each job runs in its own process (app.ai.training.workers) with a thread
+  cap (and optional address space cap), so parallel jobs don't oversubscribe
+  the CPU; its timeout starts when it starts and kills the process
+- every job gets its own ModelTrainingRun row with load / fit / wall timings;
+  successful artifacts are registered as the active model
+- boosted models warm-start from the active booster when incremental training
+  is on (see app.ai.training.incremental)
+"""
+from __future__ import annotations
+
+import asyncio
+import datetime
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.model_training_run import ModelTrainingRun
+from app.services.settings_service import SettingsService
+from app.scanner.universe import parse_universe
+from app.ai.training.trainers import load_candles_df, register_model
+from app.ai.training.incremental import BOOSTED_TYPES, plan_boosted, record_boosted_result
+from app.ai.training.workers import WorkerTimeout, run_isolated
+
+logger = logging.getLogger(__name__)
+
+MODEL_TYPES = ("xgboost", "lightgbm", "lstm")
+
+# candle depth each model type trains on (matches the single-pair trainers)
+_CANDLE_LIMITS = {"xgboost": 5000, "lightgbm": 5000, "lstm": 8000}
+
+
+def _run_job(
+    model_type: str,
+    symbol: str,
+    timeframe: str,
+    df: pd.DataFrame,
+    threads: int,
+    plan: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Executed inside a job process. Pure compute + artifact write, no DB."""
+    from app.ai.training.trainers import fit_xgb, fit_lgbm
+    from app.ai.training.train_lstm import fit_lstm
+    from app.ai.training.incremental import fit_boosted
+
+    t0 = time.perf_counter()
+    try:
+        if plan is not None:
+            res = fit_boosted(model_type, df, symbol, timeframe, n_jobs=threads, **plan)
+        elif model_type == "xgboost":
+            res = fit_xgb(df, symbol, timeframe, n_jobs=threads)
+        elif model_type == "lightgbm":
+            res = fit_lgbm(df, symbol, timeframe, n_jobs=threads)
+        elif model_type == "lstm":
+            res = fit_lstm(df, symbol, timeframe)
+        else:
+            res = {"ok": False, "reason": f"unknown_model_type:{model_type}"}
+    except MemoryError:
+        res = {"ok": False, "reason": "memory_limit"}
+    except Exception as e:
+        res = {"ok": False, "reason": "exception", "error": str(e)}
+
+    res["fit_s"] = round(time.perf_counter() - t0, 3)
+    res["pid"] = os.getpid()
+    return res
+
+
+def plan_jobs(universe: Dict[str, Any], model_types: Sequence[str] = MODEL_TYPES) -> List[Tuple[str, str, str]]:
+    return [
+        (str(s["symbol"]), str(tf), mt)
+        for s in universe["symbols"]
+        for tf in universe["timeframes"]
+        for mt in model_types
+    ]
+
+
+async def train_universe(
+    db: AsyncSession,
+    universe: Optional[Dict[str, Any]] = None,
+    model_types: Sequence[str] = MODEL_TYPES,
+    max_workers: Optional[int] = None,
+    threads_per_job: Optional[int] = None,
+    memory_limit_mb: Optional[int] = None,
+    job_timeout_s: Optional[float] = None,
+    incremental: Optional[bool] = None,
+) -> Dict[str, Any]:
+    if universe is None:
+        universe = parse_universe(await SettingsService(db).get("SCANNER_UNIVERSE_JSON"))
+
+    threads = int(threads_per_job or getattr(settings, "TRAIN_THREADS_PER_JOB", 2) or 1)
+    memory_mb = int(memory_limit_mb if memory_limit_mb is not None else getattr(settings, "TRAIN_JOB_MEMORY_MB", 0) or 0)
+    timeout_s = float(job_timeout_s or getattr(settings, "TRAIN_JOB_TIMEOUT_S", 900))
+    if incremental is None:
+        incremental = bool(getattr(settings, "TRAIN_INCREMENTAL", True))
+    boost_opts = {
+        "rounds": int(getattr(settings, "TRAIN_INCREMENTAL_ROUNDS", 25)),
+        "tolerance": float(getattr(settings, "TRAIN_HOLDOUT_TOLERANCE", 0.01)),
+    }
+    workers = int(max_workers or getattr(settings, "TRAIN_MAX_WORKERS", 0) or 0)
+    if workers <= 0:
+        workers = max(1, (os.cpu_count() or 1) // threads)
+
+    jobs = plan_jobs(universe, model_types)
+    depth = max(_CANDLE_LIMITS.get(mt, 5000) for mt in model_types) if model_types else 0
+
+    started = time.perf_counter()
+    slots = asyncio.Semaphore(workers)
+
+    async def _await_job(args, meta):
+        async with slots:
+            try:
+                res = await asyncio.to_thread(run_isolated, _run_job, args, threads, memory_mb, timeout_s)
+            except WorkerTimeout:
+                res = {"ok": False, "reason": "timeout", "fit_s": timeout_s}
+            except Exception as e:
+                res = {"ok": False, "reason": "worker_failed", "error": str(e)}
+        return meta, res
+
+    tasks = []
+    results: List[Dict[str, Any]] = []
+    try:
+        pairs = list(dict.fromkeys((symbol, tf) for symbol, tf, _ in jobs))
+        for symbol, tf in pairs:
+            # one candle load per pair, shared by every model type
+            t0 = time.perf_counter()
+            df = await load_candles_df(db, symbol, tf, limit=depth)
+            load_s = round(time.perf_counter() - t0, 3)
+
+            for mt in model_types:
+                run = ModelTrainingRun(model_type=mt, symbol=symbol, timeframe=tf, status="started")
+                db.add(run)
+                job_df = df.tail(_CANDLE_LIMITS.get(mt, len(df))).reset_index(drop=True)
+                plan = None
+                if incremental and mt in BOOSTED_TYPES:
+                    p = await plan_boosted(db, mt, symbol, tf)
+                    plan = {"mode": p["mode"], "since": p["since"], "prev_artifact": p["prev_artifact"], **boost_opts}
+                args = (mt, symbol, tf, job_df, threads, plan)
+                meta = {"run": run, "symbol": symbol, "timeframe": tf, "model_type": mt,
+                        "load_s": load_s, "submitted": time.perf_counter(), "boosted": plan is not None}
+                tasks.append(asyncio.ensure_future(_await_job(args, meta)))
+            await db.commit()
+
+        for next_done in asyncio.as_completed(tasks):
+            meta, res = await next_done
+            run: ModelTrainingRun = meta["run"]
+            timings = {
+                "load_s": meta["load_s"],
+                "fit_s": res.get("fit_s"),
+                "wall_s": round(time.perf_counter() - meta["submitted"], 3),
+            }
+
+            if meta["boosted"]:
+                await record_boosted_result(db, run, meta["model_type"], meta["symbol"], meta["timeframe"],
+                                            res, timings={**timings, "worker_pid": res.get("pid")})
+            else:
+                run.status = "success" if res.get("ok") else "failed"
+                run.metrics = {**(res.get("metrics") or {}), "timings": timings, "worker_pid": res.get("pid")}
+                run.error = None if res.get("ok") else str(res.get("error") or res.get("reason"))[:1024]
+                run.finished_at = datetime.datetime.utcnow()
+
+                if res.get("ok"):
+                    await register_model(db, meta["model_type"], meta["symbol"], meta["timeframe"],
+                                         res["artifact"], res.get("metrics") or {})
+                else:
+                    await db.commit()
+
+            results.append({
+                "symbol": meta["symbol"],
+                "timeframe": meta["timeframe"],
+                "model_type": meta["model_type"],
+                "ok": bool(res.get("ok")),
+                "reason": res.get("reason"),
+                "mode": (res.get("metrics") or {}).get("mode"),
+                "activated": res.get("activated"),
+                "timings": timings,
+            })
+    finally:
+        # a failure above: jobs not yet started never start, running ones finish their process
+        for t in tasks:
+            t.cancel()
+
+    total_s = round(time.perf_counter() - started, 3)
+    ok = sum(1 for r in results if r["ok"])
+    logger.info("train_universe finished: %s/%s jobs ok in %.1fs (%s workers x %s threads)",
+                ok, len(jobs), total_s, workers, threads)
+    return {
+        "ok": True,
+        "jobs": len(jobs),
+        "succeeded": ok,
+        "failed": len(results) - ok,
+        "workers": workers,
+        "threads_per_job": threads,
+        "total_s": total_s,
+        "results": results,
+    }
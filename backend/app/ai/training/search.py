@@ -0,0 +1,323 @@
+"""
+Hyperparameter search for the boosted models.
+
+- purged / embargoed time-series CV: contiguous validation blocks; training
+  bars whose forward label overlaps a validation block are purged and a short
+  embargo after each block is dropped
+- each validation block is split in two: the first part drives early
+  stopping (so the tree count is learned instead of fixed at the constructor
+  default), the part after a purge gap scores the trial - a trial is never
+  ranked on the bars that chose its tree count
+- trials run in their own processes (app.ai.training.workers), each capped
+  at `threads_per_trial`
+- the winning config is refit on all bars (rounds = mean best iteration) and
+  registered; the search summary lands in ModelRegistry.metrics["search"]
+"""
+from __future__ import annotations
+
+import asyncio
+import datetime
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.model_training_run import ModelTrainingRun
+from app.ai.training.incremental import BOOSTED_TYPES, LABEL_HORIZON, _ARTIFACT_PREFIX, _labeled_xy
+from app.ai.training.trainers import ARTIFACT_DIR, load_candles_df, register_model
+from app.ai.training.workers import run_isolated
+
+logger = logging.getLogger(__name__)
+
+SEARCH_SPACE: Dict[str, Dict[str, List[Any]]] = {
+    "xgboost": {
+        "max_depth": [3, 4, 5, 6, 8],
+        "learning_rate": [0.02, 0.05, 0.1],
+        "subsample": [0.6, 0.8, 1.0],
+        "colsample_bytree": [0.6, 0.8, 1.0],
+        "min_child_weight": [1, 5, 10],
+        "reg_lambda": [0.0, 1.0, 5.0],
+    },
+    "lightgbm": {
+        "num_leaves": [15, 31, 63],
+        "learning_rate": [0.02, 0.05, 0.1],
+        "min_child_samples": [10, 20, 50],
+        "colsample_bytree": [0.6, 0.8, 1.0],
+        "subsample": [0.6, 0.8, 1.0],
+        "reg_lambda": [0.0, 1.0, 5.0],
+    },
+}
+
+
+def purged_folds(
+    n: int,
+    n_splits: int = 4,
+    purge: int = LABEL_HORIZON,
+    embargo: int = 0,
+    min_train: int = 200,
+) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Yield (train_idx, val_idx) over `n` time-ordered rows.
+
+    The last `n_splits` contiguous blocks are validation sets (the first block
+    is always training). Training keeps every other row except the `purge`
+    rows before the block (their labels look into it) and the `embargo` rows
+    after it (serially correlated with it).
+    """
+    bounds = np.linspace(0, n, n_splits + 2).astype(int)
+    idx = np.arange(n)
+    for k in range(1, n_splits + 1):
+        v0, v1 = int(bounds[k]), int(bounds[k + 1])
+        keep = (idx < v0 - purge) | (idx >= v1 + embargo)
+        train = idx[keep]
+        if len(train) < min_train or v1 <= v0:
+            continue
+        yield train, idx[v0:v1]
+
+
+def split_validation(va: np.ndarray, stop_frac: float = 1 / 3, gap: int = LABEL_HORIZON) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (early-stopping rows, scoring rows) of a validation block. The `gap` rows
+    between them are dropped: the early-stopping labels look into them.
+    """
+    k = int(len(va) * stop_frac)
+    return va[:k], va[k + gap:]
+
+
+def sample_params(model_type: str, n_trials: int, seed: int = 42) -> List[Dict[str, Any]]:
+    """Random configs from SEARCH_SPACE; the first trial is always the constructor default."""
+    space = SEARCH_SPACE[model_type]
+    rng = np.random.default_rng(seed)
+    default = ({"max_depth": 6, "learning_rate": 0.1, "subsample": 0.8, "colsample_bytree": 0.8}
+               if model_type == "xgboost" else
+               {"num_leaves": 31, "learning_rate": 0.05, "colsample_bytree": 0.8, "subsample": 0.8})
+    trials, seen = [default], {tuple(sorted(default.items()))}
+    for _ in range(n_trials * 20):
+        if len(trials) >= n_trials:
+            break
+        p = {k: v[int(rng.integers(len(v)))] for k, v in space.items()}
+        key = tuple(sorted(p.items()))
+        if key not in seen:
+            seen.add(key)
+            trials.append(p)
+    return [{k: (v.item() if hasattr(v, "item") else v) for k, v in p.items()} for p in trials[:n_trials]]
+
+
+def _estimator(model_type: str, params: Dict[str, Any], threads: int, max_rounds: int, early_stopping: Optional[int]):
+    if model_type == "xgboost":
+        import xgboost as xgb
+
+        return xgb.XGBClassifier(
+            n_estimators=max_rounds,
+            random_state=42,
+            eval_metric="mlogloss",
+            n_jobs=threads,
+            early_stopping_rounds=early_stopping,
+            **params,
+        )
+    import lightgbm as lgb
+
+    return lgb.LGBMClassifier(
+        n_estimators=max_rounds,
+        subsample_freq=5 if params.get("subsample", 1.0) < 1.0 else 0,
+        n_jobs=threads,
+        verbose=-1,
+        **params,
+    )
+
+
+def _fit_fold(model_type: str, est, X_tr, y_tr, X_va, y_va, early_stopping: int) -> int:
+    """Fit with early stopping on (X_va, y_va); return the best iteration (1-based)."""
+    if model_type == "xgboost":
+        est.fit(X_tr, y_tr, eval_set=[(X_va, y_va)], verbose=False)
+        return int(est.best_iteration) + 1
+    import lightgbm as lgb
+
+    est.fit(X_tr, y_tr, eval_set=[(X_va, y_va)], eval_metric="multi_logloss",
+            callbacks=[lgb.early_stopping(early_stopping, verbose=False)])
+    return int(est.best_iteration_ or est.n_estimators)
+
+
+def run_trial(
+    model_type: str,
+    params: Dict[str, Any],
+    X: np.ndarray,
+    y: np.ndarray,
+    folds: List[Tuple[np.ndarray, np.ndarray]],
+    threads: int = 1,
+    max_rounds: int = 200,
+    early_stopping: int = 30,
+) -> Dict[str, Any]:
+    """One config across every fold. Runs in a worker process (or inline)."""
+    from sklearn.metrics import log_loss
+
+    t0 = time.perf_counter()
+    losses, iters = [], []
+    try:
+        for tr, va in folds:
+            stop, score = split_validation(va)
+            if len(np.unique(y[tr])) < 3 or len(stop) == 0 or len(score) == 0:
+                continue  # a 3-class booster can't be fit on this slice
+            est = _estimator(model_type, params, threads, max_rounds, early_stopping)
+            iters.append(_fit_fold(model_type, est, X[tr], y[tr], X[stop], y[stop], early_stopping))
+            losses.append(float(log_loss(y[score], est.predict_proba(X[score]), labels=[0, 1, 2])))
+    except Exception as e:
+        return {"ok": False, "params": params, "error": str(e), "fit_s": round(time.perf_counter() - t0, 3)}
+
+    if not losses:
+        return {"ok": False, "params": params, "error": "no_usable_folds", "fit_s": round(time.perf_counter() - t0, 3)}
+    return {
+        "ok": True,
+        "params": params,
+        "cv_logloss": float(np.mean(losses)),
+        "fold_logloss": [round(v, 5) for v in losses],
+        "best_iteration": int(round(float(np.mean(iters)))),
+        "fit_s": round(time.perf_counter() - t0, 3),
+        "pid": os.getpid(),
+    }
+
+
+def search_hyperparams(
+    model_type: str,
+    df: pd.DataFrame,
+    symbol: str,
+    timeframe: str,
+    n_trials: Optional[int] = None,
+    n_splits: Optional[int] = None,
+    max_workers: Optional[int] = None,
+    threads_per_trial: Optional[int] = None,
+    max_rounds: Optional[int] = None,
+    early_stopping: Optional[int] = None,
+    embargo: Optional[int] = None,
+    seed: int = 42,
+) -> Dict[str, Any]:
+    """CV search + final refit + artifact write. No DB access."""
+    if model_type not in BOOSTED_TYPES:
+        return {"ok": False, "reason": f"unsupported_model_type:{model_type}"}
+    if len(df) < 800:
+        return {"ok": False, "reason": "not_enough_data"}
+
+    n_trials = int(n_trials or getattr(settings, "TUNE_N_TRIALS", 16))
+    n_splits = int(n_splits or getattr(settings, "TUNE_CV_FOLDS", 4))
+    threads = int(threads_per_trial or getattr(settings, "TRAIN_THREADS_PER_JOB", 2) or 1)
+    max_rounds = int(max_rounds or getattr(settings, "TUNE_MAX_ROUNDS", 200))
+    early_stopping = int(early_stopping or getattr(settings, "TUNE_EARLY_STOPPING_ROUNDS", 30))
+    embargo = int(embargo if embargo is not None else LABEL_HORIZON)
+    workers = int(max_workers or getattr(settings, "TRAIN_MAX_WORKERS", 0) or 0)
+    if workers <= 0:
+        workers = max(1, (os.cpu_count() or 1) // threads)
+    workers = min(workers, n_trials)
+
+    X_df, y, times = _labeled_xy(model_type, df)
+    X = np.ascontiguousarray(X_df.values, dtype=np.float32)
+    folds = list(purged_folds(len(X), n_splits, purge=LABEL_HORIZON, embargo=embargo))
+    if not folds:
+        return {"ok": False, "reason": "not_enough_data"}
+
+    trials = sample_params(model_type, n_trials, seed)
+    started = time.perf_counter()
+    results: List[Dict[str, Any]] = []
+
+    if workers == 1:
+        results = [run_trial(model_type, p, X, y, folds, threads, max_rounds, early_stopping) for p in trials]
+    else:
+        # threads only wait on the trial processes
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futs = [pool.submit(run_isolated, run_trial,
+                                (model_type, p, X, y, folds, threads, max_rounds, early_stopping), threads)
+                    for p in trials]
+            for fut in as_completed(futs):
+                try:
+                    results.append(fut.result())
+                except Exception as e:
+                    results.append({"ok": False, "error": str(e)})
+    search_s = time.perf_counter() - started
+
+    ok = sorted((r for r in results if r.get("ok")), key=lambda r: r["cv_logloss"])
+    if not ok:
+        return {"ok": False, "reason": "all_trials_failed",
+                "error": next((r.get("error") for r in results if r.get("error")), None)}
+    best = ok[0]
+
+    # final model on every labeled bar, tree count learned by the folds
+    t0 = time.perf_counter()
+    final = _estimator(model_type, best["params"], threads, best["best_iteration"], None)
+    final.fit(X, y)
+    refit_s = time.perf_counter() - t0
+
+    os.makedirs(ARTIFACT_DIR, exist_ok=True)
+    path = os.path.join(ARTIFACT_DIR, f"{_ARTIFACT_PREFIX[model_type]}_{symbol}_{timeframe}.joblib")
+    joblib.dump({
+        "model": final,
+        "feature_names": list(X_df.columns),
+        "rounds_since_full": 0,
+        "base_params": final.get_params(),
+    }, path)
+
+    metrics = {
+        "samples": int(len(X)),
+        "mode": "full",
+        "rounds_since_full": 0,
+        "trained_through": pd.Timestamp(times[-1]).isoformat(),
+        "search": {
+            "best_params": best["params"],
+            "n_estimators": best["best_iteration"],
+            "cv_logloss": round(best["cv_logloss"], 5),
+            "fold_logloss": best["fold_logloss"],
+            "trials": len(trials),
+            "trials_ok": len(ok),
+            "folds": len(folds),
+            "embargo": embargo,
+            "early_stopping_rounds": early_stopping,
+            "workers": workers,
+            "threads_per_trial": threads,
+            "search_s": round(search_s, 3),
+            "refit_s": round(refit_s, 3),
+            "leaderboard": [{"params": r["params"], "cv_logloss": round(r["cv_logloss"], 5),
+                             "n_estimators": r["best_iteration"]} for r in ok[:5]],
+        },
+    }
+    logger.info("hyperparameter search %s %s %s: best cv_logloss=%.4f (%s trees) in %.1fs",
+                model_type, symbol, timeframe, best["cv_logloss"], best["best_iteration"], search_s)
+    return {"ok": True, "artifact": path, "metrics": metrics}
+
+
+async def tune_model(
+    db: AsyncSession,
+    model_type: str,
+    symbol: str,
+    timeframe: str,
+    limit: int = 5000,
+    **search_kwargs: Any,
+) -> Dict[str, Any]:
+    """Load candles, search off the event loop, record a ModelTrainingRun, register the winner."""
+    run = ModelTrainingRun(model_type=model_type, symbol=symbol, timeframe=timeframe, status="started")
+    db.add(run)
+    await db.commit()
+
+    t0 = time.perf_counter()
+    df = await load_candles_df(db, symbol, timeframe, limit=limit)
+    load_s = round(time.perf_counter() - t0, 3)
+
+    try:
+        res = await asyncio.to_thread(search_hyperparams, model_type, df, symbol, timeframe, **search_kwargs)
+    except Exception as e:
+        res = {"ok": False, "reason": "exception", "error": str(e)}
+
+    run.status = "success" if res.get("ok") else "failed"
+    run.metrics = {**(res.get("metrics") or {}), "timings": {"load_s": load_s}}
+    run.error = None if res.get("ok") else str(res.get("error") or res.get("reason"))[:1024]
+    run.finished_at = datetime.datetime.utcnow()
+
+    if res.get("ok"):
+        await register_model(db, model_type, symbol, timeframe, res["artifact"], res["metrics"])
+    else:
+        await db.commit()
+    return res
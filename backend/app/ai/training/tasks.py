@@ -2,6 +2,8 @@ from app.services.notification_service import celery_app
 from app.database.connection import get_db
 from app.ai.training.trainers import train_xgb, train_lgbm
 from app.ai.training.train_lstm import train_lstm
+from app.ai.training.orchestrator import train_universe
+from app.ai.training.search import tune_model
 
 @celery_app.task(bind=True)
 def train_models(symbol: str = "XAUUSD", timeframe: str = "M15"):
@@ -14,4 +16,30 @@ def train_models(symbol: str = "XAUUSD", timeframe: str = "M15"):
             r3 = await train_lstm(db, symbol, timeframe)  # optional (skips if TF missing)
             return {"xgb": r1, "lgbm": r2, "lstm": r3}
 
-    return asyncio.run(_run())
\ No newline at end of file
+    return asyncio.run(_run())
+
+
+@celery_app.task(bind=True, time_limit=3600, soft_time_limit=3300)
+def train_universe_models(self):
+    """Daily retrain of every scanner-universe pair x model type (process pool, boosted models warm-started)."""
+    import asyncio
+
+    async def _run():
+        async for db in get_db():
+            return await train_universe(db)
+
+    return asyncio.run(_run())
+
+
+@celery_app.task(bind=True, time_limit=3600, soft_time_limit=3300)
+def tune_models(self, symbol: str = "XAUUSD", timeframe: str = "M15"):
+    """Time-series CV hyperparameter search for both boosted models; registers the winners."""
+    import asyncio
+
+    async def _run():
+        async for db in get_db():
+            r1 = await tune_model(db, "xgboost", symbol, timeframe)
+            r2 = await tune_model(db, "lightgbm", symbol, timeframe)
+            return {"xgb": r1, "lgbm": r2}
+
+    return asyncio.run(_run())
@@ -3,30 +3,31 @@ from __future__ import annotations
 import os
 import time
 import json
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 import pandas as pd
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.ai.training.trainers import load_candles_df, register_model
+from app.ai.training.dataset import return_sequences
 
 ARTIFACT_DIR = os.getenv("MODEL_ARTIFACT_DIR", "model_artifacts")
+# above this many training windows, feed Keras from tf.data instead of one 3-D array
+STREAM_MIN_SAMPLES = int(os.getenv("LSTM_STREAM_MIN_SAMPLES", "200000"))
 
 
-async def train_lstm(db: AsyncSession, symbol: str, timeframe: str) -> Dict[str, Any]:
+def fit_lstm(df: pd.DataFrame, symbol: str, timeframe: str, stream: Optional[bool] = None) -> Dict[str, Any]:
     """
-    Skeleton:
-    - loads candles
-    - tries to train a simple LSTM if TF available
-    - saves artifact
-    - registers active model
+    Fit + save an LSTM artifact from an already loaded candle frame (no DB).
+
+    Windows are strided views over the returns series (no per-window copies).
+    With `stream` (auto-enabled above STREAM_MIN_SAMPLES) batches are cut by
+    tf.data on the fly, so the full (n, window, 1) tensor is never built.
     """
-    df = await load_candles_df(db, symbol, timeframe, limit=8000)
     if len(df) < 1500:
         return {"ok": False, "reason": "not_enough_data"}
 
     try:
-        import numpy as np
         import tensorflow as tf
         from tensorflow.keras import layers, models
     except Exception as e:
@@ -34,23 +35,31 @@ async def train_lstm(db: AsyncSession, symbol: str, timeframe: str) -> Dict[str,
 
     # very simple supervised: predict next return sign
     close = df["close"].astype(float).values
-    ret = (pd.Series(close).pct_change().fillna(0.0)).values
+    ret = (pd.Series(close).pct_change().fillna(0.0)).values.astype("float32")
 
     window = 64
-    X, y = [], []
-    for i in range(window, len(ret) - 1):
-        X.append(ret[i-window:i])
-        # 3-class: sell/hold/buy
-        r = ret[i+1]
-        if r > 0.0008:
-            y.append(2)  # buy
-        elif r < -0.0008:
-            y.append(0)  # sell
-        else:
-            y.append(1)  # hold
-
-    X = np.array(X, dtype="float32")[..., None]  # (n, window, 1)
-    y = tf.keras.utils.to_categorical(np.array(y, dtype="int32"), num_classes=3)
+    # 3-class: 0 sell / 1 hold / 2 buy
+    X, y = return_sequences(ret, window, thr=0.0008)
+    n = int(len(y))
+    if stream is None:
+        stream = n >= STREAM_MIN_SAMPLES
+
+    batch_size = 128
+    if stream:
+        data = tf.keras.utils.timeseries_dataset_from_array(
+            ret[:n + window - 1, None],
+            y,
+            sequence_length=window,
+            batch_size=batch_size,
+        )
+        data = data.map(lambda xb, yb: (xb, tf.one_hot(yb, 3))).prefetch(tf.data.AUTOTUNE)
+        fit_args = {"x": data}
+    else:
+        fit_args = {
+            "x": X[..., None],  # (n, window, 1)
+            "y": tf.keras.utils.to_categorical(y, num_classes=3),
+            "batch_size": batch_size,
+        }
 
     model = models.Sequential([
         layers.Input(shape=(window, 1)),
@@ -59,15 +68,38 @@ async def train_lstm(db: AsyncSession, symbol: str, timeframe: str) -> Dict[str,
         layers.Dense(3, activation="softmax")
     ])
     model.compile(optimizer="adam", loss="categorical_crossentropy", metrics=["accuracy"])
-    hist = model.fit(X, y, epochs=3, batch_size=128, verbose=0)
+    hist = model.fit(epochs=3, verbose=0, **fit_args)
 
     os.makedirs(ARTIFACT_DIR, exist_ok=True)
     path = os.path.join(ARTIFACT_DIR, f"lstm_{symbol}_{timeframe}.keras")
     model.save(path)
 
     metrics = {
-        "samples": int(len(X)),
+        "samples": n,
+        "window": window,
+        "n_features": 1,
+        "streamed": bool(stream),
         "acc": float(hist.history["accuracy"][-1]) if "accuracy" in hist.history else None,
     }
-    await register_model(db, "lstm", symbol, timeframe, path, metrics)
-    return {"ok": True, "artifact": path, "metrics": metrics}
\ No newline at end of file
+    return {"ok": True, "artifact": path, "metrics": metrics}
+
+
+async def train_lstm(
+    db: AsyncSession,
+    symbol: str,
+    timeframe: str,
+    limit: int = 8000,
+    stream: Optional[bool] = None,
+) -> Dict[str, Any]:
+    """
+    Skeleton:
+    - loads candles
+    - tries to train a simple LSTM if TF available (see fit_lstm)
+    - saves artifact
+    - registers active model
+    """
+    df = await load_candles_df(db, symbol, timeframe, limit=limit)
+    res = fit_lstm(df, symbol, timeframe, stream=stream)
+    if res["ok"]:
+        await register_model(db, "lstm", symbol, timeframe, res["artifact"], res["metrics"])
+    return res
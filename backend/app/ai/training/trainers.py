@@ -3,9 +3,11 @@ import json
 import time
 import joblib
 import pandas as pd
+from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, desc
 
+from app.core.config import settings
 from app.models.candle import Candle
 from app.models.model_registry import ModelRegistry
 from app.models.model_training_run import ModelTrainingRun
@@ -15,19 +17,52 @@ from app.ai.training.dataset import build_labels, to_multiclass
 
 ARTIFACT_DIR = os.getenv("MODEL_ARTIFACT_DIR", "model_artifacts")
 
+_CANDLE_COLUMNS = ["time", "open", "high", "low", "close", "volume"]
+
+
+def _candle_cols():
+    t = Candle.__table__
+    return [t.c.time, t.c.open, t.c.high, t.c.low, t.c.close, t.c.volume]
+
+
+def _frame(rows) -> pd.DataFrame:
+    # Core rows -> frame; no ORM entities
+    return pd.DataFrame([tuple(r) for r in rows], columns=_CANDLE_COLUMNS)
+
+
 async def load_candles_df(db: AsyncSession, symbol: str, timeframe: str, limit: int = 5000) -> pd.DataFrame:
-    q = (
-        select(Candle)
-        .where((Candle.symbol == symbol) & (Candle.timeframe == timeframe))
-        .order_by(desc(Candle.time))
-        .limit(limit)
-    )
-    rows = (await db.execute(q)).scalars().all()
-    rows = list(reversed(rows))
-    df = pd.DataFrame([{
-        "time": r.time, "open": r.open, "high": r.high, "low": r.low, "close": r.close, "volume": r.volume
-    } for r in rows])
-    return df
+    """
+    Newest `limit` candles, oldest first. History comes from the Arrow archive
+    when there is one (memory-mapped, no OLTP reads); Postgres only serves the
+    bars after the archive's last one.
+    """
+    archived = None
+    if getattr(settings, "CANDLE_ARCHIVE_READS", True):
+        from app.market_data.archive import archive_available, read_candles_df
+
+        if archive_available():
+            archived = read_candles_df(symbol, timeframe, limit=limit)
+
+    where = (Candle.symbol == symbol) & (Candle.timeframe == timeframe)
+    if archived is not None and len(archived):
+        since = archived["time"].iloc[-1].to_pydatetime()
+        q = select(*_candle_cols()).where(where & (Candle.time > since)).order_by(Candle.time)
+        tail = _frame((await db.execute(q)).all())
+        df = pd.concat([archived, tail], ignore_index=True) if len(tail) else archived
+        return df.tail(limit).reset_index(drop=True)
+
+    q = select(*_candle_cols()).where(where).order_by(desc(Candle.time)).limit(limit)
+    rows = (await db.execute(q)).all()
+    return _frame(list(reversed(rows)))
+
+async def load_candles_since(db: AsyncSession, symbol: str, timeframe: str, since, lookback: int = 200) -> pd.DataFrame:
+    # bars after `since` plus `lookback` older bars of feature warm-up context
+    where = (Candle.symbol == symbol) & (Candle.timeframe == timeframe)
+    newer = select(*_candle_cols()).where(where & (Candle.time > since)).order_by(Candle.time)
+    older = select(*_candle_cols()).where(where & (Candle.time <= since)).order_by(desc(Candle.time)).limit(lookback)
+    rows = list(reversed((await db.execute(older)).all()))
+    rows += (await db.execute(newer)).all()
+    return _frame(rows)
 
 async def register_model(db: AsyncSession, model_type: str, symbol: str, timeframe: str, artifact_path: str, metrics: dict) -> None:
     # deactivate previous active
@@ -53,12 +88,14 @@ async def register_model(db: AsyncSession, model_type: str, symbol: str, timefra
     db.add(reg)
     await db.commit()
 
-async def train_xgb(db: AsyncSession, symbol: str, timeframe: str) -> dict:
-    df = await load_candles_df(db, symbol, timeframe)
+def fit_xgb(df: pd.DataFrame, symbol: str, timeframe: str, n_jobs: Optional[int] = None) -> dict:
+    """Fit + save an XGBoost artifact from an already loaded candle frame (no DB)."""
     if len(df) < 800:
         return {"ok": False, "reason": "not_enough_data"}
 
     model = XGBoostModel()
+    if n_jobs:
+        model.model.set_params(n_jobs=int(n_jobs))
     X = model.extract_features(df).dropna()
     y = build_labels(df.loc[X.index]).loc[X.index]
     y_mc = to_multiclass(y)
@@ -71,15 +108,16 @@ async def train_xgb(db: AsyncSession, symbol: str, timeframe: str) -> dict:
     joblib.dump({"model": model.model, "feature_names": list(X.columns)}, path)
 
     metrics = {"samples": int(len(X))}
-    await register_model(db, "xgboost", symbol, timeframe, path, metrics)
     return {"ok": True, "artifact": path, "metrics": metrics}
 
-async def train_lgbm(db: AsyncSession, symbol: str, timeframe: str) -> dict:
-    df = await load_candles_df(db, symbol, timeframe)
+def fit_lgbm(df: pd.DataFrame, symbol: str, timeframe: str, n_jobs: Optional[int] = None) -> dict:
+    """Fit + save a LightGBM artifact from an already loaded candle frame (no DB)."""
     if len(df) < 800:
         return {"ok": False, "reason": "not_enough_data"}
 
     model = LightGBMModel()
+    if n_jobs:
+        model.model.set_params(n_jobs=int(n_jobs))
     X = model.extract_features(df).dropna()
     y = build_labels(df.loc[X.index]).loc[X.index]
     y_mc = to_multiclass(y)
@@ -92,5 +130,18 @@ async def train_lgbm(db: AsyncSession, symbol: str, timeframe: str) -> dict:
     joblib.dump({"model": model.model, "feature_names": list(X.columns)}, path)
 
     metrics = {"samples": int(len(X))}
-    await register_model(db, "lightgbm", symbol, timeframe, path, metrics)
-    return {"ok": True, "artifact": path, "metrics": metrics}
\ No newline at end of file
+    return {"ok": True, "artifact": path, "metrics": metrics}
+
+async def train_xgb(db: AsyncSession, symbol: str, timeframe: str) -> dict:
+    df = await load_candles_df(db, symbol, timeframe)
+    res = fit_xgb(df, symbol, timeframe)
+    if res["ok"]:
+        await register_model(db, "xgboost", symbol, timeframe, res["artifact"], res["metrics"])
+    return res
+
+async def train_lgbm(db: AsyncSession, symbol: str, timeframe: str) -> dict:
+    df = await load_candles_df(db, symbol, timeframe)
+    res = fit_lgbm(df, symbol, timeframe)
+    if res["ok"]:
+        await register_model(db, "lightgbm", symbol, timeframe, res["artifact"], res["metrics"])
+    return res
@@ -0,0 +1,112 @@
+"""
+Isolated training processes.
+
+Each training job (or search trial) runs in its own `python -m
+app.ai.training.workers` subprocess:
+- thread caps are set in the child's environment before any ML backend is
+  imported, and an optional address-space cap is applied on start
+- a timeout counts from the moment the job's process starts and kills it,
+  so a stuck fit never outlives its limit
+- plain subprocesses, not multiprocessing, so this works from daemonic
+  Celery prefork workers
+
+The function and its arguments are pickled to the child's stdin and the
+result is pickled back on its stdout (the child's own prints go to stderr).
+"""
+from __future__ import annotations
+
+import os
+import pickle
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any, Callable, Optional, Sequence
+
+BACKEND_DIR = Path(__file__).resolve().parents[3]
+
+THREAD_ENV_VARS = (
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "TF_NUM_INTRAOP_THREADS",
+)
+
+
+class WorkerTimeout(Exception):
+    pass
+
+
+class WorkerFailed(Exception):
+    pass
+
+
+def worker_env(threads: int) -> dict:
+    env = dict(os.environ)
+    for var in THREAD_ENV_VARS:
+        env[var] = str(threads)
+    env["TF_NUM_INTEROP_THREADS"] = "1"
+    env.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+    env["PYTHONPATH"] = os.pathsep.join(p for p in (str(BACKEND_DIR), env.get("PYTHONPATH")) if p)
+    return env
+
+
+def limit_memory(memory_mb: int) -> None:
+    if memory_mb > 0:
+        import resource
+
+        limit = int(memory_mb) * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def run_isolated(
+    fn: Callable[..., Any],
+    args: Sequence[Any] = (),
+    threads: int = 1,
+    memory_mb: int = 0,
+    timeout_s: Optional[float] = None,
+) -> Any:
+    """
+    fn(*args) in a fresh interpreter; fn must be a module-level function.
+    Raises WorkerTimeout (the child is killed) or WorkerFailed.
+    """
+    payload = pickle.dumps((fn, tuple(args), int(memory_mb)), protocol=pickle.HIGHEST_PROTOCOL)
+    try:
+        proc = subprocess.run(
+            [sys.executable, "-m", "app.ai.training.workers"],
+            input=payload,
+            stdout=subprocess.PIPE,
+            cwd=BACKEND_DIR,
+            env=worker_env(threads),
+            timeout=timeout_s,
+        )
+    except subprocess.TimeoutExpired:
+        raise WorkerTimeout(f"killed after {timeout_s}s") from None
+    if proc.returncode != 0:
+        raise WorkerFailed(f"worker exited with code {proc.returncode}")
+    try:
+        ok, value = pickle.loads(proc.stdout)
+    except Exception as e:
+        raise WorkerFailed(f"unreadable worker result: {e}") from None
+    if not ok:
+        raise WorkerFailed(value)
+    return value
+
+
+def _main() -> int:
+    out = os.fdopen(os.dup(1), "wb")
+    os.dup2(2, 1)  # anything the fit prints (Python or C level) goes to stderr
+    fn, args, memory_mb = pickle.load(sys.stdin.buffer)
+    limit_memory(memory_mb)
+    try:
+        result = (True, fn(*args))
+    except MemoryError:
+        result = (False, "memory_limit")
+    except Exception as e:
+        result = (False, f"{type(e).__name__}: {e}")
+    pickle.dump(result, out, protocol=pickle.HIGHEST_PROTOCOL)
+    out.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(_main())
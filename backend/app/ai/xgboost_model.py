@@ -30,14 +30,26 @@ class XGBoostModel:
         self.n_estimators = n_estimators
         self.max_depth = max_depth
         self.learning_rate = learning_rate
-        self.model = None
+        self._model = None
+        self._model_initialized = False
         self.feature_names = None
         self.is_trained = False
-        
-        self._init_model()
+    
+    @property
+    def model(self):
+        """XGBoost estimator, created on first access (keeps the import off startup)"""
+        if self._model is None and not self._model_initialized:
+            self._init_model()
+        return self._model
+    
+    @model.setter
+    def model(self, value):
+        self._model = value
+        self._model_initialized = True
     
     def _init_model(self):
         """Initialize XGBoost model"""
+        self._model_initialized = True
         try:
             import xgboost as xgb
             self.model = xgb.XGBClassifier(
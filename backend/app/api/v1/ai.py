@@ -15,7 +15,7 @@ from ...dxy_guardian.correlation import DXYCorrelationAnalyzer
 
 router = APIRouter(prefix="/ai", tags=["AI System"])
 
-# Global instances
+# Global instances (cheap: member models / ML backends load on first use)
 ensemble = EnsembleFusion()
 scanner = SmartOpportunityScanner(ensemble=ensemble)
 dxy_tracker = DXYTracker()
@@ -1,11 +1,26 @@
+from __future__ import annotations
+
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.connection import get_db
+from app.auth.dependencies import require_trader
+from app.market_data.chart_feed import BridgeError, etag_matches, get_chart_feed, to_chart_candles
 from app.mt5.connector import mt5_connector
 from app.services.settings_service import SettingsService
 
+router = APIRouter()
+
 @router.get("/mt5")
 async def get_mt5_rates(
+    request: Request,
+    response: Response,
     symbol: str = "XAUUSD",
     timeframe: str = "M15",
     count: int = 300,
+    since: Optional[int] = Query(None, description="epoch ms of the newest bar the client holds; returns it and newer bars"),
     db: AsyncSession = Depends(get_db),
     _=Depends(require_trader),
 ):
@@ -16,33 +31,25 @@ async def get_mt5_rates(
     if host:
         mt5_connector.set_endpoint(host, int(port or 9000))
 
-    resp = await mt5_connector.get_rates(symbol=symbol, timeframe=timeframe, count=count, timeout_ms=3500)
-    if isinstance(resp, dict) and resp.get("error"):
-        raise HTTPException(status_code=502, detail=f"MT5 bridge error: {resp.get('error')}")
-
-    # Expect either {"rates":[...]} or list
-    items = resp.get("rates") if isinstance(resp, dict) else resp
-    if not isinstance(items, list):
-        items = resp.get("items") if isinstance(resp, dict) else []
-    if not isinstance(items, list):
-        items = []
-
-    # normalize keys to the frontend chart standard
-    out = []
-    for x in items:
-        if not isinstance(x, dict):
-            continue
-        # common MT5 bridge keys: time/open/high/low/close/tick_volume or volume
-        t = x.get("time") or x.get("timestamp")
-        out.append(
-            {
-                "time": t,
-                "open": x.get("open"),
-                "high": x.get("high"),
-                "low": x.get("low"),
-                "close": x.get("close"),
-                "volume": x.get("tick_volume") or x.get("volume"),
-            }
-        )
-
-    return {"symbol": symbol, "timeframe": timeframe, "count": len(out), "candles": out, "source": "mt5"}
\ No newline at end of file
+    feed = get_chart_feed()
+    try:
+        bars, etag = await feed.query(symbol, timeframe, count, since=since, timeout_ms=3500)
+    except BridgeError as e:
+        raise HTTPException(status_code=502, detail=f"MT5 bridge error: {e}")
+
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+
+    out = to_chart_candles(bars)
+    return {
+        "symbol": symbol,
+        "timeframe": timeframe,
+        "count": len(out),
+        "candles": out,
+        "since": since,
+        # pass back as `since` on the next poll
+        "last": int(bars["time"][-1].astype("int64")) if len(bars) else since,
+        "source": "mt5",
+    }
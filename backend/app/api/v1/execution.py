@@ -1,10 +1,12 @@
 from __future__ import annotations
 
+import uuid
 from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
 
 from fastapi import APIRouter, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, desc, func
+from sqlalchemy import select, desc, func, insert, update, bindparam
 
 from app.database.connection import get_db
 from app.auth.dependencies import require_trader
@@ -24,6 +26,97 @@ async def _apply_runtime_settings(db: AsyncSession) -> None:
         mt5_connector.set_endpoint(host, int(port or 9000))
 
 
+def _position_values(p: Any) -> Optional[Dict[str, Any]]:
+    """Normalize one bridge position into MT5PositionSnapshot column values."""
+    if not isinstance(p, dict):
+        return None
+    ticket = p.get("ticket") or p.get("id") or p.get("position")
+    if ticket is None:
+        return None
+
+    symbol = str(p.get("symbol") or p.get("_symbol") or "")
+    side_raw = str(p.get("type") or p.get("side") or p.get("action") or "").upper()
+    if side_raw in ("0", "BUY", "LONG"):
+        side = "BUY"
+    elif side_raw in ("1", "SELL", "SHORT"):
+        side = "SELL"
+    else:
+        side = side_raw or "UNKNOWN"
+
+    volume = float(p.get("volume") or p.get("lots") or 0.0)
+    open_price = p.get("price_open") or p.get("open_price") or p.get("price")
+    sl = p.get("sl")
+    tp = p.get("tp")
+    profit = p.get("profit")
+    swap = p.get("swap")
+    commission = p.get("commission")
+    magic = p.get("magic")
+    comment = p.get("comment")
+
+    open_time = None
+    t = p.get("time") or p.get("time_open") or p.get("open_time")
+    if isinstance(t, (int, float)):
+        try:
+            open_time = datetime.utcfromtimestamp(int(t))
+        except Exception:
+            open_time = None
+
+    return {
+        "ticket": str(ticket),
+        "symbol": symbol,
+        "side": side,
+        "volume": float(volume),
+        "open_price": float(open_price) if open_price is not None else None,
+        "sl": float(sl) if sl is not None else None,
+        "tp": float(tp) if tp is not None else None,
+        "profit": float(profit) if profit is not None else None,
+        "swap": float(swap) if swap is not None else None,
+        "commission": float(commission) if commission is not None else None,
+        "open_time": open_time,
+        "magic": str(magic) if magic is not None else None,
+        "comment": str(comment) if comment is not None else None,
+        "raw": p,
+    }
+
+
+async def _upsert_positions(db: AsyncSession, account_id: Optional[str], rows: List[Dict[str, Any]]) -> int:
+    """
+    Upsert snapshots in three statements regardless of position count:
+    one lookup of existing tickets, one multi-row INSERT (client-side UUIDs),
+    one executemany UPDATE. account_id may be NULL, so ON CONFLICT can't be used.
+    """
+    if not rows:
+        return 0
+
+    t = MT5PositionSnapshot.__table__
+    account_match = t.c.account_id.is_(None) if account_id is None else (t.c.account_id == account_id)
+    q = select(t.c.ticket, t.c.id).where(account_match & t.c.ticket.in_([r["ticket"] for r in rows]))
+    existing = {ticket: row_id for ticket, row_id in (await db.execute(q)).all()}
+
+    now = datetime.utcnow()
+    new_rows = [
+        {**r, "id": uuid.uuid4(), "account_id": account_id, "created_at": now, "updated_at": now}
+        for r in rows if r["ticket"] not in existing
+    ]
+    if new_rows:
+        await db.execute(insert(t).values(new_rows))
+
+    updates = [
+        {**{f"v_{k}": v for k, v in r.items() if k != "ticket"}, "b_id": existing[r["ticket"]]}
+        for r in rows if r["ticket"] in existing
+    ]
+    if updates:
+        cols = [k for k in rows[0] if k != "ticket"]
+        set_ = {k: bindparam(f"v_{k}") for k in cols}
+        # an empty symbol from the bridge keeps the stored one
+        set_["symbol"] = func.coalesce(func.nullif(bindparam("v_symbol"), ""), t.c.symbol)
+        set_["updated_at"] = now
+        stmt = update(t).where(t.c.id == bindparam("b_id")).values(**set_)
+        await db.execute(stmt, updates)
+
+    return len(rows)
+
+
 @router.get("/health")
 async def execution_health(db: AsyncSession = Depends(get_db), user=Depends(require_trader)):
     await _apply_runtime_settings(db)
@@ -44,7 +137,11 @@ async def execution_health(db: AsyncSession = Depends(get_db), user=Depends(requ
     bad = int((await db.execute(q_bad)).scalar_one() or 0)
 
     return {
-        "bridge": {"connected": bool(getattr(mt5_connector, "connected", False)), "ping": ping},
+        "bridge": {
+            "connected": bool(getattr(mt5_connector, "connected", False)),
+            "ping": ping,
+            "lanes": mt5_connector.lane_stats(),
+        },
         "last_hour": {"total": total, "success": ok, "bad": bad, "success_rate": (ok / total) if total else None},
     }
 
@@ -104,67 +201,14 @@ async def mt5_sync_positions(db: AsyncSession = Depends(get_db), user=Depends(re
     if not isinstance(items, list):
         items = []
 
-    upserted = 0
+    # last report wins if the bridge repeats a ticket
+    by_ticket: Dict[str, Dict[str, Any]] = {}
     for p in items:
-        if not isinstance(p, dict):
-            continue
-        ticket = p.get("ticket") or p.get("id") or p.get("position")
-        if ticket is None:
-            continue
-        ticket_s = str(ticket)
-
-        symbol = str(p.get("symbol") or p.get("_symbol") or "")
-        side_raw = str(p.get("type") or p.get("side") or p.get("action") or "").upper()
-        if side_raw in ("0", "BUY", "LONG"):
-            side = "BUY"
-        elif side_raw in ("1", "SELL", "SHORT"):
-            side = "SELL"
-        else:
-            side = side_raw or "UNKNOWN"
-
-        volume = float(p.get("volume") or p.get("lots") or 0.0)
-        open_price = p.get("price_open") or p.get("open_price") or p.get("price")
-        sl = p.get("sl")
-        tp = p.get("tp")
-        profit = p.get("profit")
-        swap = p.get("swap")
-        commission = p.get("commission")
-        magic = p.get("magic")
-        comment = p.get("comment")
-
-        open_time = None
-        t = p.get("time") or p.get("time_open") or p.get("open_time")
-        if isinstance(t, (int, float)):
-            try:
-                open_time = datetime.utcfromtimestamp(int(t))
-            except Exception:
-                open_time = None
-
-        q = select(MT5PositionSnapshot).where(
-            (MT5PositionSnapshot.ticket == ticket_s) & (MT5PositionSnapshot.account_id == account_id)
-        )
-        existing = (await db.execute(q)).scalar_one_or_none()
-
-        if not existing:
-            existing = MT5PositionSnapshot(account_id=account_id, ticket=ticket_s)
-            db.add(existing)
-
-        existing.symbol = symbol or existing.symbol
-        existing.side = side or existing.side
-        existing.volume = float(volume)
-        existing.open_price = float(open_price) if open_price is not None else None
-        existing.sl = float(sl) if sl is not None else None
-        existing.tp = float(tp) if tp is not None else None
-        existing.profit = float(profit) if profit is not None else None
-        existing.swap = float(swap) if swap is not None else None
-        existing.commission = float(commission) if commission is not None else None
-        existing.open_time = open_time
-        existing.magic = str(magic) if magic is not None else None
-        existing.comment = str(comment) if comment is not None else None
-        existing.raw = p
-
-        upserted += 1
+        values = _position_values(p)
+        if values is not None:
+            by_ticket[values["ticket"]] = values
 
+    upserted = await _upsert_positions(db, account_id, list(by_ticket.values()))
     await db.commit()
     return {"ok": True, "upserted": upserted, "account_id": account_id}
 
@@ -3,19 +3,10 @@ from datetime import datetime, timedelta
 import random
 
 from app.auth.dependencies import require_trader
+from app.market_data.resample import TIMEFRAME_MINUTES as _TF_MINUTES
 
 router = APIRouter()
 
-_TF_MINUTES = {
-    "M1": 1,
-    "M5": 5,
-    "M15": 15,
-    "M30": 30,
-    "H1": 60,
-    "H4": 240,
-    "D1": 1440,
-}
-
 @router.get("/historical")
 async def historical(
     symbol: str = "EURUSD",
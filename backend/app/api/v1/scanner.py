@@ -1,25 +1,123 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+from typing import Optional
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, WebSocket
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, desc
 
 from app.database.connection import get_db
 from app.auth.dependencies import require_trader
+from app.auth.models import User
+from app.core.security import security_manager
 from app.models.trading_signal import TradingSignal
 from app.core.trading_engine import TradingEngine
 from app.scanner.opportunity_scanner import SmartOpportunityScanner
 from app.scanner.execution_service import ScannerExecutionService
+from app.scanner.streaming import sse_event
+from app.market_data.candle_store import default_store
 
 router = APIRouter(prefix="/scanner", tags=["scanner"])
 
 _engine = TradingEngine()
-_scanner = SmartOpportunityScanner(_engine)
+_scanner = SmartOpportunityScanner(_engine, store=default_store())
 
 
 @router.post("/run")
-async def run_scan(db: AsyncSession = Depends(get_db), user=Depends(require_trader)):
-    return await _scanner.scan_once(db=db, user_id=str(user.id))
+async def run_scan(force: bool = False, db: AsyncSession = Depends(get_db), user=Depends(require_trader)):
+    return await _scanner.scan_once(db=db, user_id=str(user.id), force=force)
+
+
+@router.get("/run/stream")
+async def run_scan_stream(force: bool = False, user=Depends(require_trader)):
+    """Same scan as POST /run, streamed as Server-Sent Events (result / topk / done)."""
+    user_id = str(user.id)
+
+    async def events():
+        # own session: request-scoped dependencies are closed before the body streams
+        async with _scanner.session_factory() as db:
+            async for ev in _scanner.scan_stream(db, user_id=user_id, force=force):
+                yield sse_event(ev)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _ws_user(token: Optional[str]) -> Optional[User]:
+    """Browsers can't set headers on a WebSocket, so the access token comes as ?token=."""
+    payload = security_manager.decode_token(token) if token else None
+    if not payload or payload.get("type") != "access":
+        return None
+    try:
+        user_id = UUID(str(payload.get("sub")))
+    except ValueError:
+        return None
+    async with _scanner.session_factory() as db:
+        user = await db.get(User, user_id)
+    if user is None or not user.is_active or user.role not in require_trader.allowed_roles:
+        return None
+    return user
+
+
+@router.websocket("/ws")
+async def scanner_ws(websocket: WebSocket, token: Optional[str] = None):
+    """
+    Live scanner feed. Pushes this user's top-k changes and scan completions
+    (from scans run by this API process); sending {"action": "scan", "force": bool}
+    starts a scan whose per-pair results are streamed as well.
+    """
+    user = await _ws_user(token)
+    if user is None:
+        await websocket.close(code=1008)
+        return
+    await websocket.accept()
+    user_id = str(user.id)
+
+    async def scan(force: bool) -> None:
+        async with _scanner.session_factory() as db:
+            async for ev in _scanner.scan_stream(db, user_id=user_id, force=force):
+                # topk / done reach the socket through the hub
+                if ev["type"] == "result":
+                    await websocket.send_json(ev)
+
+    async def forward(q: asyncio.Queue) -> None:
+        while True:
+            ev = await q.get()
+            if ev.get("user_id") == user_id:
+                await websocket.send_json(ev)
+
+    async def receive() -> None:
+        running: Optional[asyncio.Task] = None
+        try:
+            while True:
+                msg = await websocket.receive_json()
+                if msg.get("action") == "scan" and (running is None or running.done()):
+                    running = asyncio.create_task(scan(bool(msg.get("force", False))))
+        finally:
+            if running is not None and not running.done():
+                running.cancel()
+
+    async with _scanner.hub.subscribe() as q:
+        tasks = [asyncio.create_task(forward(q)), asyncio.create_task(receive())]
+        try:
+            # either side ending (disconnect, send failure) ends the session
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+@router.get("/stats")
+async def scanner_stats(user=Depends(require_trader)):
+    # analyzed vs skipped (carried-forward) pairs since process start
+    return _scanner.stats()
 
 
 @router.get("/recent")
@@ -54,6 +54,20 @@ class Settings(BaseSettings):
     # -----------------------------
     MT5_HOST: str = "localhost"
     MT5_PORT: int = 9000
+    # dealer: concurrent requests matched by id (works with REP and ROUTER bridges)
+    # req: one request at a time
+    MT5_TRANSPORT: str = "dealer"
+    # orders/pings use their own connection; set when the bridge serves them on a separate port
+    MT5_ORDER_PORT: int = 0
+    # RATES / GET_POSITIONS requests outstanding at once; further reads wait in the client
+    MT5_BULK_MAX_IN_FLIGHT: int = 2
+    # successful RATES / GET_POSITIONS replies are reused this long by identical
+    # requests (0: only calls already in flight are shared)
+    MT5_READ_COALESCE_TTL_MS: int = 0
+    # subscribe to the bridge's pushed ticks / closed bars (PUB socket on MT5_PUB_PORT);
+    # polling stays on as the fallback
+    MT5_PUB_ENABLED: bool = False
+    MT5_PUB_PORT: int = 9001
 
     # -----------------------------
     # Telegram
@@ -80,6 +94,85 @@ class Settings(BaseSettings):
     EXEC_MAX_LATENCY_MS: int = 1500
     EXEC_MAX_SLIPPAGE: float = 2.5
 
+    # -----------------------------
+    # Scanner
+    # -----------------------------
+    # (symbol, timeframe) pairs analyzed concurrently by the opportunity scanner
+    SCANNER_CONCURRENCY: int = 6
+    # >1 splits each beat scan into Celery shard tasks merged by a chord
+    SCANNER_SHARDS: int = 0
+    # same symbols -> same shard queue (run workers with -Q scanner.shard.<i>)
+    SCANNER_SHARD_AFFINITY: bool = True
+    SCANNER_SHARD_QUEUE_PREFIX: str = "scanner.shard."
+    # auto-select ignores pairs no scan has confirmed within this many minutes
+    SCANNER_SIGNAL_MAX_AGE_MINUTES: int = 10
+
+    # -----------------------------
+    # Candle ingestion (MT5 bridge -> candles)
+    # -----------------------------
+    # empty -> the scanner universe timeframes
+    CANDLE_INGEST_TIMEFRAMES: str = "M1,M5,M15,M30,H1,H4,D1"
+    # bars fetched for a pair with nothing stored yet
+    CANDLE_INGEST_BACKFILL: int = 500
+    # poll this long after a bar boundary, then back off from RETRY_SECONDS
+    CANDLE_INGEST_GRACE_SECONDS: float = 2.0
+    CANDLE_INGEST_RETRY_SECONDS: float = 5.0
+    # resampled from M1 instead of polled (e.g. "M5,M15,M30,H1,H4,D1"); M1 is then
+    # polled for every symbol and the derived bars are written alongside it
+    CANDLE_INGEST_DERIVED_TIMEFRAMES: str = ""
+    # bar boundaries in minutes from 00:00 UTC: D1/H4 bars open at the session
+    # start (-120 for a 22:00 UTC day); must match the broker's server time
+    CANDLE_SESSION_OFFSET_MIN: int = 0
+
+    # -----------------------------
+    # In-memory candle store (per process)
+    # -----------------------------
+    CANDLE_STORE_ENABLED: bool = True
+    # bars kept per (symbol, timeframe); each bar costs 96 bytes (two ring copies)
+    CANDLE_STORE_CAPACITY: int = 2000
+    # least recently used pairs are dropped beyond this
+    CANDLE_STORE_MAX_MB: float = 64
+    # fill the API process's store from the candles table at startup (background)
+    CANDLE_STORE_WARMUP: bool = True
+    # bars re-read per pair to top up a warm ring (covers bars missed between scans)
+    CANDLE_STORE_TOPUP_BARS: int = 8
+    # serve rings from shared memory written by the candle ingestor (one writer per
+    # node); API/Celery processes read them in place. Containers need a shared IPC namespace.
+    CANDLE_STORE_SHARED: bool = False
+    CANDLE_STORE_SHM_PREFIX: str = "rx_candles_"
+
+    # chart polls (/candles/mt5) within this many seconds of the last bridge
+    # call for a pair are answered from memory
+    CANDLE_API_REFRESH_SECONDS: float = 1.0
+
+    # -----------------------------
+    # Candle archive (Arrow IPC, symbol/timeframe/month)
+    # -----------------------------
+    CANDLE_ARCHIVE_DIR: str = "data/candles"
+    # training loads read history from the archive and only the tail from Postgres
+    CANDLE_ARCHIVE_READS: bool = True
+
+    # -----------------------------
+    # AI models
+    # -----------------------------
+    # TF/XGBoost/LightGBM are imported lazily on first use; set this to
+    # build the ensemble in a background thread right after startup instead.
+    AI_WARMUP_ON_STARTUP: bool = False
+
+    # Universe training orchestrator (process pool)
+    TRAIN_MAX_WORKERS: int = 0          # 0 => cpu_count // TRAIN_THREADS_PER_JOB
+    TRAIN_THREADS_PER_JOB: int = 2
+    TRAIN_JOB_MEMORY_MB: int = 0        # 0 => no RLIMIT_AS cap
+    TRAIN_JOB_TIMEOUT_S: int = 900
+    TRAIN_INCREMENTAL: bool = True      # warm-start boosted models from the active booster
+    TRAIN_FULL_REFIT_EVERY: int = 7     # full refit after this many incremental runs
+    TRAIN_INCREMENTAL_ROUNDS: int = 25  # trees added per incremental run
+    TRAIN_HOLDOUT_TOLERANCE: float = 0.01
+    TUNE_N_TRIALS: int = 16             # hyperparameter search configs per model
+    TUNE_CV_FOLDS: int = 4              # purged time-series CV folds
+    TUNE_MAX_ROUNDS: int = 200          # tree cap (the old fixed count); early stopping picks fewer
+    TUNE_EARLY_STOPPING_ROUNDS: int = 30
+
     # -----------------------------
     # AI Guardian
     # -----------------------------
@@ -96,27 +96,84 @@ class TradingEngine:
         timeframe: Optional[str] = None,
         extra_context: Optional[Dict[str, Any]] = None,
         db: Optional[AsyncSession] = None,
+        offload: bool = False,
     ) -> Dict[str, Any]:
         """
         Run full market analysis.
         Updated:
           - Accept timeframe/db for AI registry inference
           - Pass context into AdaptiveStrategyRouter (AI-aware scoring)
+          - offload=True runs the CPU-bound analyzers in a worker thread
+            (concurrent callers such as the opportunity scanner)
         """
-        # Initialize analyzers
-        self.smc = SMCAnalyzer(data)
-        self.volume_profile = VolumeProfileAnalyzer(data)
-        self.price_action = PriceActionAnalyzer(data)
+        if offload:
+            core = await asyncio.to_thread(self._run_analyzers, data, symbol)
+        else:
+            core = self._run_analyzers(data, symbol)
+
+        # Keep the last analyzers around for callers that inspect them
+        self.smc = core["smc_analyzer"]
+        self.volume_profile = core["vp_analyzer"]
+        self.price_action = core["pa_analyzer"]
+
+        smc_result = core["smc"]
+        vp_result = core["volume_profile"]
+        pa_result = core["price_action"]
+        kz_result = core["kill_zone"]
+        feats = core["features"]
+
+        # Build router context (db/timeframe included)
+        context: Dict[str, Any] = {
+            "timeframe": timeframe,
+            "db": db,
+            "closes": core["closes"],
+            "extra_context": extra_context or {},
+            "kill_zone": kz_result,
+            "smc": smc_result,
+            "volume_profile": vp_result,
+            "price_action": pa_result,
+        }
+
+        # Enhance signal using Adaptive Router (AI registry inference)
+        enhanced_signal = await self.router.enhance_signal(
+            base_signal=core["base_signal"],
+            symbol=symbol,
+            timeframe=str(timeframe or "M15"),
+            features=feats,
+            context=context,
+        )
+
+        return {
+            "symbol": symbol,
+            "timeframe": timeframe,
+            "timestamp": datetime.utcnow().isoformat(),
+            "signal": enhanced_signal,
+            "smc": smc_result,
+            "volume_profile": vp_result,
+            "price_action": pa_result,
+            "kill_zone": kz_result,
+            "features": dict(feats),
+        }
+
+    def _run_analyzers(self, data: List[dict], symbol: str) -> Dict[str, Any]:
+        """
+        CPU-bound part of analyze_market. Uses its own analyzer instances
+        (not self.smc & co.), so concurrent calls from threads don't interfere.
+        """
+        smc = SMCAnalyzer(data)
+        volume_profile = VolumeProfileAnalyzer(data)
+        price_action = PriceActionAnalyzer(data)
 
         # Run all analyses
-        smc_result = self.smc.analyze()
-        vp_result = self.volume_profile.calculate()
-        pa_result = self.price_action.analyze()
+        smc_result = smc.analyze()
+        vp_result = volume_profile.calculate()
+        pa_result = price_action.analyze()
         kz_result = self.kill_zones.should_trade()
 
         # Base signal (SMC/VP/PA/KZ)
         base_signal = self._generate_signal(
-            smc_result, vp_result, pa_result, kz_result, symbol
+            smc_result, vp_result, pa_result, kz_result, symbol,
+            smc_analyzer=smc, vp_analyzer=volume_profile,
         )
 
         # Build minimal features from candles for AI inference
@@ -142,36 +199,17 @@ class TradingEngine:
             "bb_width": _bb_width(closes, period=20, k=2.0),
         })
 
-        # Build router context (db/timeframe included)
-        context: Dict[str, Any] = {
-            "timeframe": timeframe,
-            "db": db,
-            "extra_context": extra_context or {},
-            "kill_zone": kz_result,
-            "smc": smc_result,
-            "volume_profile": vp_result,
-            "price_action": pa_result,
-        }
-
-        # Enhance signal using Adaptive Router (AI registry inference)
-        enhanced_signal = await self.router.enhance_signal(
-            base_signal=base_signal,
-            symbol=symbol,
-            timeframe=str(timeframe or "M15"),
-            features=feats,
-            context=context,
-        )
-
         return {
-            "symbol": symbol,
-            "timeframe": timeframe,
-            "timestamp": datetime.utcnow().isoformat(),
-            "signal": enhanced_signal,
+            "smc_analyzer": smc,
+            "vp_analyzer": volume_profile,
+            "pa_analyzer": price_action,
             "smc": smc_result,
             "volume_profile": vp_result,
             "price_action": pa_result,
             "kill_zone": kz_result,
-            "features": dict(feats),
+            "base_signal": base_signal,
+            "features": feats,
+            "closes": closes,
         }
 
     def _generate_signal(
@@ -180,11 +218,18 @@ class TradingEngine:
         vp: Optional[object],
         pa: Dict,
         kz: Dict,
-        symbol: str
+        symbol: str,
+        smc_analyzer: Optional[SMCAnalyzer] = None,
+        vp_analyzer: Optional[VolumeProfileAnalyzer] = None,
     ) -> Dict:
         """
         Generate trading signal from all analyses (base score).
+        Analyzers default to the ones stored on the engine.
         """
+        smc_analyzer = smc_analyzer or self.smc
+        vp_analyzer = vp_analyzer or self.volume_profile
+        data = smc_analyzer.data if smc_analyzer else None
+
         if not kz.get("can_trade", False):
             return {
                 "action": "WAIT",
@@ -215,8 +260,8 @@ class TradingEngine:
 
         # Volume Profile Score
         if vp:
-            price_position = self.volume_profile.get_price_position(
-                self.smc.data[-1]['close'] if self.smc.data else 0
+            price_position = vp_analyzer.get_price_position(
+                data[-1]['close'] if data else 0
             )
             if price_position == "below_value_area":
                 score += 20
@@ -253,9 +298,9 @@ class TradingEngine:
             "confidence": confidence,
             "score": score,
             "reasons": reasons,
-            "entry_price": self.smc.data[-1]['close'] if self.smc.data else None,
-            "suggested_sl": self._calculate_sl(action, smc),
-            "suggested_tp": self._calculate_tp(action, smc),
+            "entry_price": data[-1]['close'] if data else None,
+            "suggested_sl": self._calculate_sl(action, smc, data),
+            "suggested_tp": self._calculate_tp(action, smc, data),
             "kill_zone": kz,
             "adaptive": {
                 "base_score": score,
@@ -274,12 +319,14 @@ class TradingEngine:
             return "SELL"
         return "NEUTRAL"
 
-    def _calculate_sl(self, action: str, smc: Dict) -> Optional[float]:
+    def _calculate_sl(self, action: str, smc: Dict, data: Optional[List[dict]] = None) -> Optional[float]:
         """Calculate suggested stop loss"""
-        if not self.smc or not self.smc.data:
+        if data is None:
+            data = self.smc.data if self.smc else None
+        if not data:
             return None
 
-        current_price = self.smc.data[-1]['close']
+        current_price = data[-1]['close']
 
         if "BUY" in action:
             bullish_obs = [ob for ob in smc.get("order_blocks", []) if ob.type.value == "bullish"]
@@ -292,13 +339,15 @@ class TradingEngine:
             return max(ob.high for ob in bearish_obs) + 5
         return current_price * 1.005
 
-    def _calculate_tp(self, action: str, smc: Dict) -> Optional[float]:
+    def _calculate_tp(self, action: str, smc: Dict, data: Optional[List[dict]] = None) -> Optional[float]:
         """Calculate suggested take profit"""
-        if not self.smc or not self.smc.data:
+        if data is None:
+            data = self.smc.data if self.smc else None
+        if not data:
             return None
 
-        current_price = self.smc.data[-1]['close']
-        sl = self._calculate_sl(action, smc)
+        current_price = data[-1]['close']
+        sl = self._calculate_sl(action, smc, data)
         if sl is None:
             return None
 
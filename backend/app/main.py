@@ -1,4 +1,6 @@
 # backend/app/main.py
+import asyncio
+
 from fastapi import FastAPI, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
@@ -14,9 +16,30 @@ async def lifespan(app: FastAPI):
     # Startup
     await init_db()
     setup_logging()
+    if getattr(settings, "AI_WARMUP_ON_STARTUP", False):
+        # Build the AI ensemble off the event loop; requests never wait on it
+        from app.api.v1.ai import ensemble
+        app.state.ai_warmup = asyncio.create_task(asyncio.to_thread(ensemble.warm_up))
+    if getattr(settings, "CANDLE_STORE_ENABLED", True) and getattr(settings, "CANDLE_STORE_WARMUP", True):
+        # fill the scanner's candle rings in the background
+        from app.market_data.candle_store import get_candle_store, warm_up_store
+        app.state.candle_warmup = asyncio.create_task(warm_up_store(get_candle_store()))
+    app.state.feed_stop = asyncio.Event()
+    if getattr(settings, "MT5_PUB_ENABLED", False):
+        # price alerts on every pushed tick instead of waiting for a poll
+        from app.market_data.bridge_feed import BridgeSubscriber
+        from app.services.alert_manager import alert_manager
+
+        async def tick_alerts(tick):
+            price = tick["bid"] if tick["bid"] is not None else tick["last"]
+            if price is not None:
+                await alert_manager.check_price_alerts(tick["symbol"], price, tick)
+
+        app.state.bridge_feed = BridgeSubscriber(bars=False, on_tick=[tick_alerts])
+        app.state.bridge_feed_task = asyncio.create_task(app.state.bridge_feed.run_forever(app.state.feed_stop))
     yield
     # Shutdown
-    pass
+    app.state.feed_stop.set()
 
 
 app = FastAPI(
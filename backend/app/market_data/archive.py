@@ -0,0 +1,266 @@
+"""
+Historical candle archive: Arrow IPC files partitioned as
+<CANDLE_ARCHIVE_DIR>/<symbol>/<timeframe>/<YYYY-MM>.arrow
+
+Files are uncompressed Arrow IPC so readers memory-map them: column
+selection and time slicing happen on the mapped buffers, and only the
+final DataFrame / array conversion copies. Months are pruned by file name
+before anything is opened.
+
+export_pair() appends closed candles from Postgres (Core columns, one month
+per query) after the archive's newest bar; the open month's file is
+rewritten atomically, closed months are immutable.
+
+pyarrow is optional: without it, archive_available() is False and callers
+stay on the database.
+"""
+from __future__ import annotations
+
+import datetime
+import logging
+import os
+import re
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings as app_settings
+from app.models.candle import Candle
+from app.scanner.candles import OHLCV, Pair
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ("time",) + OHLCV
+_MONTH_FILE = re.compile(r"^(\d{4})-(\d{2})\.arrow$")
+
+
+def archive_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def archive_dir() -> str:
+    return str(getattr(app_settings, "CANDLE_ARCHIVE_DIR", "data/candles"))
+
+
+def _safe(part: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]", "_", part)
+
+
+def pair_dir(symbol: str, timeframe: str, root: Optional[str] = None) -> str:
+    return os.path.join(root or archive_dir(), _safe(symbol), _safe(timeframe))
+
+
+def _month_start(t: datetime.datetime) -> datetime.datetime:
+    return datetime.datetime(t.year, t.month, 1)
+
+
+def _next_month(t: datetime.datetime) -> datetime.datetime:
+    return datetime.datetime(t.year + (t.month == 12), t.month % 12 + 1, 1)
+
+
+def partitions(symbol: str, timeframe: str, root: Optional[str] = None) -> List[Tuple[datetime.datetime, str]]:
+    """(month start, path) of every partition of a pair, oldest first."""
+    d = pair_dir(symbol, timeframe, root)
+    if not os.path.isdir(d):
+        return []
+    out = []
+    for name in os.listdir(d):
+        m = _MONTH_FILE.match(name)
+        if m:
+            out.append((datetime.datetime(int(m.group(1)), int(m.group(2)), 1), os.path.join(d, name)))
+    return sorted(out)
+
+
+# ---------------------------------------------------------------------------
+# Reading
+# ---------------------------------------------------------------------------
+
+def _read_partition(path: str, columns: Sequence[str]):
+    import pyarrow as pa
+
+    # memory_map + IPC file: record batches point into the mapping, no read() copy
+    with pa.memory_map(path, "r") as source:
+        table = pa.ipc.open_file(source).read_all()
+    return table.select(list(columns))
+
+
+def _slice_time(table, start: Optional[datetime.datetime], end: Optional[datetime.datetime]):
+    if start is None and end is None:
+        return table
+    times = table.column("time").to_numpy()  # datetime64[ms]; sorted within a partition
+    lo = 0 if start is None else int(np.searchsorted(times, np.datetime64(start, "ms"), side="left"))
+    hi = len(times) if end is None else int(np.searchsorted(times, np.datetime64(end, "ms"), side="left"))
+    return table.slice(lo, max(0, hi - lo))
+
+
+def read_table(
+    symbol: str,
+    timeframe: str,
+    start: Optional[datetime.datetime] = None,
+    end: Optional[datetime.datetime] = None,
+    columns: Optional[Sequence[str]] = None,
+    limit: Optional[int] = None,
+    root: Optional[str] = None,
+):
+    """
+    Arrow table of bars with start <= time < end, oldest first. limit keeps
+    the newest `limit` bars and stops opening partitions once it has them.
+    Returns None when the pair has no archive.
+    """
+    import pyarrow as pa
+
+    cols = list(dict.fromkeys(["time", *(columns or COLUMNS)]))
+    parts = [
+        (month, path) for month, path in partitions(symbol, timeframe, root)
+        if (end is None or month < end) and (start is None or _next_month(month) > start)
+    ]
+    if not parts:
+        return None
+
+    tables = []
+    held = 0
+    for month, path in reversed(parts):
+        t = _slice_time(_read_partition(path, cols), start, end)
+        tables.append(t)
+        held += t.num_rows
+        if limit is not None and held >= limit:
+            break
+    table = pa.concat_tables(list(reversed(tables)))
+    if limit is not None and table.num_rows > limit:
+        table = table.slice(table.num_rows - limit)
+    return table
+
+
+def read_arrays(symbol: str, timeframe: str, **kwargs) -> Optional[Dict[str, np.ndarray]]:
+    """read_table() as NumPy columns (CandleArrays when all columns are read)."""
+    table = read_table(symbol, timeframe, **kwargs)
+    if table is None:
+        return None
+    return {name: table.column(name).to_numpy() for name in table.column_names}
+
+
+def read_candles_df(symbol: str, timeframe: str, **kwargs) -> Optional[pd.DataFrame]:
+    """read_table() as a DataFrame shaped like trainers.load_candles_df."""
+    table = read_table(symbol, timeframe, **kwargs)
+    if table is None:
+        return None
+    df = table.to_pandas()
+    df["time"] = df["time"].astype("datetime64[ns]")
+    return df
+
+
+def last_archived(symbol: str, timeframe: str, root: Optional[str] = None) -> Optional[datetime.datetime]:
+    parts = partitions(symbol, timeframe, root)
+    for _, path in reversed(parts):
+        times = _read_partition(path, ["time"]).column("time")
+        if len(times):
+            return pd.Timestamp(times[-1].as_py()).to_pydatetime()
+    return None
+
+
+# ---------------------------------------------------------------------------
+# Writing
+# ---------------------------------------------------------------------------
+
+def _to_table(arrays: Dict[str, np.ndarray]):
+    import pyarrow as pa
+
+    return pa.table({
+        "time": pa.array(np.asarray(arrays["time"], dtype="datetime64[ms]"), type=pa.timestamp("ms")),
+        **{name: pa.array(np.asarray(arrays[name], dtype=np.float64)) for name in OHLCV},
+    })
+
+
+def write_partition(path: str, arrays: Dict[str, np.ndarray]) -> int:
+    """Write one month (time-ordered arrays) atomically; returns rows written."""
+    import pyarrow as pa
+
+    table = _to_table(arrays)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with pa.OSFile(tmp, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp, path)
+    return table.num_rows
+
+
+def merge_into_partition(path: str, arrays: Dict[str, np.ndarray]) -> int:
+    """Add bars to a month file, keeping it sorted and unique on time; returns rows added."""
+    new_t = np.asarray(arrays["time"], dtype="datetime64[ms]")
+    if os.path.exists(path):
+        old = {k: v.to_numpy() for k, v in zip(COLUMNS, _read_partition(path, COLUMNS).columns)}
+        keep = ~np.isin(new_t, old["time"])
+        if not keep.any():
+            return 0
+        merged = {k: np.concatenate([old[k], np.asarray(arrays[k])[keep]]) for k in COLUMNS}
+        order = np.argsort(merged["time"], kind="stable")
+        write_partition(path, {k: v[order] for k, v in merged.items()})
+        return int(keep.sum())
+    order = np.argsort(new_t, kind="stable")
+    return write_partition(path, {k: np.asarray(arrays[k])[order] for k in COLUMNS})
+
+
+def _month_query(symbol: str, timeframe: str, lo: datetime.datetime, hi: datetime.datetime):
+    t = Candle.__table__
+    return (
+        select(t.c.time, t.c.open, t.c.high, t.c.low, t.c.close, func.coalesce(t.c.volume, 0.0))
+        .where((t.c.symbol == symbol) & (t.c.timeframe == timeframe) & (t.c.time > lo) & (t.c.time < hi))
+        .order_by(t.c.time)
+    )
+
+
+def _rows_to_arrays(rows: List[Tuple]) -> Dict[str, np.ndarray]:
+    cols = list(zip(*rows))
+    out = {"time": np.array(cols[0], dtype="datetime64[ms]")}
+    for i, name in enumerate(OHLCV, start=1):
+        out[name] = np.array(cols[i], dtype=np.float64)
+    return out
+
+
+async def export_pair(
+    db: AsyncSession,
+    symbol: str,
+    timeframe: str,
+    until: Optional[datetime.datetime] = None,
+    root: Optional[str] = None,
+) -> int:
+    """Archive bars newer than the archive's last bar and older than `until` (default now)."""
+    until = until or datetime.datetime.utcnow()
+    since = last_archived(symbol, timeframe, root)
+    if since is None:
+        t = Candle.__table__
+        first = (await db.execute(
+            select(func.min(t.c.time)).where((t.c.symbol == symbol) & (t.c.timeframe == timeframe))
+        )).scalar()
+        if first is None:
+            return 0
+        since = first - datetime.timedelta(microseconds=1)
+
+    written = 0
+    month = _month_start(since)
+    while month < until:
+        hi = min(_next_month(month), until)
+        lo = max(since, month - datetime.timedelta(microseconds=1))
+        rows = (await db.execute(_month_query(symbol, timeframe, lo, hi))).all()
+        if rows:
+            path = os.path.join(pair_dir(symbol, timeframe, root), f"{month:%Y-%m}.arrow")
+            written += merge_into_partition(path, _rows_to_arrays(rows))
+        month = _next_month(month)
+    return written
+
+
+async def export_universe(db: AsyncSession, pairs: Iterable[Pair], root: Optional[str] = None) -> Dict[str, Any]:
+    out: Dict[str, Any] = {"pairs": 0, "rows": 0}
+    for symbol, tf in pairs:
+        n = await export_pair(db, symbol, tf, root=root)
+        out["pairs"] += 1
+        out["rows"] += n
+    return out
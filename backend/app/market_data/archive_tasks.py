@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+
+from app.services.notification_service import celery_app
+from app.database.connection import get_db
+from app.services.settings_service import SettingsService
+from app.scanner.candles import universe_pairs
+from app.scanner.universe import parse_universe
+from app.market_data.archive import archive_available, export_universe
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(bind=True)
+def archive_candles(self) -> dict:
+    """Append closed candles of the scanner universe to the Arrow archive."""
+    if not archive_available():
+        return {"ok": False, "error": "pyarrow_not_installed"}
+
+    async def _run():
+        async for db in get_db():
+            uni = parse_universe(await SettingsService(db).get("SCANNER_UNIVERSE_JSON"))
+            out = await export_universe(db, universe_pairs(uni))
+            return {"ok": True, **out}
+        return {"ok": False, "error": "db_not_available"}
+
+    try:
+        return asyncio.run(_run())
+    except Exception as e:
+        logger.exception("archive_candles failed: %s", e)
+        return {"ok": False, "error": str(e)}
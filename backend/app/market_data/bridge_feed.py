@@ -0,0 +1,201 @@
+"""
+Pushed market data from the MT5 bridge's PUB socket (MT5_PUB_PORT).
+
+The bridge publishes two-frame messages [topic, json]:
+
+  bar.<SYMBOL>.<TF>  a bar that just closed:
+                     {"seq", "time", "open", "high", "low", "close", "tick_volume"}
+  tick.<SYMBOL>      {"seq", "time", "bid", "ask", "last", "volume"}
+
+`seq` counts up by one per topic. SUB sockets drop messages while
+disconnected or over their high-water mark, so a bar whose seq skips, or
+whose time is more than one bar after the previous one, triggers a RATES
+backfill of the missing bars before it is delivered; handlers always see a
+gap-free series. If the backfill fails the bar is dropped too, so the next
+bar (whose time is then past the gap) retries it. Tick gaps are only counted: the next tick supersedes them.
+
+Consumers register handlers: on_bars(rows) gets candle rows as
+candle_ingest.normalize_rates builds them, on_tick(tick) gets the decoded
+tick. Both may be coroutines; a failing handler is logged and skipped.
+"""
+from __future__ import annotations
+
+import asyncio
+import inspect
+import json
+import logging
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+import zmq
+import zmq.asyncio
+
+from app.core.config import settings as app_settings
+from app.market_data.candle_ingest import _epoch_ms, normalize_rates
+from app.market_data.resample import TIMEFRAME_MINUTES, tf_ms
+from app.scanner.candles import Pair
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[Any], Any]
+
+
+class BridgeSubscriber:
+    def __init__(
+        self,
+        connector=None,
+        port: Optional[int] = None,
+        symbols: Optional[Iterable[str]] = None,
+        bars: bool = True,
+        ticks: bool = True,
+        on_bars: Sequence[Handler] = (),
+        on_tick: Sequence[Handler] = (),
+        last_bar: Optional[Callable[[Pair], Optional[int]]] = None,
+        max_backfill: int = 5000,
+    ):
+        if connector is None:
+            from app.mt5.connector import mt5_connector as connector
+        self.connector = connector
+        self.port = int(port or getattr(app_settings, "MT5_PUB_PORT", 9001))
+        self.symbols = sorted(set(symbols)) if symbols else None
+        self.bars, self.ticks = bars, ticks
+        self.on_bars, self.on_tick = list(on_bars), list(on_tick)
+        # epoch ms of the newest bar a consumer already holds (e.g. the ingestor's
+        # high-water mark), so the first pushed bar can be backfilled against it
+        self.last_bar = last_bar
+        self.max_backfill = max_backfill
+        self._last: Dict[Pair, int] = {}
+        self._seq: Dict[str, int] = {}
+        self._stats = {"bars": 0, "ticks": 0, "duplicates": 0, "gaps": 0, "backfilled": 0,
+                       "dropped": 0, "tick_gaps": 0, "errors": 0}
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(self._stats)
+
+    def topics(self) -> List[bytes]:
+        kinds = [k for k, on in (("bar.", self.bars), ("tick.", self.ticks)) if on]
+        if self.symbols is None:
+            return [k.encode() for k in kinds]
+        # "bar.XAUUSD." so that XAUUSD does not also match XAUUSDm
+        return [f"{k}{s}{'.' if k == 'bar.' else ''}".encode() for k in kinds for s in self.symbols]
+
+    def _seq_skipped(self, topic: str, payload: Dict[str, Any]) -> bool:
+        seq = payload.get("seq")
+        if not isinstance(seq, int):
+            return False
+        prev = self._seq.get(topic)
+        self._seq[topic] = seq
+        return prev is not None and seq != prev + 1
+
+    # ---------------------------------------------------------------------
+    # messages
+    # ---------------------------------------------------------------------
+
+    async def handle(self, topic: str, payload: Dict[str, Any]) -> None:
+        kind, _, rest = topic.partition(".")
+        if kind == "bar":
+            symbol, _, tf = rest.rpartition(".")
+            if symbol and tf in TIMEFRAME_MINUTES:
+                await self._on_bar(topic, (symbol, tf), payload)
+        elif kind == "tick" and rest:
+            await self._on_tick(topic, rest, payload)
+
+    async def _on_bar(self, topic: str, pair: Pair, payload: Dict[str, Any]) -> None:
+        skipped = self._seq_skipped(topic, payload)
+        rows = normalize_rates([payload], *pair)
+        if not rows:
+            self._stats["errors"] += 1
+            return
+        ms = rows[0]["epoch_ms"]
+        last = self._last.get(pair)
+        if last is None and self.last_bar is not None:
+            last = self.last_bar(pair)
+        if last is not None and ms <= last:
+            self._stats["duplicates"] += 1
+            return
+
+        if last is not None and (skipped or ms - last > tf_ms(pair[1])):
+            self._stats["gaps"] += 1
+            missing = await self._backfill(pair, last, ms)
+            if missing is None:
+                self._stats["dropped"] += 1
+                return
+            self._stats["backfilled"] += len(missing)
+            rows = missing + rows
+        self._last[pair] = ms
+        self._stats["bars"] += len(rows)
+        await self._deliver(self.on_bars, rows)
+
+    async def _backfill(self, pair: Pair, last: int, ms: int) -> Optional[List[Dict[str, Any]]]:
+        """
+        Bars strictly between `last` and `ms` (weekends and holidays just come
+        back empty), or None if the bridge failed.
+        """
+        count = min(self.max_backfill, (ms - last) // tf_ms(pair[1]) + 2)
+        resp = await self.connector.get_rates(pair[0], pair[1], count=int(count))
+        if isinstance(resp, dict) and resp.get("error"):
+            logger.warning("bridge feed backfill %s failed: %s", pair, resp["error"])
+            self._stats["errors"] += 1
+            return None
+        return [r for r in normalize_rates(resp, *pair) if last < r["epoch_ms"] < ms]
+
+    async def _on_tick(self, topic: str, symbol: str, payload: Dict[str, Any]) -> None:
+        if self._seq_skipped(topic, payload):
+            self._stats["tick_gaps"] += 1
+        tick = {"symbol": symbol, "epoch_ms": _epoch_ms(payload.get("time"))}
+        for k in ("bid", "ask", "last", "volume"):
+            try:
+                tick[k] = float(payload[k]) if payload.get(k) is not None else None
+            except (TypeError, ValueError):
+                tick[k] = None
+        self._stats["ticks"] += 1
+        await self._deliver(self.on_tick, tick)
+
+    async def _deliver(self, handlers: List[Handler], arg: Any) -> None:
+        for handler in handlers:
+            try:
+                res = handler(arg)
+                if inspect.isawaitable(res):
+                    await res
+            except Exception as e:
+                self._stats["errors"] += 1
+                logger.exception("bridge feed handler %r failed: %s", handler, e)
+
+    # ---------------------------------------------------------------------
+    # socket
+    # ---------------------------------------------------------------------
+
+    def _endpoint(self) -> str:
+        return f"tcp://{self.connector.host}:{self.port}"
+
+    def _open(self, context: zmq.asyncio.Context, endpoint: str):
+        sock = context.socket(zmq.SUB)
+        sock.setsockopt(zmq.LINGER, 0)
+        sock.setsockopt(zmq.RCVHWM, 100_000)
+        for t in self.topics():
+            sock.setsockopt(zmq.SUBSCRIBE, t)
+        sock.connect(endpoint)
+        return sock
+
+    async def run_forever(self, stop: Optional[asyncio.Event] = None) -> None:
+        stop = stop or asyncio.Event()
+        context = zmq.asyncio.Context.instance()
+        endpoint = self._endpoint()
+        sock = self._open(context, endpoint)
+        logger.info("bridge feed subscribed to %s", endpoint)
+        try:
+            while not stop.is_set():
+                if self._endpoint() != endpoint:  # set_endpoint() moved the bridge
+                    sock.close(linger=0)
+                    endpoint = self._endpoint()
+                    sock = self._open(context, endpoint)
+                if not await sock.poll(500):
+                    continue
+                frames = await sock.recv_multipart()
+                try:
+                    payload = json.loads(frames[-1])
+                    await self.handle(frames[0].decode("utf-8", "replace"), payload)
+                except Exception as e:
+                    self._stats["errors"] += 1
+                    logger.warning("bridge feed message dropped: %s", e)
+        finally:
+            sock.close(linger=0)
@@ -0,0 +1,456 @@
+"""
+Candle ingestion from the MT5 bridge into the `candles` table.
+
+One process keeps every (symbol, timeframe) of the universe current:
+  - a pair is polled only when its next bar is due (bar boundary + grace),
+    with a short backoff while the bridge hasn't produced it yet
+  - each poll asks for just the bars since the pair's high-water mark
+  - the newest bar of a RATES reply is still forming and is not stored
+  - rows are deduped on epoch_ms in memory and written in batched
+    INSERT .. ON CONFLICT DO NOTHING, so restarts and overlaps are harmless
+  - timeframes in CANDLE_INGEST_DERIVED_TIMEFRAMES are not polled: they are
+    resampled from the symbol's M1 bars as those close (see resample.py)
+  - with MT5_PUB_ENABLED, bars the bridge pushes as they close are stored
+    at once (bridge_feed.py) and the poll of that pair is pushed back to its
+    next bar, so polling only does the work when the feed is quiet
+
+Run with: python -m app.market_data.candle_ingest
+"""
+from __future__ import annotations
+
+import asyncio
+import datetime
+import logging
+import math
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings as app_settings
+from app.market_data.resample import TIMEFRAME_MINUTES, CandleResampler
+from app.models.candle import Candle
+from app.scanner.candles import Pair, latest_bar_times, load_universe_candles
+from app.scanner.universe import parse_universe
+from app.services.settings_service import SettingsService
+
+logger = logging.getLogger(__name__)
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+# 10 bound values per row (created_at included); asyncpg caps a statement at 32767
+_MAX_ROWS_PER_INSERT = 3000
+
+# broker server clocks differ from UTC by whole quarter hours
+_OFFSET_STEP_S = 900
+_MAX_OFFSET_S = 14 * 3600
+
+
+def _epoch_ms(t: Any) -> Optional[int]:
+    """Bar open time from a bridge reply (epoch s/ms, ISO string or datetime) as epoch ms."""
+    if t is None or isinstance(t, bool):
+        return None
+    if isinstance(t, (int, float)):
+        # epoch seconds until ~5138 AD; anything larger is already ms
+        return int(t * 1000) if t < 1e11 else int(t)
+    if isinstance(t, datetime.datetime):
+        if t.tzinfo is not None:
+            t = t.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+        return int((t - _EPOCH).total_seconds() * 1000)
+    if isinstance(t, str):
+        s = t.strip()
+        try:
+            return _epoch_ms(float(s))
+        except ValueError:
+            pass
+        try:
+            return _epoch_ms(datetime.datetime.fromisoformat(s.replace("Z", "+00:00")))
+        except ValueError:
+            return None
+    return None
+
+
+def rates_items(resp: Any) -> List[Any]:
+    """The bars list of a RATES reply: {"rates": [...]}, {"items": [...]} or a bare list."""
+    items = resp.get("rates") if isinstance(resp, dict) else resp
+    if not isinstance(items, list):
+        items = resp.get("items") if isinstance(resp, dict) else []
+    return items if isinstance(items, list) else []
+
+
+def normalize_rates(resp: Any, symbol: str, timeframe: str) -> List[Dict[str, Any]]:
+    """
+    Candle rows (column -> value) from a RATES reply, sorted by time with
+    duplicates and malformed bars dropped.
+    """
+    by_epoch: Dict[int, Dict[str, Any]] = {}
+    for x in rates_items(resp):
+        if not isinstance(x, dict):
+            continue
+        ms = _epoch_ms(x.get("time") if x.get("time") is not None else x.get("timestamp"))
+        if ms is None:
+            continue
+        try:
+            o, h, l, c = (float(x[k]) for k in ("open", "high", "low", "close"))
+        except (KeyError, TypeError, ValueError):
+            continue
+        vol = x.get("tick_volume")
+        if vol is None:
+            vol = x.get("volume")
+        by_epoch[ms] = {
+            "time": _EPOCH + datetime.timedelta(milliseconds=ms),
+            "symbol": symbol,
+            "timeframe": timeframe,
+            "open": o,
+            "high": h,
+            "low": l,
+            "close": c,
+            "volume": float(vol) if vol is not None else None,
+            "epoch_ms": ms,
+        }
+    return [by_epoch[k] for k in sorted(by_epoch)]
+
+
+def candles_insert(rows: List[Dict[str, Any]]):
+    """Multi-row insert that leaves bars already stored (same time/symbol/timeframe) untouched."""
+    return (
+        pg_insert(Candle.__table__)
+        .values(rows)
+        .on_conflict_do_nothing(index_elements=["time", "symbol", "timeframe"])
+    )
+
+
+class CandleIngestor:
+    """
+    Polls the bridge for due pairs and writes closed bars in batches.
+    stats() reports rows written, rows/s and per-pair ingest lag.
+    """
+
+    def __init__(
+        self,
+        connector=None,
+        session_factory=None,
+        backfill: Optional[int] = None,
+        grace_seconds: Optional[float] = None,
+        retry_seconds: Optional[float] = None,
+        store=None,
+        derived: Optional[Iterable[str]] = None,
+    ):
+        if connector is None:
+            from app.mt5.connector import mt5_connector as connector
+        if session_factory is None:
+            from app.database.connection import AsyncSessionLocal as session_factory
+        self.connector = connector
+        self.session_factory = session_factory
+        # optional CandleStore fed with every bar written
+        self.store = store
+        self.backfill = int(backfill or getattr(app_settings, "CANDLE_INGEST_BACKFILL", 500))
+        self.grace_seconds = float(
+            grace_seconds if grace_seconds is not None else getattr(app_settings, "CANDLE_INGEST_GRACE_SECONDS", 2.0)
+        )
+        self.retry_seconds = float(
+            retry_seconds if retry_seconds is not None else getattr(app_settings, "CANDLE_INGEST_RETRY_SECONDS", 5.0)
+        )
+
+        # pair -> epoch ms of the newest stored (closed) bar
+        self._hwm: Dict[Pair, int] = {}
+        # pair -> wall-clock time (epoch s) the pair is next polled
+        self._due: Dict[Pair, float] = {}
+        self._misses: Dict[Pair, int] = {}
+        self._seeded = False
+        self._stats = {"cycles": 0, "polls": 0, "errors": 0, "rows": 0, "derived": 0, "pushed": 0, "write_s": 0.0}
+        self._lag: Dict[Pair, float] = {}
+        # bar times are on the bridge's (broker) clock: seconds to add to time.time()
+        # to get it, and the recent estimates it is the max of (see _observe_clock)
+        self.clock_offset = 0.0
+        self._offset_samples: Deque[Tuple[float, float]] = deque()
+        # the universe being ingested, refreshed by run_forever()
+        self.pairs: List[Pair] = []
+
+        if derived is None:
+            derived = str(getattr(app_settings, "CANDLE_INGEST_DERIVED_TIMEFRAMES", "") or "").split(",")
+        derived = [tf.strip().upper() for tf in derived if tf.strip() and tf.strip().upper() != "M1"]
+        # builds the derived timeframes from each symbol's M1 bars
+        self.resampler = CandleResampler(derived) if derived else None
+        # run_once() and push() share the resampler: one batch at a time, so a
+        # failed write only rolls back its own updates
+        self._accepting = asyncio.Lock()
+
+    # ---------------------------------------------------------------------
+    # scheduling
+    # ---------------------------------------------------------------------
+
+    @staticmethod
+    def tf_seconds(timeframe: str) -> int:
+        return TIMEFRAME_MINUTES.get(timeframe, 15) * 60
+
+    def _observe_clock(self, forming_ms: int, step: int, now: float) -> None:
+        """
+        Estimate the broker clock offset from the forming bar of a short
+        timeframe: it started within one bar before the broker's now. A stale
+        forming bar (no ticks lately) only gives a lower estimate, so the offset
+        is the largest estimate of the last hour, which still follows DST.
+        """
+        if step > 300:
+            return
+        est = round((forming_ms / 1000 - now) / _OFFSET_STEP_S) * _OFFSET_STEP_S
+        if abs(est) > _MAX_OFFSET_S:
+            return  # market closed: the forming bar is from the last session
+        samples = self._offset_samples
+        samples.append((now, est))
+        while samples and samples[0][0] < now - 3600:
+            samples.popleft()
+        self.clock_offset = max(e for _, e in samples)
+
+    def _next_bar_due(self, pair: Pair, now: float) -> float:
+        # the next boundary on the broker's clock, as wall-clock time
+        step = self.tf_seconds(pair[1])
+        broker_now = now + self.clock_offset
+        return (math.floor(broker_now / step) + 1) * step - self.clock_offset + self.grace_seconds
+
+    def _backoff(self, pair: Pair, now: float) -> float:
+        # bridge clock is often a few hours off UTC (H4/D1 boundaries shift), so
+        # keep retrying, doubling up to a tenth of a bar
+        n = self._misses.get(pair, 0)
+        self._misses[pair] = n + 1
+        cap = max(self.retry_seconds, self.tf_seconds(pair[1]) / 10)
+        return now + min(self.retry_seconds * (2 ** n), cap)
+
+    def source_pairs(self, pairs: Iterable[Pair]) -> List[Pair]:
+        """Pairs polled from the bridge: derived timeframes are replaced by the symbol's M1."""
+        if self.resampler is None:
+            return list(pairs)
+        derived = set(self.resampler.timeframes)
+        out = {}
+        for symbol, tf in pairs:
+            out[(symbol, "M1" if tf in derived else tf)] = None
+        return list(out)
+
+    def due_pairs(self, pairs: Iterable[Pair], now: float) -> List[Pair]:
+        return [p for p in self.source_pairs(pairs) if self._due.get(p, 0.0) <= now]
+
+    def _count_for(self, pair: Pair, now: float) -> int:
+        hwm = self._hwm.get(pair)
+        if hwm is None:
+            return self.backfill + 1
+        missing = math.ceil(((now + self.clock_offset) * 1000 - hwm) / (self.tf_seconds(pair[1]) * 1000))
+        # +2: the forming bar, plus one of overlap against clock drift
+        return max(3, min(self.backfill + 1, missing + 2))
+
+    # ---------------------------------------------------------------------
+    # ingestion
+    # ---------------------------------------------------------------------
+
+    async def _seed(self, db: AsyncSession, pairs: List[Pair]) -> None:
+        if self.store is not None:
+            await self.store.warm_up(db, pairs)
+        latest = await latest_bar_times(db, pairs)
+        for pair, t in latest.items():
+            ms = _epoch_ms(t)
+            if ms is not None:
+                self._hwm[pair] = ms
+        if self.resampler is not None:
+            await self._prime(db, pairs)
+        self._seeded = True
+
+    async def _prime(self, db: AsyncSession, pairs: List[Pair]) -> None:
+        # the forming derived bars need the stored minutes of their current bucket
+        n = max(TIMEFRAME_MINUTES[tf] for tf in self.resampler.timeframes)
+        sources = [p for p in self.source_pairs(pairs) if p[1] == "M1"]
+        for (symbol, _), arrays in (await load_universe_candles(db, sources, n)).items():
+            self.resampler.prime(symbol, arrays)
+
+    async def _poll(self, pair: Pair, now: float) -> List[Dict[str, Any]]:
+        resp = await self.connector.get_rates(pair[0], pair[1], count=self._count_for(pair, now))
+        self._stats["polls"] += 1
+        if isinstance(resp, dict) and resp.get("error"):
+            self._stats["errors"] += 1
+            logger.warning("RATES %s %s failed: %s", pair[0], pair[1], resp.get("error"))
+            return []
+
+        bars = normalize_rates(resp, pair[0], pair[1])
+        if bars:
+            self._observe_clock(bars[-1]["epoch_ms"], self.tf_seconds(pair[1]), now)
+        bars = bars[:-1]  # newest bar is still forming
+        hwm = self._hwm.get(pair, -1)
+        return [b for b in bars if b["epoch_ms"] > hwm]
+
+    async def _write(self, db: AsyncSession, rows: List[Dict[str, Any]]) -> None:
+        t0 = time.perf_counter()
+        for i in range(0, len(rows), _MAX_ROWS_PER_INSERT):
+            await db.execute(candles_insert(rows[i:i + _MAX_ROWS_PER_INSERT]))
+        await db.commit()
+        self._stats["rows"] += len(rows)
+        self._stats["write_s"] += time.perf_counter() - t0
+
+    async def _accept(self, db: AsyncSession, fresh: Dict[Pair, List[Dict[str, Any]]]) -> int:
+        """Write new closed bars (plus the bars they derive) in one batch and feed the store."""
+        async with self._accepting:
+            rows = [r for bars in fresh.values() for r in bars]
+            snap = None
+            if self.resampler is not None:
+                snap = self.resampler.snapshot()
+                derived = self.resampler.update_rows(rows)
+                rows.extend(derived)
+            if rows:
+                try:
+                    await self._write(db, rows)
+                except BaseException:
+                    # the retry feeds these M1 bars again: the resampler must not have seen them
+                    if snap is not None:
+                        self.resampler.restore(snap)
+                    raise
+                if self.store is not None:
+                    self.store.append_rows(rows)
+            if snap is not None:
+                self._stats["derived"] += len(derived)
+            return len(rows)
+
+    def _advance(self, pair: Pair, bars: List[Dict[str, Any]], now: float) -> None:
+        if bars:
+            self._hwm[pair] = bars[-1]["epoch_ms"]
+            self._misses.pop(pair, None)
+            self._due[pair] = self._next_bar_due(pair, now)
+        else:
+            self._due[pair] = self._backoff(pair, now)
+        hwm = self._hwm.get(pair)
+        if hwm is not None:
+            # seconds since the newest stored bar closed, both on the bridge's clock
+            self._lag[pair] = now + self.clock_offset - (hwm / 1000 + self.tf_seconds(pair[1]))
+
+    async def run_once(self, pairs: List[Pair], now: Optional[float] = None) -> Dict[str, Any]:
+        """Poll every due pair, write their new closed bars in one batch, reschedule."""
+        now = time.time() if now is None else now
+        async with self.session_factory() as db:
+            if not self._seeded:
+                await self._seed(db, pairs)
+
+            due = self.due_pairs(pairs, now)
+            fresh: Dict[Pair, List[Dict[str, Any]]] = {}
+            # sequential: reads share the bridge's bulk lane, a couple at a time
+            for pair in due:
+                fresh[pair] = await self._poll(pair, now)
+            n = await self._accept(db, fresh)
+
+        for pair, bars in fresh.items():
+            self._advance(pair, bars, now)
+
+        self._stats["cycles"] += 1
+        return {"polled": len(due), "rows": n}
+
+    async def push(self, rows: List[Dict[str, Any]], now: Optional[float] = None) -> int:
+        """
+        Closed bars delivered by the bridge's PUB feed (app.market_data.bridge_feed).
+        They are stored like polled bars, and their pairs' next poll moves to the
+        next bar boundary, so polling only runs when pushes stop arriving.
+        """
+        now = time.time() if now is None else now
+        known = set(self.source_pairs(self.pairs)) if self.pairs else None
+        fresh: Dict[Pair, List[Dict[str, Any]]] = {}
+        for r in rows:
+            pair = (r["symbol"], r["timeframe"])
+            if known is not None and pair not in known:
+                continue
+            last = fresh[pair][-1]["epoch_ms"] if pair in fresh else self._hwm.get(pair, -1)
+            if r["epoch_ms"] > last:
+                fresh.setdefault(pair, []).append(r)
+        if not fresh:
+            return 0
+        async with self.session_factory() as db:
+            n = await self._accept(db, fresh)
+        for pair, bars in fresh.items():
+            self._advance(pair, bars, now)
+        self._stats["pushed"] += n
+        return n
+
+    def next_wakeup(self, pairs: Iterable[Pair], now: float) -> float:
+        due = (self._due.get(p, 0.0) for p in self.source_pairs(pairs))
+        return max(0.0, min(due, default=now + 1.0) - now)
+
+    def forming(self, symbol: str, timeframe: str):
+        """The derived bar still forming for (symbol, timeframe), updated on each M1 close."""
+        return None if self.resampler is None else self.resampler.forming(symbol, timeframe)
+
+    def stats(self) -> Dict[str, Any]:
+        s = dict(self._stats)
+        s["rows_per_s"] = s["rows"] / s["write_s"] if s["write_s"] else 0.0
+        lags = sorted(self._lag.values())
+        s["pairs"] = len(self._lag)
+        s["lag_max_s"] = lags[-1] if lags else None
+        s["lag_p50_s"] = lags[len(lags) // 2] if lags else None
+        s["clock_offset_s"] = self.clock_offset
+        return s
+
+    # ---------------------------------------------------------------------
+    # loop
+    # ---------------------------------------------------------------------
+
+    async def load_pairs(self, db: AsyncSession) -> List[Pair]:
+        """Universe symbols x CANDLE_INGEST_TIMEFRAMES; applies the runtime MT5 endpoint override."""
+        svc = SettingsService(db)
+        host = await svc.get("MT5_HOST")
+        port = await svc.get("MT5_PORT")
+        if host and hasattr(self.connector, "set_endpoint"):
+            self.connector.set_endpoint(host, int(port or 9000))
+
+        uni = parse_universe(await svc.get("SCANNER_UNIVERSE_JSON"))
+        tfs = [
+            tf.strip().upper()
+            for tf in str(getattr(app_settings, "CANDLE_INGEST_TIMEFRAMES", "") or "").split(",")
+            if tf.strip()
+        ] or [str(tf) for tf in uni["timeframes"]]
+        return [(str(s["symbol"]), tf) for s in uni["symbols"] for tf in tfs if tf in TIMEFRAME_MINUTES]
+
+    async def run_forever(self, stop: Optional[asyncio.Event] = None, report_every: float = 60.0) -> None:
+        stop = stop or asyncio.Event()
+        pairs = self.pairs
+        pairs_at = 0.0
+        reported = time.time()
+        while not stop.is_set():
+            now = time.time()
+            try:
+                if not pairs or now - pairs_at > 300:
+                    async with self.session_factory() as db:
+                        pairs = self.pairs = await self.load_pairs(db)
+                    pairs_at = now
+                await self.run_once(pairs, now=now)
+            except Exception as e:
+                logger.exception("candle ingest cycle failed: %s", e)
+                await asyncio.sleep(self.retry_seconds)
+                continue
+
+            if now - reported >= report_every:
+                logger.info("candle ingest: %s", self.stats())
+                reported = now
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=max(0.05, self.next_wakeup(pairs, time.time())))
+            except asyncio.TimeoutError:
+                pass
+
+
+def _main_store():
+    # with CANDLE_STORE_SHARED the ingestor is the single writer of the node's shared rings
+    if getattr(app_settings, "CANDLE_STORE_SHARED", False):
+        from app.market_data.shared_candles import SharedCandleStore
+
+        return SharedCandleStore(writer=True)
+    return None
+
+
+async def _main() -> None:
+    ingestor = CandleIngestor(store=_main_store())
+    if not getattr(app_settings, "MT5_PUB_ENABLED", False):
+        await ingestor.run_forever()
+        return
+    from app.market_data.bridge_feed import BridgeSubscriber
+
+    feed = BridgeSubscriber(
+        connector=ingestor.connector, ticks=False, on_bars=[ingestor.push], last_bar=ingestor._hwm.get
+    )
+    await asyncio.gather(ingestor.run_forever(), feed.run_forever())
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main())
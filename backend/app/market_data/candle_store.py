@@ -0,0 +1,320 @@
+"""
+Process-local candle store: a fixed-capacity NumPy ring buffer per
+(symbol, timeframe), so trailing windows are served from memory instead of
+Postgres or the bridge.
+
+Each ring keeps two copies of its slots back to back. An append writes both
+(O(1)), and the newest n bars are then always one contiguous slice, so last(n)
+is a zero-copy view. arrays() - what callers keep across awaits - copies.
+"""
+from __future__ import annotations
+
+import datetime
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings as app_settings
+from app.scanner.candles import CandleArrays, OHLCV, Pair, load_universe_candles
+
+logger = logging.getLogger(__name__)
+
+CANDLE_DTYPE = np.dtype([
+    ("time", "datetime64[ms]"),
+    ("open", "f8"),
+    ("high", "f8"),
+    ("low", "f8"),
+    ("close", "f8"),
+    ("volume", "f8"),
+])
+
+
+def _as_ms(t: Any) -> np.datetime64:
+    if isinstance(t, datetime.datetime) and t.tzinfo is not None:
+        t = t.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return np.datetime64(t, "ms")
+
+
+# ring header (int64 slots): write sequence (odd while a write is in progress),
+# next write slot, bars held; shared-memory segments add their own fields after these
+H_SEQ, H_W, H_N = 0, 1, 2
+HEADER_SLOTS = 8
+
+
+class CandleRing:
+    """
+    Last `capacity` bars of one (symbol, timeframe), oldest first.
+
+    Views returned by last() alias the buffer and change under the reader: the
+    forming bar is replaced in place, and with n == capacity the next append
+    reuses the oldest slot. Use them synchronously, between writes; anything
+    held across an await must be a copy (snapshot() or arrays()). Every write
+    bumps the header sequence twice (seqlock), so a reader in another process
+    can tell whether it raced a write.
+    """
+
+    def __init__(self, capacity: int, buf: Optional[np.ndarray] = None, header: Optional[np.ndarray] = None):
+        self.capacity = max(1, int(capacity))
+        self._buf = buf if buf is not None else np.zeros(2 * self.capacity, dtype=CANDLE_DTYPE)
+        self._hdr = header if header is not None else np.zeros(HEADER_SLOTS, dtype=np.int64)
+
+    @property
+    def _w(self) -> int:
+        return int(self._hdr[H_W])
+
+    @property
+    def _n(self) -> int:
+        return int(self._hdr[H_N])
+
+    def _begin(self) -> None:
+        self._hdr[H_SEQ] += 1
+
+    def _commit(self, w: int, n: int) -> None:
+        self._hdr[H_W] = w
+        self._hdr[H_N] = n
+        self._hdr[H_SEQ] += 1
+
+    @property
+    def seq(self) -> int:
+        return int(self._hdr[H_SEQ])
+
+    @property
+    def nbytes(self) -> int:
+        return self._buf.nbytes
+
+    def __len__(self) -> int:
+        return self._n
+
+    def clear(self) -> None:
+        self._begin()
+        self._commit(0, 0)
+
+    def last_time(self) -> Optional[np.datetime64]:
+        if not self._n:
+            return None
+        return self._buf[(self._w - 1) % self.capacity]["time"]
+
+    def _put(self, slot: int, bar: tuple) -> None:
+        self._buf[slot] = bar
+        self._buf[slot + self.capacity] = bar
+
+    def append(self, time: Any, open: float, high: float, low: float, close: float, volume: float = 0.0) -> bool:
+        """
+        Add a bar. A bar with the newest stored time replaces it (the forming
+        bar updating); older bars are ignored. True if the ring changed.
+        """
+        t = _as_ms(time)
+        bar = (t, open, high, low, close, 0.0 if volume is None else volume)
+        last = self.last_time()
+        w, n = self._w, self._n
+        if last is not None:
+            if t < last:
+                return False
+            if t == last:
+                self._begin()
+                self._put((w - 1) % self.capacity, bar)
+                self._commit(w, n)
+                return True
+        self._begin()
+        self._put(w, bar)
+        self._commit((w + 1) % self.capacity, min(n + 1, self.capacity))
+        return True
+
+    def extend(self, arrays: CandleArrays) -> int:
+        """Bulk load time-ordered arrays (e.g. from the DB); returns bars added."""
+        times = np.asarray(arrays["time"], dtype="datetime64[ms]")
+        last = self.last_time()
+        keep = times > last if last is not None else np.ones(len(times), dtype=bool)
+        idx = np.flatnonzero(keep)[-self.capacity:]
+        if not len(idx):
+            return 0
+
+        block = np.empty(len(idx), dtype=CANDLE_DTYPE)
+        block["time"] = times[idx]
+        for name in OHLCV:
+            block[name] = np.asarray(arrays[name], dtype=np.float64)[idx]
+
+        # contiguous writes into both copies, wrapping at most once
+        k = len(block)
+        w = self._w
+        first = min(k, self.capacity - w)
+        self._begin()
+        for base in (0, self.capacity):
+            self._buf[base + w: base + w + first] = block[:first]
+            self._buf[base: base + k - first] = block[first:]
+        self._commit((w + k) % self.capacity, min(self._n + k, self.capacity))
+        return k
+
+    def _window(self, w: int, held: int, n: Optional[int]) -> np.ndarray:
+        n = held if n is None else max(0, min(int(n), held))
+        end = w + self.capacity
+        view = self._buf[end - n: end]
+        view.flags.writeable = False
+        return view
+
+    def _stable_header(self, retries: int) -> Tuple[int, int, int]:
+        for _ in range(retries):
+            seq = self.seq
+            if not seq & 1:
+                w, held = self._w, self._n
+                if self.seq == seq:
+                    return seq, w, held
+            time.sleep(0)
+        raise RuntimeError("candle ring is being written continuously")
+
+    def last(self, n: Optional[int] = None, retries: int = 1000) -> np.ndarray:
+        """Read-only structured view of the newest n bars (all if None), oldest first; see the class doc."""
+        _, w, held = self._stable_header(retries)
+        return self._window(w, held, n)
+
+    def snapshot(self, n: Optional[int] = None, retries: int = 1000) -> np.ndarray:
+        """Copy of last(n) guaranteed not to overlap a concurrent write (seqlock retry)."""
+        for _ in range(retries):
+            seq, w, held = self._stable_header(retries)
+            out = self._window(w, held, n).copy()
+            if self.seq == seq:
+                return out
+        raise RuntimeError("candle ring is being written continuously")
+
+    def arrays(self, n: Optional[int] = None) -> CandleArrays:
+        """snapshot(n) as CandleArrays columns: a consistent copy, safe to keep across awaits."""
+        snap = self.snapshot(n)
+        return {name: snap[name] for name in CANDLE_DTYPE.names}
+
+
+class CandleStore:
+    """
+    Rings for many pairs under a memory budget. When adding a ring would
+    exceed it, the least recently used ring is dropped.
+    """
+
+    # read-only stores (shared-memory readers) are never filled by consumers
+    readonly = False
+
+    def __init__(self, capacity: Optional[int] = None, max_mb: Optional[float] = None):
+        self.capacity = int(capacity or getattr(app_settings, "CANDLE_STORE_CAPACITY", 2000))
+        self.max_bytes = int(float(max_mb or getattr(app_settings, "CANDLE_STORE_MAX_MB", 64)) * 1024 * 1024)
+        self._rings: "OrderedDict[Pair, CandleRing]" = OrderedDict()
+        self.evictions = 0
+
+    @property
+    def nbytes(self) -> int:
+        return sum(r.nbytes for r in self._rings.values())
+
+    def __contains__(self, pair: Pair) -> bool:
+        return pair in self._rings
+
+    def __len__(self) -> int:
+        return len(self._rings)
+
+    def ring(self, symbol: str, timeframe: str, create: bool = True) -> Optional[CandleRing]:
+        pair = (symbol, timeframe)
+        r = self._rings.get(pair)
+        if r is not None:
+            self._rings.move_to_end(pair)
+            return r
+        if not create:
+            return None
+
+        need = 2 * self.capacity * CANDLE_DTYPE.itemsize
+        while self._rings and self.nbytes + need > self.max_bytes:
+            dropped, _ = self._rings.popitem(last=False)
+            self.evictions += 1
+            logger.info("candle store over budget, dropped %s %s", *dropped)
+        r = self._rings[pair] = CandleRing(self.capacity)
+        return r
+
+    def append(self, symbol: str, timeframe: str, time: Any, open: float, high: float,
+               low: float, close: float, volume: float = 0.0) -> bool:
+        return self.ring(symbol, timeframe).append(time, open, high, low, close, volume)
+
+    def append_rows(self, rows: Iterable[Dict[str, Any]]) -> int:
+        """Candle column dicts (as written to the candles table), time-ordered per pair."""
+        n = 0
+        for r in rows:
+            n += self.append(r["symbol"], r["timeframe"], r["time"], r["open"], r["high"],
+                             r["low"], r["close"], r.get("volume"))
+        return n
+
+    def last(self, symbol: str, timeframe: str, n: Optional[int] = None) -> Optional[np.ndarray]:
+        r = self.ring(symbol, timeframe, create=False)
+        return None if r is None else r.last(n)
+
+    def arrays(self, symbol: str, timeframe: str, n: Optional[int] = None) -> Optional[CandleArrays]:
+        r = self.ring(symbol, timeframe, create=False)
+        return None if r is None else r.arrays(n)
+
+    def covers(self, pair: Pair, latest: Any, n: int) -> bool:
+        """True if the ring holds at least n bars ending exactly at bar time `latest`."""
+        r = self.ring(*pair, create=False)
+        return r is not None and len(r) >= n and latest is not None and r.last_time() == _as_ms(latest)
+
+    async def warm_up(self, db: AsyncSession, pairs: List[Pair], n: Optional[int] = None) -> int:
+        """Fill rings from the candles table in one windowed query; returns bars loaded."""
+        n = min(int(n or self.capacity), self.capacity)
+        loaded = 0
+        for (symbol, tf), arrays in (await load_universe_candles(db, pairs, n)).items():
+            r = self.ring(symbol, tf)
+            if r is not None:
+                loaded += r.extend(arrays)
+        return loaded
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pairs": len(self._rings),
+            "capacity": self.capacity,
+            "mb": round(self.nbytes / (1024 * 1024), 2),
+            "max_mb": round(self.max_bytes / (1024 * 1024), 2),
+            "evictions": self.evictions,
+        }
+
+
+_store: Optional[CandleStore] = None
+
+
+async def warm_up_store(store: CandleStore, session_factory=None) -> int:
+    """Startup warm-up: the scanner universe's pairs, newest `capacity` bars each."""
+    from app.scanner.candles import universe_pairs
+    from app.scanner.universe import parse_universe
+    from app.services.settings_service import SettingsService
+
+    if session_factory is None:
+        from app.database.connection import AsyncSessionLocal as session_factory
+    try:
+        async with session_factory() as db:
+            uni = parse_universe(await SettingsService(db).get("SCANNER_UNIVERSE_JSON"))
+            loaded = await store.warm_up(db, universe_pairs(uni))
+    except Exception as e:
+        # cold rings are filled on first use instead
+        logger.warning("candle store warm-up failed: %s", e)
+        return 0
+    logger.info("candle store warmed: %s bars, %s", loaded, store.stats())
+    return loaded
+
+
+def get_candle_store() -> CandleStore:
+    """This process's store, created on first use."""
+    global _store
+    if _store is None:
+        if getattr(app_settings, "CANDLE_STORE_SHARED", False):
+            from app.market_data.shared_candles import SharedCandleStore
+
+            _store = SharedCandleStore(writer=False)
+        else:
+            _store = CandleStore()
+    return _store
+
+
+def default_store() -> Optional[CandleStore]:
+    """
+    The store readers in this process should use: a read-only view of the
+    ingestor's shared-memory rings with CANDLE_STORE_SHARED, else the process
+    store, or None when CANDLE_STORE_ENABLED is off.
+    """
+    if not getattr(app_settings, "CANDLE_STORE_ENABLED", True):
+        return None
+    return get_candle_store()
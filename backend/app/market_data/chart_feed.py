@@ -0,0 +1,179 @@
+"""
+Bridge candles for polling charts (`GET /candles/mt5`).
+
+Each (symbol, timeframe) is cached in a process-local CandleStore ring that,
+unlike the scanner's store, also holds the forming bar (CandleRing.append
+replaces the newest bar when its time repeats). A poll within
+CANDLE_API_REFRESH_SECONDS of the last bridge call is served from the ring;
+otherwise only the bars opened since the last bridge call are requested
+(counted on the wall clock: bar times are on the broker's clock).
+
+Clients send back `since` (the epoch ms of the newest bar they hold) and get
+that bar (it may still be forming) and anything newer. The ETag identifies the
+ring's state and the query (count, since), so an unchanged chart costs a 304.
+Refreshes of one pair are serialized: concurrent polls share one bridge call.
+A `count` beyond the ring's capacity is fetched from the bridge directly.
+"""
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings as app_settings
+from app.market_data.candle_ingest import normalize_rates
+from app.market_data.candle_store import CANDLE_DTYPE, CandleRing, CandleStore
+from app.market_data.resample import tf_ms
+from app.scanner.candles import Pair
+
+
+class BridgeError(Exception):
+    """The MT5 bridge answered a RATES request with an error."""
+
+
+class ChartFeed:
+    def __init__(self, connector=None, store: Optional[CandleStore] = None, refresh_seconds: Optional[float] = None):
+        if connector is None:
+            from app.mt5.connector import mt5_connector as connector
+        self.connector = connector
+        self.store = store if store is not None else CandleStore()
+        self.refresh_seconds = float(
+            refresh_seconds if refresh_seconds is not None
+            else getattr(app_settings, "CANDLE_API_REFRESH_SECONDS", 1.0)
+        )
+        self._fetched: Dict[Pair, float] = {}
+        # bumped whenever a ring is reloaded, so ETags from before never match
+        self._generation: Dict[Pair, int] = {}
+        self._locks: Dict[Pair, asyncio.Lock] = {}
+        self.stats = {"requests": 0, "bridge_calls": 0, "bridge_bars": 0, "direct": 0}
+
+    def _count_for(self, pair: Pair, ring: Optional[CandleRing], want: int, now: float) -> int:
+        if ring is None or len(ring) < want:
+            return want
+        # the ring's newest bar was forming at the last fetch: count the bars opened
+        # since then from wall-clock time, never from bar times (broker clock)
+        elapsed = now - self._fetched.get(pair, 0.0)
+        return max(2, min(want, math.ceil(elapsed * 1000 / tf_ms(pair[1])) + 1))
+
+    async def refresh(self, symbol: str, timeframe: str, count: int, now: Optional[float] = None,
+                      timeout_ms: int = 3500) -> CandleRing:
+        """The pair's ring with at least `count` bars (capped at capacity), bridge-fresh within refresh_seconds."""
+        pair = (symbol, timeframe)
+        want = max(1, min(int(count), self.store.capacity))
+        self.stats["requests"] += 1
+
+        lock = self._locks.get(pair)
+        if lock is None:
+            lock = self._locks[pair] = asyncio.Lock()
+        async with lock:
+            # a poll that waited here usually finds the ring just refreshed
+            now = time.time() if now is None else now
+            ring = self.store.ring(symbol, timeframe, create=False)
+            if ring is not None and len(ring) >= want and now - self._fetched.get(pair, 0.0) < self.refresh_seconds:
+                return ring
+
+            n = self._count_for(pair, ring, want, now)
+            rows = await self._rates(symbol, timeframe, n, timeout_ms)
+            if n < want and rows and np.datetime64(rows[0]["time"], "ms") > ring.last_time():
+                # the delta doesn't reach back to the ring: reload rather than leave a hole
+                n = want
+                rows = await self._rates(symbol, timeframe, n, timeout_ms)
+            return self._apply(pair, rows, n == want, now)
+
+    async def _rates(self, symbol: str, timeframe: str, count: int, timeout_ms: int) -> List[Dict[str, Any]]:
+        resp = await self.connector.get_rates(symbol=symbol, timeframe=timeframe, count=count, timeout_ms=timeout_ms)
+        if isinstance(resp, dict) and resp.get("error"):
+            raise BridgeError(str(resp.get("error")))
+        rows = normalize_rates(resp, symbol, timeframe)
+        self.stats["bridge_calls"] += 1
+        self.stats["bridge_bars"] += len(rows)
+        return rows
+
+    def _apply(self, pair: Pair, rows: List[Dict[str, Any]], full: bool, now: float) -> CandleRing:
+        symbol, timeframe = pair
+
+        ring = self.store.ring(symbol, timeframe)
+        if full or not len(ring):
+            # cold or short of history: reload
+            ring.clear()
+            self._generation[pair] = self._generation.get(pair, 0) + 1
+        for r in rows:
+            ring.append(r["time"], r["open"], r["high"], r["low"], r["close"], r["volume"])
+        self._fetched[pair] = now
+        return ring
+
+    def window(self, symbol: str, timeframe: str, count: int, since: Optional[int] = None) -> Tuple[np.ndarray, str]:
+        """Newest `count` bars with time >= since (epoch ms), and the ETag of the ring's state."""
+        pair = (symbol, timeframe)
+        ring = self.store.ring(symbol, timeframe, create=False)
+        view = ring.last(count) if ring is not None else np.empty(0, dtype=CANDLE_DTYPE)
+        if since is not None and len(view):
+            view = view[int(np.searchsorted(view["time"], np.datetime64(int(since), "ms"), side="left")):]
+
+        newest = ring.last(1) if ring is not None and len(ring) else None
+        state = b"" if newest is None else newest.tobytes()
+        # the same ring state answers different queries differently
+        state += f"|{int(count)}|{since}".encode()
+        etag = f'W/"{self._generation.get(pair, 0)}-{len(ring) if ring is not None else 0}-{zlib.crc32(state):08x}"'
+        return view, etag
+
+    async def query(self, symbol: str, timeframe: str, count: int, since: Optional[int] = None,
+                    timeout_ms: int = 3500) -> Tuple[np.ndarray, str]:
+        """
+        window() after refresh(); a `count` the ring cannot hold is read from the
+        bridge as is (not cached), with an ETag of the bars returned.
+        """
+        if int(count) <= self.store.capacity:
+            await self.refresh(symbol, timeframe, count, timeout_ms=timeout_ms)
+            return self.window(symbol, timeframe, count, since=since)
+
+        self.stats["direct"] += 1
+        rows = await self._rates(symbol, timeframe, int(count), timeout_ms)
+        bars = np.empty(len(rows), dtype=CANDLE_DTYPE)
+        if rows:
+            bars["time"] = np.array([r["epoch_ms"] for r in rows], dtype="datetime64[ms]")
+            for name in ("open", "high", "low", "close", "volume"):
+                bars[name] = [np.nan if r[name] is None else r[name] for r in rows]
+        if since is not None and len(bars):
+            bars = bars[int(np.searchsorted(bars["time"], np.datetime64(int(since), "ms"), side="left")):]
+        etag = f'W/"d-{len(bars)}-{zlib.crc32(bars.tobytes() + f"|{int(count)}|{since}".encode()):08x}"'
+        return bars, etag
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    """If-None-Match semantics: a list of (weak) tags or '*'."""
+    if not header:
+        return False
+    tags = [t.strip() for t in header.split(",")]
+    bare = etag[2:] if etag.startswith("W/") else etag
+    return "*" in tags or any((t[2:] if t.startswith("W/") else t) == bare for t in tags)
+
+
+def to_chart_candles(view: np.ndarray) -> List[Dict[str, Any]]:
+    """Ring records as the chart payload: time in epoch seconds, like the bridge's RATES."""
+    secs = (view["time"].astype(np.int64) // 1000).tolist()
+    return [
+        {"time": t, "open": o, "high": h, "low": l, "close": c, "volume": v}
+        for t, o, h, l, c, v in zip(
+            secs,
+            view["open"].tolist(),
+            view["high"].tolist(),
+            view["low"].tolist(),
+            view["close"].tolist(),
+            view["volume"].tolist(),
+        )
+    ]
+
+
+_feed: Optional[ChartFeed] = None
+
+
+def get_chart_feed() -> ChartFeed:
+    global _feed
+    if _feed is None:
+        _feed = ChartFeed()
+    return _feed
@@ -0,0 +1,256 @@
+"""
+Higher timeframes derived from M1 bars, so every timeframe of a symbol comes
+from the same minutes and agrees with the others.
+
+Bucket boundaries are session-aligned: a `timeframe` bar opens at
+    offset + k * timeframe   (epoch ms)
+with offset = CANDLE_SESSION_OFFSET_MIN, i.e. D1 and H4 bars start at the
+broker's session open (e.g. -120 for a 22:00 UTC day) instead of midnight UTC.
+
+resample() converts whole arrays in one vectorized pass (reduceat over the
+bucket starts). BarAggregator / CandleResampler keep the forming bar of each
+target timeframe and update it on every M1 close, emitting a bar as soon as
+its last minute has closed.
+"""
+from __future__ import annotations
+
+import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings as app_settings
+from app.scanner.candles import CandleArrays, OHLCV
+
+TIMEFRAME_MINUTES: Dict[str, int] = {
+    "M1": 1,
+    "M5": 5,
+    "M15": 15,
+    "M30": 30,
+    "H1": 60,
+    "H4": 240,
+    "D1": 1440,
+}
+
+_MINUTE_MS = 60_000
+_EPOCH = datetime.datetime(1970, 1, 1)
+
+# (open time ms, open, high, low, close, volume)
+Bar = Tuple[int, float, float, float, float, float]
+
+
+def session_offset_minutes() -> int:
+    return int(getattr(app_settings, "CANDLE_SESSION_OFFSET_MIN", 0) or 0)
+
+
+def tf_ms(timeframe: str) -> int:
+    try:
+        return TIMEFRAME_MINUTES[timeframe] * _MINUTE_MS
+    except KeyError:
+        raise ValueError(f"unknown timeframe {timeframe!r}") from None
+
+
+def _check(source: str, timeframe: str) -> None:
+    if tf_ms(timeframe) % tf_ms(source):
+        raise ValueError(f"{timeframe} is not a multiple of {source}")
+
+
+def bucket_start(ms, timeframe: str, offset_min: Optional[int] = None):
+    """Open time (epoch ms) of the `timeframe` bar containing `ms`; scalars or int64 arrays."""
+    step = tf_ms(timeframe)
+    off = (session_offset_minutes() if offset_min is None else int(offset_min)) * _MINUTE_MS
+    return (ms - off) // step * step + off
+
+
+def _empty() -> CandleArrays:
+    out: CandleArrays = {"time": np.empty(0, dtype="datetime64[ms]")}
+    for name in OHLCV:
+        out[name] = np.empty(0, dtype=np.float64)
+    return out
+
+
+def resample(
+    arrays: CandleArrays,
+    timeframe: str,
+    source: str = "M1",
+    offset_min: Optional[int] = None,
+    partial: bool = False,
+) -> CandleArrays:
+    """
+    `timeframe` bars from time-ordered `source` bars. Gaps are fine (a bucket
+    is built from whatever minutes it has). The newest bucket is dropped
+    unless its last source bar has closed, or partial=True.
+    """
+    _check(source, timeframe)
+    ms = np.asarray(arrays["time"], dtype="datetime64[ms]").astype(np.int64)
+    if not len(ms):
+        return _empty()
+
+    buckets = bucket_start(ms, timeframe, offset_min)
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(ms)] - 1
+
+    vol = np.nan_to_num(np.asarray(arrays["volume"], dtype=np.float64))
+    out: CandleArrays = {
+        "time": buckets[starts].astype("datetime64[ms]"),
+        "open": np.asarray(arrays["open"], dtype=np.float64)[starts],
+        "high": np.maximum.reduceat(np.asarray(arrays["high"], dtype=np.float64), starts),
+        "low": np.minimum.reduceat(np.asarray(arrays["low"], dtype=np.float64), starts),
+        "close": np.asarray(arrays["close"], dtype=np.float64)[ends],
+        "volume": np.add.reduceat(vol, starts),
+    }
+    if not partial and ms[-1] + tf_ms(source) < buckets[-1] + tf_ms(timeframe):
+        out = {k: v[:-1] for k, v in out.items()}
+    return out
+
+
+class BarAggregator:
+    """
+    One target timeframe built incrementally from source bars as they close.
+    If the first source bar seen is not at its bucket's start, the earlier
+    minutes are unknown and that first bar is not emitted; prime() first
+    when the history exists.
+    """
+
+    __slots__ = ("timeframe", "step", "src_step", "offset_min", "_bar", "_last_ms", "_head_partial")
+
+    def __init__(self, timeframe: str, source: str = "M1", offset_min: Optional[int] = None):
+        _check(source, timeframe)
+        self.timeframe = timeframe
+        self.step = tf_ms(timeframe)
+        self.src_step = tf_ms(source)
+        self.offset_min = session_offset_minutes() if offset_min is None else int(offset_min)
+        self._bar: Optional[List[Any]] = None
+        self._last_ms: Optional[int] = None
+        self._head_partial = False
+
+    @property
+    def forming(self) -> Optional[Bar]:
+        """The bar still being built (None right after one closed)."""
+        return None if self._bar is None else tuple(self._bar)  # type: ignore[return-value]
+
+    def update(self, ms: int, open: float, high: float, low: float, close: float, volume: float = 0.0) -> List[Bar]:
+        """
+        Fold in one closed source bar (epoch ms); returns the target bars it
+        closed, oldest first. Source bars at or before the last one are ignored.
+        """
+        start = int(bucket_start(ms, self.timeframe, self.offset_min))
+        if self._last_ms is None:
+            self._head_partial = ms != start
+        elif ms <= self._last_ms:
+            return []
+        self._last_ms = ms
+        volume = 0.0 if volume is None else float(volume)
+
+        closed: List[Bar] = []
+        bar = self._bar
+        if bar is not None and bar[0] != start:
+            # gap past the end of the forming bar's bucket
+            self._close(closed)
+            bar = None
+        if bar is None:
+            self._bar = [start, open, high, low, close, volume]
+        else:
+            bar[2] = max(bar[2], high)
+            bar[3] = min(bar[3], low)
+            bar[4] = close
+            bar[5] += volume
+        if ms + self.src_step >= start + self.step:
+            self._close(closed)
+        return closed
+
+    def _close(self, closed: List[Bar]) -> None:
+        if not self._head_partial:
+            closed.append(tuple(self._bar))  # type: ignore[arg-type]
+        self._head_partial = False
+        self._bar = None
+
+
+class CandleResampler:
+    """
+    BarAggregators for every symbol x target timeframe, fed with candle rows
+    of the source timeframe (the shape candle_ingest writes).
+    """
+
+    def __init__(self, timeframes: Iterable[str], source: str = "M1", offset_min: Optional[int] = None):
+        self.source = source
+        self.offset_min = session_offset_minutes() if offset_min is None else int(offset_min)
+        self.timeframes = [tf for tf in timeframes if tf != source]
+        for tf in self.timeframes:
+            _check(source, tf)
+        self._aggs: Dict[str, Dict[str, BarAggregator]] = {}
+
+    def _for(self, symbol: str) -> Dict[str, BarAggregator]:
+        aggs = self._aggs.get(symbol)
+        if aggs is None:
+            aggs = self._aggs[symbol] = {
+                tf: BarAggregator(tf, self.source, self.offset_min) for tf in self.timeframes
+            }
+        return aggs
+
+    def update(self, symbol: str, ms: int, open: float, high: float, low: float,
+               close: float, volume: float = 0.0) -> Dict[str, List[Bar]]:
+        """One closed source bar -> closed bars per target timeframe."""
+        return {tf: agg.update(ms, open, high, low, close, volume) for tf, agg in self._for(symbol).items()}
+
+    def update_rows(self, rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Closed derived bars for source-timeframe rows (time-ordered per symbol), as candle rows."""
+        out: List[Dict[str, Any]] = []
+        for r in rows:
+            if r["timeframe"] != self.source:
+                continue
+            closed = self.update(r["symbol"], r["epoch_ms"], r["open"], r["high"], r["low"], r["close"], r.get("volume"))
+            for tf, bars in closed.items():
+                out.extend(bar_row(r["symbol"], tf, b) for b in bars)
+        return out
+
+    def snapshot(self) -> Dict[str, Dict[str, Tuple[Any, ...]]]:
+        """Every aggregator's state, for restore() when the bars fed since could not be stored."""
+        return {
+            symbol: {tf: (None if a._bar is None else list(a._bar), a._last_ms, a._head_partial)
+                     for tf, a in aggs.items()}
+            for symbol, aggs in self._aggs.items()
+        }
+
+    def restore(self, snap: Dict[str, Dict[str, Tuple[Any, ...]]]) -> None:
+        for symbol in [s for s in self._aggs if s not in snap]:
+            del self._aggs[symbol]
+        for symbol, states in snap.items():
+            aggs = self._for(symbol)
+            for tf, (bar, last_ms, head_partial) in states.items():
+                agg = aggs[tf]
+                agg._bar = None if bar is None else list(bar)
+                agg._last_ms, agg._head_partial = last_ms, head_partial
+
+    def prime(self, symbol: str, arrays: CandleArrays) -> None:
+        """Rebuild the forming bars from stored source bars; bars this closes are already stored."""
+        ms = np.asarray(arrays["time"], dtype="datetime64[ms]").astype(np.int64)
+        cols = [np.asarray(arrays[name], dtype=np.float64) for name in OHLCV]
+        aggs = self._for(symbol)
+        for i in range(len(ms)):
+            bar = (int(ms[i]), *(float(c[i]) for c in cols))
+            for agg in aggs.values():
+                agg.update(*bar)
+        # the stored bars are all there is of the forming buckets (the caller
+        # loads at least the longest timeframe's worth), so keep them
+        for agg in aggs.values():
+            agg._head_partial = False
+
+    def forming(self, symbol: str, timeframe: str) -> Optional[Bar]:
+        agg = self._aggs.get(symbol, {}).get(timeframe)
+        return None if agg is None else agg.forming
+
+
+def bar_row(symbol: str, timeframe: str, bar: Bar) -> Dict[str, Any]:
+    ms, o, h, l, c, v = bar
+    return {
+        "time": _EPOCH + datetime.timedelta(milliseconds=ms),
+        "symbol": symbol,
+        "timeframe": timeframe,
+        "open": o,
+        "high": h,
+        "low": l,
+        "close": c,
+        "volume": v,
+        "epoch_ms": ms,
+    }
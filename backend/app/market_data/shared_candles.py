@@ -0,0 +1,244 @@
+"""
+Candle rings in `multiprocessing.shared_memory`, one segment per
+(symbol, timeframe), so every uvicorn / Celery process on the node reads the
+ingestor's bars in place: no DB or Redis hop, no copy.
+
+Single writer (the ingestor, writer=True) and lock-free readers. A segment
+is a CandleRing header followed by its records; the header's sequence number
+is a seqlock (odd while a write is in progress), so readers retry instead of
+taking a lock. last() views alias the segment and change as the writer
+appends (see CandleRing); arrays() and snapshot() return consistent copies.
+
+Segments outlive the writer on purpose (a restarted ingestor reattaches and
+readers keep their mappings); unlink_all() removes them. Containers must share
+the IPC namespace (or /dev/shm) to see each other's segments.
+"""
+from __future__ import annotations
+
+import inspect
+import logging
+import re
+import time
+import zlib
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.core.config import settings as app_settings
+from app.market_data.candle_store import CANDLE_DTYPE, H_SEQ, HEADER_SLOTS, CandleRing, CandleStore
+from app.scanner.candles import Pair
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_MAGIC = 0x52584344  # "RXCD"
+# header slots after CandleRing's seq / w / n
+H_MAGIC, H_CAPACITY, H_RETIRED = 3, 4, 5
+
+_HEADER_BYTES = HEADER_SLOTS * 8
+
+
+def segment_name(prefix: str, symbol: str, timeframe: str) -> str:
+    # shm names allow no "/"; the crc keeps sanitized symbols apart
+    safe = re.sub(r"[^A-Za-z0-9]", "_", symbol)
+    return f"{prefix}{safe}_{timeframe}_{zlib.crc32(symbol.encode('utf-8')) & 0xFFFF:04x}"
+
+
+def segment_size(capacity: int) -> int:
+    return _HEADER_BYTES + 2 * capacity * CANDLE_DTYPE.itemsize
+
+
+# Python >= 3.13: SharedMemory(track=False) keeps segments away from the
+# resource tracker. Older versions register every attach with it, and it
+# unlinks the segment when *any* attached process exits, so the helpers below
+# undo that through the tracker directly. This relies on CPython internals
+# (resource_tracker and the tracked name, SharedMemory._name); both are only
+# touched when track= is unavailable, and failures there are logged, not raised.
+_HAS_TRACK = "track" in inspect.signature(SharedMemory.__init__).parameters
+
+
+def _tracked_name(shm: SharedMemory) -> str:
+    # the name as registered with the tracker (leading "/" on POSIX)
+    return getattr(shm, "_name", "/" + shm.name)
+
+
+def _untrack(shm: SharedMemory) -> None:
+    try:
+        resource_tracker.unregister(_tracked_name(shm), "shared_memory")
+    except Exception as e:
+        logger.debug("could not untrack shared memory %s: %s", shm.name, e)
+
+
+def _open(name: str, create: bool, size: int = 0) -> Optional[SharedMemory]:
+    kwargs = {"track": False} if _HAS_TRACK else {}
+    try:
+        if create:
+            shm = SharedMemory(name=name, create=True, size=size, **kwargs)
+        else:
+            shm = SharedMemory(name=name, **kwargs)
+    except FileNotFoundError:
+        return None
+    if not _HAS_TRACK:
+        _untrack(shm)
+    return shm
+
+
+def _unlink(shm: SharedMemory) -> None:
+    try:
+        if not _HAS_TRACK:
+            # re-register so unlink()'s own unregister is balanced
+            resource_tracker.register(_tracked_name(shm), "shared_memory")
+        shm.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def _close(shm: SharedMemory) -> None:
+    try:
+        shm.close()
+    except BufferError:
+        # a caller still holds a view; the mapping goes away with it
+        pass
+
+
+def _views(shm: SharedMemory, capacity: int):
+    header = np.ndarray((HEADER_SLOTS,), dtype=np.int64, buffer=shm.buf, offset=0)
+    buf = np.ndarray((2 * capacity,), dtype=CANDLE_DTYPE, buffer=shm.buf, offset=_HEADER_BYTES)
+    return header, buf
+
+
+class SharedCandleStore(CandleStore):
+    """
+    CandleStore whose rings live in shared memory. writer=True creates and
+    fills segments; readers attach on first use and are read-only.
+    """
+
+    def __init__(
+        self,
+        writer: bool = False,
+        capacity: Optional[int] = None,
+        max_mb: Optional[float] = None,
+        prefix: Optional[str] = None,
+        miss_ttl: float = 1.0,
+    ):
+        super().__init__(capacity=capacity, max_mb=max_mb)
+        self.writer = writer
+        self.readonly = not writer
+        self.prefix = prefix or str(getattr(app_settings, "CANDLE_STORE_SHM_PREFIX", "rx_candles_"))
+        self._shm: Dict[Pair, SharedMemory] = {}
+        # pair -> monotonic time until which a failed attach is not retried
+        # (every lookup of an unknown pair would otherwise be a shm_open)
+        self.miss_ttl = float(miss_ttl)
+        self._missing: Dict[Pair, float] = {}
+
+    def __contains__(self, pair: Pair) -> bool:
+        return self.ring(*pair, create=False) is not None
+
+    def _drop(self, pair: Pair) -> None:
+        self._rings.pop(pair, None)
+        shm = self._shm.pop(pair, None)
+        if shm is not None:
+            _close(shm)
+
+    def _attach(self, pair: Pair) -> Optional[CandleRing]:
+        shm = _open(segment_name(self.prefix, *pair), create=False)
+        if shm is None:
+            return None
+        meta = np.ndarray((HEADER_SLOTS,), dtype=np.int64, buffer=shm.buf)
+        capacity = int(meta[H_CAPACITY])
+        if meta[H_MAGIC] != SEGMENT_MAGIC or meta[H_RETIRED] or shm.size < segment_size(capacity):
+            del meta
+            _close(shm)
+            return None
+        del meta
+        header, buf = _views(shm, capacity)
+        self._shm[pair] = shm
+        ring = self._rings[pair] = CandleRing(capacity, buf=buf, header=header)
+        return ring
+
+    def _create(self, pair: Pair) -> Optional[CandleRing]:
+        size = segment_size(self.capacity)
+        if self.nbytes + size > self.max_bytes:
+            logger.warning("shared candle store over budget, not storing %s %s", *pair)
+            return None
+
+        name = segment_name(self.prefix, *pair)
+        shm = _open(name, create=False)
+        if shm is not None:
+            meta = np.ndarray((HEADER_SLOTS,), dtype=np.int64, buffer=shm.buf)
+            reusable = meta[H_MAGIC] == SEGMENT_MAGIC and meta[H_CAPACITY] == self.capacity and not meta[H_RETIRED]
+            if not reusable:
+                # readers still mapping the old segment see it retired and reattach
+                meta[H_RETIRED] = 1
+            del meta
+            if not reusable:
+                _unlink(shm)
+                _close(shm)
+                shm = None
+        if shm is None:
+            shm = _open(name, create=True, size=size)
+            header, _ = _views(shm, self.capacity)
+            header[:] = 0
+            header[H_CAPACITY] = self.capacity
+            header[H_MAGIC] = SEGMENT_MAGIC
+            del header
+
+        header, buf = _views(shm, self.capacity)
+        self._shm[pair] = shm
+        ring = self._rings[pair] = CandleRing(self.capacity, buf=buf, header=header)
+        if ring.seq & 1:
+            # previous writer died mid-write: the newest slots may be torn
+            ring._hdr[H_SEQ] += 1
+            ring.clear()
+        return ring
+
+    def ring(self, symbol: str, timeframe: str, create: bool = True) -> Optional[CandleRing]:
+        pair = (symbol, timeframe)
+        r = self._rings.get(pair)
+        if r is not None:
+            if not r._hdr[H_RETIRED]:
+                return r
+            self._drop(pair)
+        if self.writer and create:
+            self._missing.pop(pair, None)
+            return self._create(pair)
+        now = time.monotonic()
+        if self._missing.get(pair, 0.0) > now:
+            return None
+        r = self._attach(pair)
+        if r is None:
+            if len(self._missing) > 4096:
+                self._missing = {p: t for p, t in self._missing.items() if t > now}
+            self._missing[pair] = now + self.miss_ttl
+        else:
+            self._missing.pop(pair, None)
+        return r
+
+    def append(self, symbol: str, timeframe: str, time, open: float, high: float,
+               low: float, close: float, volume: float = 0.0) -> bool:
+        if not self.writer:
+            raise PermissionError("shared candle store is read-only in this process")
+        r = self.ring(symbol, timeframe)
+        return False if r is None else r.append(time, open, high, low, close, volume)
+
+    async def warm_up(self, db, pairs: List[Pair], n: Optional[int] = None) -> int:
+        if not self.writer:
+            return 0
+        return await super().warm_up(db, pairs, n)
+
+    def close(self) -> None:
+        for pair in list(self._shm):
+            self._drop(pair)
+
+    def unlink_all(self) -> None:
+        """Writer only: retire and remove every segment this store created or attached."""
+        for pair, shm in list(self._shm.items()):
+            self._rings[pair]._hdr[H_RETIRED] = 1
+            _unlink(shm)
+            self._drop(pair)
+
+    def stats(self):
+        out = super().stats()
+        out.update({"shared": True, "writer": self.writer})
+        return out
@@ -5,6 +5,7 @@
 from app.models.user import User  # noqa: F401
 from app.models.trade import Trade  # noqa: F401
 from app.models.trading_signal import TradingSignal  # noqa: F401
+from app.models.scanner_latest_signal import ScannerLatestSignal  # noqa: F401
 from app.models.execution_log import ExecutionLog  # noqa: F401
 
 from app.models.alert import Alert  # noqa: F401
@@ -13,7 +13,7 @@ class ModelTrainingRun(Base):
     symbol = Column(String(32), nullable=False)
     timeframe = Column(String(16), nullable=False)
 
-    status = Column(String(32), nullable=False)  # started|success|failed
+    status = Column(String(32), nullable=False)  # started|success|failed|rejected|skipped
     metrics = Column(JSONB, nullable=True)
     error = Column(String(1024), nullable=True)
 
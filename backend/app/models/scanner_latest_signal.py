@@ -0,0 +1,37 @@
+# backend/app/models/scanner_latest_signal.py
+
+import datetime
+from sqlalchemy import Column, String, Float, DateTime, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID
+
+from app.database.connection import Base
+
+
+class ScannerLatestSignal(Base):
+    """
+    Current scanner signal per (user, symbol, timeframe): one row per pair,
+    upserted on every scan. updated_at is the last scan that confirmed it,
+    so best-signal selection reads at most one row per pair.
+    """
+    __tablename__ = "scanner_latest_signals"
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), primary_key=True)
+    symbol = Column(String(32), primary_key=True)
+    timeframe = Column(String(16), primary_key=True)
+
+    signal_id = Column(UUID(as_uuid=True), ForeignKey("trading_signals.id"), nullable=False)
+    action = Column(String(32), nullable=False)
+    score = Column(Float, nullable=False)
+    confidence = Column(Float, nullable=False)
+
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
+
+
+# best-signal lookup: user's fresh rows, highest score first, answered from the index
+Index(
+    "ix_scanner_latest_signals_user_score",
+    ScannerLatestSignal.user_id,
+    ScannerLatestSignal.score.desc(),
+    ScannerLatestSignal.updated_at,
+    postgresql_include=["confidence", "action", "signal_id"],
+)
@@ -1,4 +1,5 @@
 import asyncio
+import json
 import time
 from typing import Any, Dict, Optional
 
@@ -6,15 +7,47 @@ import zmq
 import zmq.asyncio
 
 from app.config import settings
+from app.mt5.lanes import BridgeLane
+from app.mt5.singleflight import SingleFlight
+
+
+# bulk-lane actions; everything else (orders, pings, account queries) takes the order lane
+BULK_ACTIONS = frozenset({"RATES", "GET_POSITIONS"})
 
 
 class MT5Connector:
+    """
+    JSON requests to the MT5 bridge over ZeroMQ, on two lanes (app/mt5/lanes.py):
+
+      order - SEND_ORDER, PING, ACCOUNT_INFO...; never waits behind reads
+      bulk  - RATES and GET_POSITIONS, at most MT5_BULK_MAX_IN_FLIGHT outstanding
+
+    Each lane is its own connection (optionally its own bridge port), so the
+    bridge takes an order as soon as its current request completes. By
+    default lanes are DEALER sockets with many concurrent requests matched by
+    id, each with its own timeout; MT5_TRANSPORT=req keeps lock-step REQ sockets.
+    """
+
     def __init__(self):
         self.context = zmq.asyncio.Context()
-        self.socket = None
         self.connected = False
         self.host = getattr(settings, "MT5_HOST", "localhost")
         self.port = int(getattr(settings, "MT5_PORT", 9000))
+        # 0: orders use the same bridge port as reads
+        self.order_port = int(getattr(settings, "MT5_ORDER_PORT", 0) or 0)
+        self.transport = str(getattr(settings, "MT5_TRANSPORT", "dealer") or "dealer").lower()
+        self.lanes: Dict[str, BridgeLane] = {
+            "order": BridgeLane("order", self.context, self.transport),
+            "bulk": BridgeLane(
+                "bulk", self.context, self.transport,
+                max_in_flight=int(getattr(settings, "MT5_BULK_MAX_IN_FLIGHT", 2) or 0),
+            ),
+        }
+        # identical concurrent reads (RATES, GET_POSITIONS) share one bridge call
+        self.reads = SingleFlight(
+            ttl_ms=float(getattr(settings, "MT5_READ_COALESCE_TTL_MS", 0) or 0),
+            cacheable=lambda resp: not (isinstance(resp, dict) and resp.get("error")),
+        )
 
     def set_endpoint(self, host: str, port: int) -> None:
         host = str(host).strip()
@@ -22,18 +55,22 @@ class MT5Connector:
         if host and (host != self.host or port != self.port):
             self.host = host
             self.port = port
-            self.connected = False
-            try:
-                if self.socket is not None:
-                    self.socket.close(linger=0)
-            except Exception:
-                pass
-            self.socket = None
+            self._reset("MT5 endpoint changed")
+            self.reads.clear()
+
+    def _reset(self, reason: str) -> None:
+        for lane in self.lanes.values():
+            lane.reset(reason)
+        self.connected = False
+
+    def _endpoint(self, lane: str) -> str:
+        port = self.order_port if lane == "order" and self.order_port else self.port
+        return f"tcp://{self.host}:{port}"
 
     async def connect(self):
         try:
-            self.socket = self.context.socket(zmq.REQ)
-            self.socket.connect(f"tcp://{self.host}:{self.port}")
+            for name, lane in self.lanes.items():
+                lane.ensure(self._endpoint(name))
             self.connected = True
             return True
         except Exception as e:
@@ -41,21 +78,30 @@ class MT5Connector:
             self.connected = False
             return False
 
-    async def _ensure(self) -> None:
-        if not self.connected or self.socket is None:
-            await self.connect()
+    @staticmethod
+    def _as_dict(resp: Any) -> Dict[str, Any]:
+        if isinstance(resp, dict):
+            return resp
+        return {"ok": True, "response": resp}
 
-    async def _call(self, payload: Dict[str, Any], *, timeout_ms: int = 2000) -> Dict[str, Any]:
-        await self._ensure()
+    async def _call(self, payload: Dict[str, Any], *, timeout_ms: int = 2000, lane: Optional[str] = None) -> Dict[str, Any]:
+        lane = lane or ("bulk" if payload.get("action") in BULK_ACTIONS else "order")
         try:
-            self.socket.send_json(payload)
-            resp = await asyncio.wait_for(self.socket.recv_json(), timeout=timeout_ms / 1000)
-            if isinstance(resp, dict):
-                return resp
-            return {"ok": True, "response": resp}
+            resp = self._as_dict(await self.lanes[lane].call(self._endpoint(lane), payload, timeout_ms))
         except Exception as e:
             self.connected = False
             return {"error": str(e)}
+        self.connected = not resp.get("error")
+        return resp
+
+    def lane_stats(self) -> Dict[str, Any]:
+        """Per-lane queue depth (in flight / waiting for a slot), counters and latency percentiles."""
+        return {name: lane.stats() for name, lane in self.lanes.items()}
+
+    async def _read(self, payload: Dict[str, Any], *, timeout_ms: int) -> Dict[str, Any]:
+        """_call() for side-effect-free requests, coalesced per endpoint and payload."""
+        key = (self.host, self.port, json.dumps(payload, sort_keys=True))
+        return await self.reads.do(key, lambda: self._call(payload, timeout_ms=timeout_ms))
 
     async def ping(self, timeout_ms: int = 800) -> dict:
         try:
@@ -96,10 +142,10 @@ class MT5Connector:
         return await self._call(order, timeout_ms=timeout_ms)
 
     async def get_positions(self, *, timeout_ms: int = 2500) -> Dict[str, Any]:
-        return await self._call({"action": "GET_POSITIONS"}, timeout_ms=timeout_ms)
+        return await self._read({"action": "GET_POSITIONS"}, timeout_ms=timeout_ms)
 
     async def get_rates(self, symbol: str, timeframe: str, count: int = 300, *, timeout_ms: int = 3500) -> Dict[str, Any]:
-        return await self._call({"action": "RATES", "symbol": symbol, "timeframe": timeframe, "count": int(count)}, timeout_ms=timeout_ms)
+        return await self._read({"action": "RATES", "symbol": symbol, "timeframe": timeframe, "count": int(count)}, timeout_ms=timeout_ms)
 
 
 mt5_connector = MT5Connector()
\ No newline at end of file
@@ -0,0 +1,195 @@
+"""
+Bridge lanes: one ZeroMQ socket (its own TCP connection) per class of
+traffic, so orders never queue behind bulk reads.
+
+A bridge's REP/ROUTER socket fair-queues between connections, so an order
+sent on its own connection is taken as soon as the request being processed
+finishes, however many backfill reads are waiting on the other connection.
+A lane can cap how many of its requests are outstanding at once
+(max_in_flight); callers beyond that wait locally, where their wait is
+visible in stats() instead of hidden in the bridge's queue.
+
+dealer lanes send [id, b"", json] and match replies by id (REP and ROUTER
+bridges echo the frames before the delimiter); a timed-out request just
+forgets its id. req lanes alternate send/recv behind a lock and are rebuilt
+after any failure.
+"""
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+import zmq
+import zmq.asyncio
+
+
+def _percentiles(samples: Deque[float]) -> Dict[str, Optional[float]]:
+    if not samples:
+        return {"p50": None, "p95": None, "p99": None, "max": None}
+    xs = sorted(samples)
+    pick = lambda q: round(xs[min(len(xs) - 1, int(q * len(xs)))] * 1000, 2)  # noqa: E731
+    return {"p50": pick(0.5), "p95": pick(0.95), "p99": pick(0.99), "max": round(xs[-1] * 1000, 2)}
+
+
+class BridgeLane:
+    def __init__(self, name: str, context: zmq.asyncio.Context, transport: str = "dealer",
+                 max_in_flight: int = 0, window: int = 512):
+        self.name = name
+        self.context = context
+        self.transport = transport
+        self.max_in_flight = max(0, int(max_in_flight))
+        self.socket = None
+        self.endpoint: Optional[str] = None
+        self._ids = itertools.count(1)
+        self._pending: Dict[bytes, "asyncio.Future[Any]"] = {}
+        self._dispatcher: Optional["asyncio.Task[None]"] = None
+        # socket, dispatcher, gate and lock belong to the loop that created them
+        # (Celery tasks run a fresh loop per asyncio.run)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._gate: Optional[asyncio.Semaphore] = None
+        self._req_lock: Optional[asyncio.Lock] = None
+        self.waiting = 0
+        # request seconds (queue wait included) and queue wait alone, newest `window`
+        self._latency: Deque[float] = deque(maxlen=window)
+        self._wait: Deque[float] = deque(maxlen=window)
+        self.counters = {"sent": 0, "timeouts": 0, "late": 0, "errors": 0, "in_flight_max": 0, "waiting_max": 0}
+
+    # ---------------------------------------------------------------------
+    # socket lifecycle
+    # ---------------------------------------------------------------------
+
+    def reset(self, reason: str) -> None:
+        """Close the socket and stop the dispatcher; requests still waiting fail with `reason`."""
+        pending, self._pending = self._pending, {}
+        for fut in pending.values():
+            if not fut.done():
+                try:
+                    fut.set_exception(ConnectionError(reason))
+                except RuntimeError:
+                    pass  # its loop is gone
+        if self._dispatcher is not None:
+            try:
+                self._dispatcher.cancel()
+            except RuntimeError:
+                pass
+            self._dispatcher = None
+        try:
+            if self.socket is not None:
+                self.socket.close(linger=0)
+        except Exception:
+            pass
+        self.socket = None
+
+    def open(self, endpoint: str) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._gate = asyncio.Semaphore(self.max_in_flight) if self.max_in_flight else None
+            self._req_lock = asyncio.Lock()
+        if self.transport == "req":
+            sock = self.context.socket(zmq.REQ)
+        else:
+            sock = self.context.socket(zmq.DEALER)
+        sock.setsockopt(zmq.LINGER, 0)
+        sock.connect(endpoint)
+        self.socket, self.endpoint, self._loop = sock, endpoint, loop
+        if self.transport != "req":
+            self._dispatcher = asyncio.ensure_future(self._dispatch(sock))
+
+    def ensure(self, endpoint: str) -> None:
+        if self.socket is None or self.endpoint != endpoint or self._loop is not asyncio.get_running_loop():
+            self.reset(f"MT5 {self.name} lane reopened")
+            self.open(endpoint)
+
+    async def _dispatch(self, sock) -> None:
+        """Route [id, b"", reply] frames to the waiting request; unknown ids were timed out."""
+        while True:
+            try:
+                frames = await sock.recv_multipart()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                return  # socket closed by reset()
+            fut = self._pending.pop(frames[0], None) if len(frames) >= 3 and frames[1] == b"" else None
+            if fut is None or fut.done():
+                self.counters["late"] += 1
+                continue
+            try:
+                fut.set_result(json.loads(frames[-1]))
+            except ValueError as e:
+                fut.set_result({"error": f"invalid bridge reply: {e}"})
+
+    # ---------------------------------------------------------------------
+    # requests
+    # ---------------------------------------------------------------------
+
+    async def call(self, endpoint: str, payload: Dict[str, Any], timeout_ms: int) -> Any:
+        """Bridge reply, or {"error": ...}. timeout_ms covers the wait for a slot too."""
+        self.ensure(endpoint)
+        t0 = time.perf_counter()
+        try:
+            return await asyncio.wait_for(self._gated(payload, t0), timeout=timeout_ms / 1000)
+        except asyncio.TimeoutError:
+            self.counters["timeouts"] += 1
+            return {"error": f"MT5 bridge timeout after {timeout_ms} ms ({self.name} lane)"}
+        except Exception as e:
+            self.counters["errors"] += 1
+            return {"error": str(e) or type(e).__name__}
+
+    async def _gated(self, payload: Dict[str, Any], t0: float) -> Any:
+        if self._gate is None:
+            return await self._request(payload, t0)
+        self.waiting += 1
+        self.counters["waiting_max"] = max(self.counters["waiting_max"], self.waiting)
+        try:
+            await self._gate.acquire()
+        finally:
+            self.waiting -= 1
+        try:
+            return await self._request(payload, t0)
+        finally:
+            self._gate.release()
+
+    async def _request(self, payload: Dict[str, Any], t0: float) -> Any:
+        self._wait.append(time.perf_counter() - t0)
+        if self.transport == "req":
+            resp = await self._request_req(payload)
+        else:
+            rid = f"{next(self._ids):x}".encode()
+            fut = asyncio.get_running_loop().create_future()
+            self._pending[rid] = fut
+            self.counters["in_flight_max"] = max(self.counters["in_flight_max"], len(self._pending))
+            try:
+                await self.socket.send_multipart([rid, b"", json.dumps(payload).encode("utf-8")])
+                self.counters["sent"] += 1
+                resp = await fut
+            finally:
+                self._pending.pop(rid, None)
+        self._latency.append(time.perf_counter() - t0)
+        return resp
+
+    async def _request_req(self, payload: Dict[str, Any]) -> Any:
+        # REQ must alternate send/recv: a timeout (cancellation) or error
+        # mid-request leaves it unusable, so it is rebuilt
+        async with self._req_lock:
+            self.ensure(self.endpoint)
+            try:
+                await self.socket.send_json(payload)
+                self.counters["sent"] += 1
+                return await self.socket.recv_json()
+            except BaseException:
+                self.reset(f"MT5 {self.name} lane request failed")
+                raise
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._pending),
+            "waiting": self.waiting,
+            "max_in_flight": self.max_in_flight or None,
+            **self.counters,
+            "latency_ms": _percentiles(self._latency),
+            "wait_ms": _percentiles(self._wait),
+        }
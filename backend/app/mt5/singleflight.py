@@ -0,0 +1,66 @@
+"""
+Request coalescing for bridge reads.
+
+Concurrent calls with the same key share one in-flight call and its result,
+so bridge load follows the number of distinct queries rather than the number
+of dashboards asking. With a ttl, a successful result is also reused for that
+long after it arrives.
+
+Waiters are shielded from each other: one caller giving up (client
+disconnect, timeout) does not cancel the call the others are waiting on.
+Results are shared objects - callers must not mutate them.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+class SingleFlight:
+    def __init__(self, ttl_ms: float = 0.0, cacheable: Optional[Callable[[Any], bool]] = None):
+        self.ttl = max(0.0, float(ttl_ms)) / 1000.0
+        # results failing this are shared with concurrent waiters but not kept for ttl
+        self.cacheable = cacheable or (lambda result: True)
+        self._inflight: Dict[Hashable, "asyncio.Future[Any]"] = {}
+        self._recent: Dict[Hashable, Tuple[float, Any]] = {}
+        self.stats = {"calls": 0, "shared": 0, "cached": 0}
+
+    def _fresh(self, key: Hashable, now: float) -> Tuple[bool, Any]:
+        hit = self._recent.get(key)
+        if hit is None:
+            return False, None
+        if now >= hit[0]:
+            del self._recent[key]
+            return False, None
+        return True, hit[1]
+
+    def _done(self, key: Hashable, fut: "asyncio.Future[Any]") -> None:
+        if self._inflight.get(key) is fut:
+            del self._inflight[key]
+        if self.ttl and not fut.cancelled() and fut.exception() is None and self.cacheable(fut.result()):
+            self._recent[key] = (time.monotonic() + self.ttl, fut.result())
+            if len(self._recent) > 1024:
+                now = time.monotonic()
+                self._recent = {k: v for k, v in self._recent.items() if v[0] > now}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """fn()'s result, shared with every concurrent (and, within ttl, recent) call for `key`."""
+        if self.ttl:
+            hit, value = self._fresh(key, time.monotonic())
+            if hit:
+                self.stats["cached"] += 1
+                return value
+
+        fut = self._inflight.get(key)
+        if fut is None:
+            self.stats["calls"] += 1
+            fut = asyncio.ensure_future(fn())
+            self._inflight[key] = fut
+            fut.add_done_callback(lambda f, key=key: self._done(key, f))
+        else:
+            self.stats["shared"] += 1
+        return await asyncio.shield(fut)
+
+    def clear(self) -> None:
+        self._recent.clear()
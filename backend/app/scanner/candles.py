@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List, Tuple
+
+import numpy as np
+from sqlalchemy import String, column, func, select, true, values
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.candle import Candle
+
+Pair = Tuple[str, str]
+CandleArrays = Dict[str, np.ndarray]  # time (datetime64[ms]) + open/high/low/close/volume (float64)
+
+OHLCV = ("open", "high", "low", "close", "volume")
+
+
+def universe_pairs(uni: Dict[str, Any]) -> List[Pair]:
+    return [(str(s["symbol"]), str(tf)) for s in uni["symbols"] for tf in uni["timeframes"]]
+
+
+def _universe(pairs: Iterable[Pair]):
+    """The pairs as a VALUES list (symbol, timeframe) to drive per-pair lookups."""
+    return values(column("symbol", String), column("timeframe", String), name="universe").data(list(pairs))
+
+
+def last_candles_query(pairs: Iterable[Pair], limit: int):
+    """
+    Last `limit` candles of every (symbol, timeframe) in one statement: a
+    LATERAL subquery per pair (ORDER BY time DESC LIMIT n), i.e. one backward
+    range scan of ix_candles_symbol_tf_time per pair, not the pair's history.
+    Core columns only - no ORM entities, no identity map.
+    """
+    t = Candle.__table__
+    u = _universe(pairs)
+    recent = (
+        select(
+            t.c.time,
+            t.c.open,
+            t.c.high,
+            t.c.low,
+            t.c.close,
+            func.coalesce(t.c.volume, 0.0).label("volume"),
+        )
+        .where(t.c.symbol == u.c.symbol, t.c.timeframe == u.c.timeframe)
+        .order_by(t.c.time.desc())
+        .limit(int(limit))
+        .lateral("recent")
+    )
+    return (
+        select(
+            u.c.symbol,
+            u.c.timeframe,
+            recent.c.time,
+            recent.c.open,
+            recent.c.high,
+            recent.c.low,
+            recent.c.close,
+            recent.c.volume,
+        )
+        .select_from(u.join(recent, true()))
+        .order_by(u.c.symbol, u.c.timeframe, recent.c.time)
+    )
+
+
+def latest_bars_query(pairs: Iterable[Pair]):
+    """Newest bar time per (symbol, timeframe): one LIMIT 1 index probe per pair."""
+    t = Candle.__table__
+    u = _universe(pairs)
+    newest = (
+        select(t.c.time)
+        .where(t.c.symbol == u.c.symbol, t.c.timeframe == u.c.timeframe)
+        .order_by(t.c.time.desc())
+        .limit(1)
+        .lateral("newest")
+    )
+    return select(u.c.symbol, u.c.timeframe, newest.c.time).select_from(u.join(newest, true()))
+
+
+async def latest_bar_times(db: AsyncSession, pairs: Iterable[Pair]) -> Dict[Pair, Any]:
+    pairs = list(pairs)
+    if not pairs:
+        return {}
+    rows = (await db.execute(latest_bars_query(pairs))).all()
+    return {(symbol, tf): t for symbol, tf, t in rows}
+
+
+def decode_rows(rows: List[Tuple]) -> Dict[Pair, CandleArrays]:
+    """Split (symbol, timeframe, time, o, h, l, c, v) rows, sorted by pair then time, into per-pair arrays."""
+    if not rows:
+        return {}
+
+    cols = list(zip(*rows))
+    times = np.array(cols[2], dtype="datetime64[ms]")
+    ohlcv = np.array(cols[3:8], dtype=np.float64)  # (5, n)
+
+    keys = list(zip(cols[0], cols[1]))
+    starts = [0] + [i for i in range(1, len(keys)) if keys[i] != keys[i - 1]]
+    ends = starts[1:] + [len(keys)]
+
+    out: Dict[Pair, CandleArrays] = {}
+    for a, b in zip(starts, ends):
+        arrs: CandleArrays = {"time": times[a:b]}
+        for j, name in enumerate(OHLCV):
+            arrs[name] = ohlcv[j, a:b]
+        out[keys[a]] = arrs
+    return out
+
+
+async def load_universe_candles(db: AsyncSession, pairs: Iterable[Pair], limit: int) -> Dict[Pair, CandleArrays]:
+    """One round trip for the whole universe; pairs without candles are absent from the result."""
+    pairs = list(pairs)
+    if not pairs:
+        return {}
+    rows = (await db.execute(last_candles_query(pairs, limit))).all()
+    return decode_rows(rows)
+
+
+def to_candle_dicts(arrs: CandleArrays) -> List[Dict[str, Any]]:
+    """Candle dicts in the shape TradingEngine.analyze_market expects."""
+    ts = np.datetime_as_string(arrs["time"], unit="s")
+    return [
+        {"timestamp": t, "open": o, "high": h, "low": l, "close": c, "volume": v}
+        for t, o, h, l, c, v in zip(
+            ts.tolist(),
+            arrs["open"].tolist(),
+            arrs["high"].tolist(),
+            arrs["low"].tolist(),
+            arrs["close"].tolist(),
+            arrs["volume"].tolist(),
+        )
+    ]
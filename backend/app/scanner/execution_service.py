@@ -6,7 +6,9 @@ from typing import Any, Dict, Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, desc, func
 
+from app.core.config import settings as app_settings
 from app.models.trading_signal import TradingSignal
+from app.models.scanner_latest_signal import ScannerLatestSignal
 from app.services.settings_service import SettingsService
 
 # trading_engine is the existing execution entry in your project
@@ -52,31 +54,53 @@ class ScannerExecutionService:
             return 0
 
     @staticmethod
-    async def _pick_best_signal(
-        db: AsyncSession,
+    def best_signal_query(
+        user_id: str,
         symbol: Optional[str],
         timeframe: Optional[str],
         min_score: float,
         min_confidence: float,
-    ) -> Optional[TradingSignal]:
+        fresh_since: datetime.datetime,
+    ):
+        """
+        Best current signal from scanner_latest_signals (one row per pair the
+        user scans), joined to its TradingSignal by primary key. Pairs no scan
+        has confirmed since `fresh_since` are ignored.
+        """
+        latest = ScannerLatestSignal
         q = (
             select(TradingSignal)
+            .join(latest, latest.signal_id == TradingSignal.id)
             .where(
-                (TradingSignal.source == "scanner")
-                & (TradingSignal.action.in_(["BUY", "SELL"]))
-                & (TradingSignal.score != None)
-                & (TradingSignal.confidence != None)
-                & (TradingSignal.score >= min_score)
-                & (TradingSignal.confidence >= min_confidence)
+                (latest.user_id == user_id)
+                & (latest.action.in_(["BUY", "SELL"]))
+                & (latest.score >= min_score)
+                & (latest.confidence >= min_confidence)
+                & (latest.updated_at >= fresh_since)
             )
-            .order_by(desc(TradingSignal.score), desc(TradingSignal.created_at))
+            .order_by(desc(latest.score), desc(latest.updated_at))
             .limit(1)
         )
         if symbol:
-            q = q.where(TradingSignal.symbol == symbol)
+            q = q.where(latest.symbol == symbol)
         if timeframe:
-            q = q.where(TradingSignal.timeframe == timeframe)
+            q = q.where(latest.timeframe == timeframe)
+        return q
 
+    @staticmethod
+    async def _pick_best_signal(
+        db: AsyncSession,
+        user_id: str,
+        symbol: Optional[str],
+        timeframe: Optional[str],
+        min_score: float,
+        min_confidence: float,
+        max_age_minutes: float,
+    ) -> Optional[TradingSignal]:
+        fresh_since = datetime.datetime.utcnow() - datetime.timedelta(minutes=max_age_minutes)
+        q = ScannerExecutionService.best_signal_query(
+            user_id, symbol, timeframe, min_score, min_confidence, fresh_since,
+        )
         return (await db.execute(q)).scalar_one_or_none()
 
     @staticmethod
@@ -129,6 +153,7 @@ class ScannerExecutionService:
         Executes best eligible scanner signal.
         Enforces:
           - AUTO_SELECT_MAX_TRADES_PER_HOUR (if enforce_limits)
+          - AUTO_SELECT_MAX_SIGNAL_AGE_MIN: only pairs a scan confirmed recently
         Reads defaults from settings if not provided.
         """
         settings = SettingsService(db)
@@ -137,6 +162,10 @@ class ScannerExecutionService:
             min_score = float(await settings.get("AUTO_SELECT_MIN_SCORE") or 65)
         if min_confidence is None:
             min_confidence = float(await settings.get("AUTO_SELECT_MIN_CONFIDENCE") or 70)
+        max_age = float(
+            await settings.get("AUTO_SELECT_MAX_SIGNAL_AGE_MIN")
+            or getattr(app_settings, "SCANNER_SIGNAL_MAX_AGE_MINUTES", 10)
+        )
 
         if enforce_limits:
             max_per_hour = int(await settings.get("AUTO_SELECT_MAX_TRADES_PER_HOUR") or 2)
@@ -146,10 +175,12 @@ class ScannerExecutionService:
 
         sig = await ScannerExecutionService._pick_best_signal(
             db=db,
+            user_id=user_id,
             symbol=symbol,
             timeframe=timeframe,
             min_score=float(min_score),
             min_confidence=float(min_confidence),
+            max_age_minutes=max_age,
         )
         if not sig:
             return {
@@ -157,6 +188,7 @@ class ScannerExecutionService:
                 "error": "no_eligible_signal",
                 "min_score": float(min_score),
                 "min_confidence": float(min_confidence),
+                "max_age_minutes": max_age,
             }
 
         payload = {
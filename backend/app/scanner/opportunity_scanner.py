@@ -1,102 +1,498 @@
 from __future__ import annotations
 
-from typing import Dict, Any, List, Optional
+import asyncio
+import datetime
+import json
+import logging
+import uuid
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+from sqlalchemy import insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, desc
+
+from app.core.config import settings as app_settings
+from app.database.connection import AsyncSessionLocal
 
 from app.core.trading_engine import TradingEngine
-from app.models.candle import Candle
 from app.models.trading_signal import TradingSignal
+from app.models.scanner_latest_signal import ScannerLatestSignal
 from app.services.settings_service import SettingsService
 from app.scanner.universe import parse_universe, rank_score
+from app.scanner.streaming import ScanHub, TopK
+from app.market_data.candle_store import CandleStore
+from app.scanner.candles import (
+    CandleArrays,
+    Pair,
+    latest_bar_times,
+    load_universe_candles,
+    to_candle_dicts,
+    universe_pairs,
+)
+
+logger = logging.getLogger(__name__)
 
 
 class SmartOpportunityScanner:
-    def __init__(self, engine: TradingEngine):
+    """
+    Two steps per scan:
+    - shared market analysis: one analysis per (symbol, timeframe) and bar,
+      cached and reused by every user (cost scales with pairs, not users)
+    - per-user projection: universe weights / thresholds applied to the cached
+      signals; TradingSignal rows are written only for bars the user hasn't seen
+    """
+
+    def __init__(
+        self,
+        engine: TradingEngine,
+        concurrency: Optional[int] = None,
+        session_factory=None,
+        store: Optional[CandleStore] = None,
+    ):
         self.engine = engine
+        # pairs analyzed at once (DB sessions + analyzer threads in flight)
+        self.concurrency = int(concurrency or getattr(app_settings, "SCANNER_CONCURRENCY", 6))
+        self.session_factory = session_factory or AsyncSessionLocal
+        # optional in-memory candle rings: warm pairs only re-read their newest bars
+        self.store = store
+        # (symbol, timeframe) -> {"bar", "signal"}: latest market analysis, shared by all users
+        self._analysis: Dict[Pair, Dict[str, Any]] = {}
+        self._analysis_lock = asyncio.Lock()
+        # (user_id, (symbol, timeframe)) -> {"bar", "signal_id"}: last signal row committed for
+        # the user; only _write() fills it, so a carried-forward id always exists in the table
+        self._last: Dict[Tuple[str, Pair], Dict[str, Any]] = {}
+        self._stats = {"scans": 0, "analyzed": 0, "skipped": 0}
+        # top-k change / scan completion events for dashboard subscribers
+        self.hub = ScanHub()
 
-    async def _load_candles(self, db: AsyncSession, symbol: str, timeframe: str, limit: int) -> List[Dict[str, Any]]:
-        q = (
-            select(Candle)
-            .where((Candle.symbol == symbol) & (Candle.timeframe == timeframe))
-            .order_by(desc(Candle.time))
-            .limit(limit)
-        )
-        rows = (await db.execute(q)).scalars().all()
-        rows = list(reversed(rows))
-        return [
+    async def _analyze_pair(
+        self,
+        sem: asyncio.Semaphore,
+        symbol: str,
+        timeframe: str,
+        arrays: CandleArrays,
+    ) -> Optional[Dict[str, Any]]:
+        # each worker gets its own session: AsyncSession is not safe for concurrent use
+        async with sem:
+            candles = to_candle_dicts(arrays)
+            async with self.session_factory() as wdb:
+                out = await self.engine.analyze_market(
+                    data=candles,
+                    symbol=symbol,
+                    timeframe=timeframe,
+                    extra_context=None,
+                    db=wdb,  # AI registry inference
+                    offload=True,
+                )
+
+        sig = out.get("signal") or {}
+        return {"symbol": symbol, "timeframe": timeframe, "signal": sig}
+
+    def stats(self) -> Dict[str, int]:
+        return dict(self._stats)
+
+    async def _load_candles(
+        self,
+        db: AsyncSession,
+        pairs: List[Pair],
+        latest: Dict[Pair, Any],
+        min_candles: int,
+    ) -> Dict[Pair, CandleArrays]:
+        """
+        Last `min_candles` bars of each pair. With a store, pairs whose ring is
+        warm are topped up with their newest few bars and served as ring views;
+        only cold pairs (or rings with a gap) read the full window. A read-only
+        (shared-memory) store is used as is for pairs it has current.
+        """
+        if self.store is None or self.store.capacity < min_candles:
+            return await load_universe_candles(db, pairs, min_candles) if pairs else {}
+
+        if self.store.readonly:
+            # shared rings are filled by the ingestor; read what is current, the rest from the DB
+            out = {
+                p: self.store.arrays(*p, min_candles)
+                for p in pairs if self.store.covers(p, latest.get(p), min_candles)
+            }
+            rest = [p for p in pairs if p not in out]
+            if rest:
+                out.update(await load_universe_candles(db, rest, min_candles))
+            return out
+
+        topup = int(getattr(app_settings, "CANDLE_STORE_TOPUP_BARS", 8))
+        warm = [p for p in pairs if p in self.store and len(self.store.ring(*p)) >= min_candles]
+        if warm:
+            for pair, arrs in (await load_universe_candles(db, warm, topup)).items():
+                ring = self.store.ring(*pair)
+                # the top-up must overlap the ring, otherwise bars are missing in between
+                if len(arrs["time"]) and arrs["time"][0] <= ring.last_time():
+                    ring.extend(arrs)
+
+        cold = [p for p in pairs if not self.store.covers(p, latest.get(p), min_candles)]
+        if cold:
+            for pair, arrs in (await load_universe_candles(db, cold, min_candles)).items():
+                ring = self.store.ring(*pair)
+                ring.clear()
+                ring.extend(arrs)
+
+        return {p: self.store.arrays(*p, min_candles) for p in pairs if p in self.store}
+
+    async def refresh_analysis(
+        self,
+        db: AsyncSession,
+        pairs: List[Pair],
+        min_candles: int,
+        force: bool = False,
+        on_result: Optional[Callable[[Pair], None]] = None,
+    ) -> Tuple[Dict[Pair, Any], int]:
+        """
+        Shared pass: analyze pairs whose latest bar moved since the cached
+        analysis (a new bar means the previous one closed). Concurrent scans
+        wait on the lock and then find the cache fresh.
+        on_result(pair) is called as soon as a pair's analysis is current:
+        right away for cache hits, then in completion order for the rest.
+        Returns ({pair: latest bar}, number of pairs analyzed).
+        """
+        async with self._analysis_lock:
+            latest = await latest_bar_times(db, pairs)
+            changed = [
+                p for p in pairs
+                if p in latest and (force or self._analysis.get(p, {}).get("bar") != latest[p])
+            ]
+            if on_result is not None:
+                for p in pairs:
+                    if p in latest and p not in changed and p in self._analysis:
+                        on_result(p)
+
+            # one query for the changed pairs' last `min_candles` bars (two with a warm store)
+            candles = await self._load_candles(db, changed, latest, min_candles)
+
+            sem = asyncio.Semaphore(max(1, int(self.concurrency)))
+            tasks = []
+            for pair in changed:
+                arrays = candles.get(pair)
+                if arrays is None or len(arrays["close"]) < min_candles:
+                    continue
+                tasks.append(asyncio.ensure_future(self._analyze_pair(sem, pair[0], pair[1], arrays)))
+
+            analyzed = 0
+            try:
+                for next_done in asyncio.as_completed(tasks):
+                    try:
+                        res = await next_done
+                    except Exception:
+                        logger.exception("scanner pair analysis failed")
+                        continue
+                    if res is None:
+                        continue
+                    pair = (res["symbol"], res["timeframe"])
+                    self._analysis[pair] = {"bar": latest[pair], "signal": res["signal"]}
+                    analyzed += 1
+                    if on_result is not None:
+                        on_result(pair)
+            finally:
+                for t in tasks:
+                    t.cancel()
+
+        return latest, analyzed
+
+    def project(
+        self,
+        user_id: str,
+        pairs: List[Pair],
+        weights: Dict[str, float],
+        min_score: Optional[float] = None,
+        min_confidence: Optional[float] = None,
+        force: bool = False,
+        staged: Optional[Dict[Tuple[str, Pair], Dict[str, Any]]] = None,
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Per-user step over cached analyses: rank with the user's weights, apply
+        thresholds, and build TradingSignal rows only for bars the user hasn't
+        been given a signal for yet. Returns (rows to insert, result items).
+        The new rows' carry-forward entries go to `staged`; pass it to _write(),
+        which keeps them once the rows are committed.
+        """
+        rows: List[Dict[str, Any]] = []
+        results: List[Dict[str, Any]] = []
+        now = datetime.datetime.utcnow()
+
+        for pair in pairs:
+            cached = self._analysis.get(pair)
+            if cached is None:
+                continue
+            symbol, tf = pair
+            sig = cached["signal"]
+            weight = float(weights.get(symbol, 1.0))
+            base_score = float(sig.get("score") or 0.0)
+            adj_score = float(rank_score(base_score, weight))
+            confidence = float(sig.get("confidence") or 0.0)
+
+            if min_score is not None and adj_score < float(min_score):
+                continue
+            if min_confidence is not None and confidence < float(min_confidence):
+                continue
+
+            item = {
+                "symbol": symbol,
+                "timeframe": tf,
+                "action": str(sig.get("action") or "NEUTRAL"),
+                "score": adj_score,
+                "confidence": confidence,
+                "weight": weight,
+            }
+
+            seen = self._last.get((user_id, pair))
+            if not force and seen is not None and seen["bar"] == cached["bar"]:
+                results.append({**item, "signal_id": seen["signal_id"], "carried": True})
+                continue
+
+            # ids are generated here so the whole scan is one INSERT
+            row_id = uuid.uuid4()
+            rows.append({
+                "id": row_id,
+                "user_id": user_id,
+                "source": "scanner",
+                "symbol": symbol,
+                "timeframe": tf,
+                "action": item["action"],
+                "confidence": confidence,
+                "score": adj_score,
+                "entry_price": sig.get("entry_price"),
+                "suggested_sl": sig.get("suggested_sl"),
+                "suggested_tp": sig.get("suggested_tp"),
+                "context": sig.get("adaptive"),
+                "created_at": now,
+            })
+            results.append({**item, "signal_id": str(row_id)})
+            if staged is not None:
+                staged[(user_id, pair)] = {"bar": cached["bar"], "signal_id": str(row_id)}
+
+        return rows, results
+
+    @staticmethod
+    def latest_upsert(user_id: str, results: List[Dict[str, Any]], now: datetime.datetime):
+        """
+        One multi-row upsert of the user's current signal per pair. Carried-forward
+        pairs are included too, so updated_at tracks the last scan that confirmed them.
+        """
+        stmt = pg_insert(ScannerLatestSignal.__table__).values([
             {
-                "timestamp": r.time.isoformat(),
-                "open": r.open,
-                "high": r.high,
-                "low": r.low,
-                "close": r.close,
-                "volume": r.volume,
+                "user_id": user_id,
+                "symbol": r["symbol"],
+                "timeframe": r["timeframe"],
+                "signal_id": r["signal_id"],
+                "action": r["action"],
+                "score": r["score"],
+                "confidence": r["confidence"],
+                "updated_at": now,
             }
-            for r in rows
-        ]
+            for r in results
+        ])
+        return stmt.on_conflict_do_update(
+            index_elements=["user_id", "symbol", "timeframe"],
+            set_={c: stmt.excluded[c] for c in ("signal_id", "action", "score", "confidence", "updated_at")},
+        )
+
+    async def _write(
+        self,
+        db: AsyncSession,
+        user_id: str,
+        rows: List[Dict[str, Any]],
+        results: List[Dict[str, Any]],
+        staged: Optional[Dict[Tuple[str, Pair], Dict[str, Any]]] = None,
+    ) -> None:
+        # single multi-row INSERT for the whole scan, then the latest-signal index
+        try:
+            if rows:
+                await db.execute(insert(TradingSignal.__table__).values(rows))
+            if results:
+                await db.execute(self.latest_upsert(user_id, results, datetime.datetime.utcnow()))
+            await db.commit()
+        except BaseException:
+            # the staged ids were never stored: later scans must not carry them forward
+            await db.rollback()
+            raise
+        if staged:
+            self._last.update(staged)
 
-    async def scan_once(self, db: AsyncSession, user_id: str) -> Dict[str, Any]:
+    async def scan_once(
+        self,
+        db: AsyncSession,
+        user_id: str,
+        force: bool = False,
+        weights: Optional[Dict[str, float]] = None,
+        min_score: Optional[float] = None,
+        min_confidence: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """
+        Shared analysis (only pairs with a new bar) + this user's projection.
+        weights override the universe symbol weights for this user.
+        force=True re-analyzes every pair and writes fresh rows.
+        """
         settings = SettingsService(db)
         uni_raw = await settings.get("SCANNER_UNIVERSE_JSON")
         uni = parse_universe(uni_raw)
+        min_candles = int(uni["min_candles"])
 
-        results: List[Dict[str, Any]] = []
+        pairs = universe_pairs(uni)
+        latest, analyzed = await self.refresh_analysis(db, pairs, min_candles, force=force)
 
-        for s in uni["symbols"]:
-            symbol = s["symbol"]
-            weight = float(s.get("weight", 1.0))
+        # pairs whose bar is known but has no fresh analysis (e.g. not enough candles) are dropped
+        live = [p for p in pairs if p in latest and self._analysis.get(p, {}).get("bar") == latest[p]]
+        return await self.publish(
+            db, uni, user_id, live, analyzed,
+            force=force, weights=weights, min_score=min_score, min_confidence=min_confidence,
+        )
 
-            for tf in uni["timeframes"]:
-                candles = await self._load_candles(db, symbol, tf, int(uni["min_candles"]))
-                if len(candles) < int(uni["min_candles"]):
-                    continue
+    async def publish(
+        self,
+        db: AsyncSession,
+        uni: Dict[str, Any],
+        user_id: str,
+        live: List[Pair],
+        analyzed: int,
+        force: bool = False,
+        weights: Optional[Dict[str, float]] = None,
+        min_score: Optional[float] = None,
+        min_confidence: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """Project cached analyses of `live` pairs for the user, write new rows, rank top-k."""
+        uni_weights = {str(s["symbol"]): float(s.get("weight", 1.0)) for s in uni["symbols"]}
+        staged: Dict[Tuple[str, Pair], Dict[str, Any]] = {}
+        rows, results = self.project(
+            user_id,
+            live,
+            {**uni_weights, **(weights or {})},
+            min_score=min_score,
+            min_confidence=min_confidence,
+            force=force,
+            staged=staged,
+        )
 
-                out = await self.engine.analyze_market(
-                    data=candles,
-                    symbol=symbol,
-                    timeframe=tf,
-                    extra_context=None,
-                    db=db,  # ??? ??? AI registry inference
-                )
+        await self._write(db, user_id, rows, results, staged)
 
-                sig = out.get("signal") or {}
-                base_score = float(sig.get("score") or 0.0)
-                adj_score = rank_score(base_score, weight)
+        skipped = len(live) - analyzed
+        self._stats["scans"] += 1
+        self._stats["analyzed"] += analyzed
+        self._stats["skipped"] += skipped
 
-                row = TradingSignal(
-                    user_id=user_id,
-                    source="scanner",
-                    symbol=symbol,
-                    timeframe=tf,
-                    action=str(sig.get("action") or "NEUTRAL"),
-                    confidence=float(sig.get("confidence") or 0.0),
-                    score=float(adj_score),
-                    entry_price=sig.get("entry_price"),
-                    suggested_sl=sig.get("suggested_sl"),
-                    suggested_tp=sig.get("suggested_tp"),
-                    context=sig.get("adaptive"),
-                )
-                db.add(row)
-
-                # flush to get row.id before commit
-                await db.flush()
-
-                results.append(
-                    {
-                        "signal_id": str(row.id),
-                        "symbol": symbol,
-                        "timeframe": tf,
-                        "action": row.action,
-                        "score": float(row.score or 0.0),
-                        "confidence": float(row.confidence or 0.0),
-                        "weight": weight,
-                    }
+        results.sort(key=lambda x: x["score"], reverse=True)
+        top_k = int(uni.get("top_k", uni.get("top_k", 10)) or 10)
+
+        out = {
+            "count": len(results),
+            "analyzed": analyzed,
+            "skipped": skipped,
+            "written": len(rows),
+            "top": results[:top_k],
+        }
+        self.hub.publish({"type": "done", "user_id": user_id, **out})
+        return out
+
+    async def scan_stream(
+        self,
+        db: AsyncSession,
+        user_id: str,
+        force: bool = False,
+        weights: Optional[Dict[str, float]] = None,
+        min_score: Optional[float] = None,
+        min_confidence: Optional[float] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming scan_once. Yields events as they happen:
+          {"type": "result", "item": ...}  each pair as soon as it's ready
+          {"type": "topk", "top": [...]}   whenever the running top-k changes
+          {"type": "done", ...}            same summary as scan_once
+        Rows are still written in one INSERT at the end; a stream closed before
+        that writes (and remembers) nothing.
+        """
+        settings = SettingsService(db)
+        uni = parse_universe(await settings.get("SCANNER_UNIVERSE_JSON"))
+        min_candles = int(uni["min_candles"])
+        top_k = int(uni.get("top_k", 10) or 10)
+        all_weights = {
+            **{str(s["symbol"]): float(s.get("weight", 1.0)) for s in uni["symbols"]},
+            **(weights or {}),
+        }
+
+        ready: asyncio.Queue = asyncio.Queue()
+        refresh = asyncio.ensure_future(self.refresh_analysis(
+            db, universe_pairs(uni), min_candles, force=force, on_result=ready.put_nowait,
+        ))
+        refresh.add_done_callback(lambda _: ready.put_nowait(None))
+
+        heap = TopK(top_k)
+        staged: Dict[Tuple[str, Pair], Dict[str, Any]] = {}
+        rows: List[Dict[str, Any]] = []
+        streamed: List[Dict[str, Any]] = []
+        live: List[Pair] = []
+        count = 0
+        try:
+            while True:
+                pair = await ready.get()
+                if pair is None:
+                    break
+                live.append(pair)
+                new_rows, items = self.project(
+                    user_id, [pair], all_weights,
+                    min_score=min_score, min_confidence=min_confidence, force=force, staged=staged,
                 )
+                rows.extend(new_rows)
+                streamed.extend(items)
+                count += len(items)
+                for item in items:
+                    yield {"type": "result", "item": item}
+                    if heap.push(item):
+                        event = {"type": "topk", "user_id": user_id, "top": heap.items()}
+                        self.hub.publish(event)
+                        yield event
 
-        await db.commit()
+            _, analyzed = await refresh
+        finally:
+            if not refresh.done():
+                refresh.cancel()
 
-        results.sort(key=lambda x: x["score"], reverse=True)
-        top_k = int(uni.get("top_k", uni.get("top_k", 10)) or 10)
+        await self._write(db, user_id, rows, streamed, staged)
+
+        skipped = len(live) - analyzed
+        self._stats["scans"] += 1
+        self._stats["analyzed"] += analyzed
+        self._stats["skipped"] += skipped
+
+        done = {
+            "type": "done",
+            "user_id": user_id,
+            "count": count,
+            "analyzed": analyzed,
+            "skipped": skipped,
+            "written": len(rows),
+            "top": heap.items(),
+        }
+        self.hub.publish(done)
+        yield done
+
+    def export_analysis(self, pairs: List[Pair]) -> List[Dict[str, Any]]:
+        """Cached analyses of `pairs` in a JSON-safe form (shard task results)."""
+        out = []
+        for pair in pairs:
+            cached = self._analysis.get(pair)
+            if cached is None:
+                continue
+            out.append({
+                "symbol": pair[0],
+                "timeframe": pair[1],
+                "bar": cached["bar"].isoformat() if hasattr(cached["bar"], "isoformat") else cached["bar"],
+                "signal": json.loads(json.dumps(cached["signal"], default=str)),
+            })
+        return out
 
-        return {"count": len(results), "top": results[:top_k]}
\ No newline at end of file
+    def ingest_analysis(self, items: List[Dict[str, Any]]) -> List[Pair]:
+        """Load analyses exported by other workers into the local cache; returns their pairs."""
+        pairs = []
+        for it in items:
+            pair = (str(it["symbol"]), str(it["timeframe"]))
+            bar = it["bar"]
+            if isinstance(bar, str):
+                bar = datetime.datetime.fromisoformat(bar)
+            self._analysis[pair] = {"bar": bar, "signal": it["signal"]}
+            pairs.append(pair)
+        return pairs
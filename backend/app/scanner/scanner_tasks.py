@@ -2,15 +2,158 @@ from __future__ import annotations
 
 import asyncio
 import logging
+import os
+from typing import Any, Dict, List, Optional
+from uuid import UUID
 
+from app.core.config import settings as app_settings
 from app.services.notification_service import celery_app
 from app.database.connection import get_db
 from app.services.settings_service import SettingsService
 from app.scanner.execution_service import ScannerExecutionService
+from app.scanner.candles import universe_pairs
+from app.scanner.sharding import plan_shards, shard_queue
+from app.scanner.universe import parse_universe
 
 logger = logging.getLogger(__name__)
 
 
+_scanner = None
+
+
+def _get_scanner():
+    # built once per worker process so carry-forward state survives between beats
+    global _scanner
+    if _scanner is None:
+        from app.core.trading_engine import TradingEngine
+        from app.market_data.candle_store import default_store
+        from app.scanner.opportunity_scanner import SmartOpportunityScanner
+
+        _scanner = SmartOpportunityScanner(TradingEngine(), store=default_store())
+    return _scanner
+
+
+async def _system_user_id(settings: SettingsService) -> Optional[str]:
+    """AUTO_SELECT_SYSTEM_USER_ID, or None unless it is a user's UUID (signal rows reference users)."""
+    raw = await settings.get("AUTO_SELECT_SYSTEM_USER_ID")
+    try:
+        return str(UUID(str(raw))) if raw else None
+    except ValueError:
+        return None
+
+
+async def _run_scan_once(force: bool = False) -> dict:
+    async for db in get_db():
+        settings = SettingsService(db)
+        system_user_id = await _system_user_id(settings)
+        if system_user_id is None:
+            logger.error("scanner run skipped: AUTO_SELECT_SYSTEM_USER_ID is not set to a user id")
+            return {"ok": False, "error": "system_user_not_configured"}
+
+        n_shards = int(getattr(app_settings, "SCANNER_SHARDS", 0) or 0)
+        if n_shards > 1:
+            uni = parse_universe(await settings.get("SCANNER_UNIVERSE_JSON"))
+            res = dispatch_sharded_scan(uni, system_user_id, n_shards=n_shards, force=force)
+            return {"ok": True, "sharded": True, "shards": n_shards, "task_id": res.id}
+
+        scanner = _get_scanner()
+        out = await scanner.scan_once(db=db, user_id=system_user_id, force=force)
+        return {"ok": True, "count": out["count"], "analyzed": out["analyzed"],
+                "skipped": out["skipped"], "stats": scanner.stats()}
+
+    return {"ok": False, "error": "db_not_available"}
+
+
+@celery_app.task(bind=True)
+def scanner_run(self, force: bool = False) -> dict:
+    """Beat entry ("scanner-run"): cheap when no candle closed since the last run."""
+    try:
+        return asyncio.run(_run_scan_once(force=force))
+    except Exception as e:
+        logger.exception("scanner_run failed: %s", e)
+        return {"ok": False, "error": str(e)}
+
+
+# ---------------------------------------------------------------------------
+# Sharded scan: group of shard tasks -> merge (chord)
+# ---------------------------------------------------------------------------
+
+def build_sharded_scan(
+    uni: Dict[str, Any],
+    user_id: str,
+    n_shards: int,
+    affinity: Optional[bool] = None,
+    force: bool = False,
+):
+    """
+    Fan the universe out as one scanner_shard task per shard and merge the
+    results in scanner_merge. With affinity, shard i always goes to queue
+    SCANNER_SHARD_QUEUE_PREFIX + i, so a worker consuming that queue keeps the
+    same symbols (and their cached candles/models/analyses) warm.
+    """
+    from celery import chord, group
+
+    if affinity is None:
+        affinity = bool(getattr(app_settings, "SCANNER_SHARD_AFFINITY", True))
+    prefix = str(getattr(app_settings, "SCANNER_SHARD_QUEUE_PREFIX", "scanner.shard."))
+
+    shards = plan_shards(universe_pairs(uni), n_shards, affinity=affinity)
+    header = []
+    for idx, pairs in enumerate(shards):
+        if not pairs:
+            continue
+        sig = scanner_shard.s([list(p) for p in pairs], int(uni["min_candles"]), force)
+        queue = shard_queue(idx, affinity, prefix)
+        header.append(sig.set(queue=queue) if queue else sig)
+
+    return chord(group(header), scanner_merge.s(user_id=user_id, force=force))
+
+
+def dispatch_sharded_scan(uni: Dict[str, Any], user_id: str, n_shards: int, **kwargs):
+    return build_sharded_scan(uni, user_id, n_shards, **kwargs).apply_async()
+
+
+async def _run_shard(pairs: List[List[str]], min_candles: int, force: bool) -> dict:
+    async for db in get_db():
+        scanner = _get_scanner()
+        pairs_t = [(str(p[0]), str(p[1])) for p in pairs]
+        latest, analyzed = await scanner.refresh_analysis(db, pairs_t, min_candles, force=force)
+        live = [p for p in pairs_t if p in latest and scanner._analysis.get(p, {}).get("bar") == latest[p]]
+        return {"analyzed": analyzed, "items": scanner.export_analysis(live), "pid": os.getpid()}
+
+    return {"analyzed": 0, "items": [], "error": "db_not_available"}
+
+
+@celery_app.task(bind=True)
+def scanner_shard(self, pairs: List[List[str]], min_candles: int, force: bool = False) -> dict:
+    """Analyze one shard with this worker's cached scanner; returns JSON-safe analyses."""
+    return asyncio.run(_run_shard(pairs, min_candles, force))
+
+
+async def _run_merge(shard_results: List[dict], user_id: str, force: bool) -> dict:
+    async for db in get_db():
+        settings = SettingsService(db)
+        uni = parse_universe(await settings.get("SCANNER_UNIVERSE_JSON"))
+
+        scanner = _get_scanner()
+        live = []
+        analyzed = 0
+        for r in shard_results or []:
+            live.extend(scanner.ingest_analysis(r.get("items") or []))
+            analyzed += int(r.get("analyzed") or 0)
+
+        out = await scanner.publish(db, uni, user_id, live, analyzed, force=force)
+        return {"ok": True, "shards": len(shard_results or []), **out}
+
+    return {"ok": False, "error": "db_not_available"}
+
+
+@celery_app.task(bind=True)
+def scanner_merge(self, shard_results: List[dict], user_id: str, force: bool = False) -> dict:
+    """Chord callback: rank_score projection + top-k over every shard, one INSERT."""
+    return asyncio.run(_run_merge(shard_results, user_id, force))
+
+
 async def _run_auto_select_once() -> dict:
     async for db in get_db():
         settings = SettingsService(db)
@@ -48,7 +191,10 @@ async def _run_auto_select_once() -> dict:
 
         # --- Execute best scanner signal ---
         # system user id for automation (configurable)
-        system_user_id = str(await settings.get("AUTO_SELECT_SYSTEM_USER_ID") or "system")
+        system_user_id = await _system_user_id(settings)
+        if system_user_id is None:
+            logger.error("auto-select skipped: AUTO_SELECT_SYSTEM_USER_ID is not set to a user id")
+            return {"ok": False, "error": "system_user_not_configured"}
 
         # TODO: Replace with real balance fetching if available
         balance = float(await settings.get("AUTO_SELECT_SYSTEM_BALANCE") or 12450.0)
@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+import zlib
+from typing import List, Optional
+
+from app.scanner.candles import Pair
+
+
+def shard_of(symbol: str, n_shards: int) -> int:
+    # crc32, not hash(): must be stable across processes and restarts
+    return zlib.crc32(symbol.encode("utf-8")) % max(1, n_shards)
+
+
+def plan_shards(pairs: List[Pair], n_shards: int, affinity: bool = True) -> List[List[Pair]]:
+    """
+    Split (symbol, timeframe) pairs into at most `n_shards` non-empty shards.
+
+    affinity=True keeps every timeframe of a symbol in the same shard, and the
+    same symbol always maps to the same shard index (and so the same queue).
+    Otherwise pairs are dealt round-robin for the most even split.
+    """
+    n = max(1, int(n_shards))
+    shards: List[List[Pair]] = [[] for _ in range(n)]
+    for i, pair in enumerate(pairs):
+        idx = shard_of(pair[0], n) if affinity else i % n
+        shards[idx].append(pair)
+    return shards if affinity else [s for s in shards if s]
+
+
+def shard_queue(index: int, affinity: bool, prefix: str) -> Optional[str]:
+    """Queue for a shard task; None means the default queue (any worker)."""
+    return f"{prefix}{index}" if affinity else None
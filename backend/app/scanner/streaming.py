@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import json
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Set, Tuple
+
+
+class TopK:
+    """
+    Running top-k by score over a stream of scanner items: a size-k min-heap,
+    so each push is O(log k) and only items that enter the top-k change it.
+    """
+
+    def __init__(self, k: int):
+        self.k = max(1, int(k))
+        self._heap: List[Tuple[float, int, Dict[str, Any]]] = []
+        self._seq = itertools.count()
+
+    def push(self, item: Dict[str, Any]) -> bool:
+        """Add an item; True if the top-k changed."""
+        entry = (float(item.get("score") or 0.0), -next(self._seq), item)
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+            return True
+        if entry[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, entry)
+            return True
+        return False
+
+    def items(self) -> List[Dict[str, Any]]:
+        # best first; on equal score the earlier result ranks higher
+        return [e[2] for e in sorted(self._heap, key=lambda e: e[:2], reverse=True)]
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+
+class ScanHub:
+    """
+    In-process fan-out of scanner events (top-k changes, scan completion) to
+    subscribers such as dashboard WebSockets. Slow subscribers drop their
+    oldest event rather than block the scan.
+    """
+
+    def __init__(self, max_queue: int = 100):
+        self.max_queue = max_queue
+        self._subscribers: Set[asyncio.Queue] = set()
+
+    @asynccontextmanager
+    async def subscribe(self) -> AsyncIterator[asyncio.Queue]:
+        q: asyncio.Queue = asyncio.Queue(maxsize=self.max_queue)
+        self._subscribers.add(q)
+        try:
+            yield q
+        finally:
+            self._subscribers.discard(q)
+
+    def publish(self, event: Dict[str, Any]) -> None:
+        for q in list(self._subscribers):
+            if q.full():
+                try:
+                    q.get_nowait()
+                except asyncio.QueueEmpty:
+                    pass
+            q.put_nowait(event)
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscribers)
+
+
+def sse_event(event: Dict[str, Any]) -> str:
+    """Server-Sent Events frame; the event name is the event's "type"."""
+    return f"event: {event.get('type', 'message')}\ndata: {json.dumps(event, default=str)}\n\n"
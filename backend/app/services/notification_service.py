@@ -46,8 +46,12 @@ celery_app.conf.beat_schedule = {
         "task": "app.scanner.scanner_tasks.scanner_run",
         "schedule": 120.0,
     },
+    "archive-candles-daily": {
+        "task": "app.market_data.archive_tasks.archive_candles",
+        "schedule": 86400.0,
+    },
     "train-models-daily": {
-        "task": "app.ai.training.tasks.train_models",
+        "task": "app.ai.training.tasks.train_universe_models",
         "schedule": 86400.0,  # once per day
     },
     "predictive-run-6h": {
@@ -61,6 +65,7 @@ celery_app.conf.beat_schedule = {
 }
 # Ensure tasks are registered
 from app.market_data import dxy_tasks  # noqa: F401
+from app.market_data import archive_tasks  # noqa: F401
 from app.scanner import scanner_tasks  # noqa: F401
 from app.ai.training import tasks as ai_training_tasks  # noqa: F401
 from app.predictive import tasks as predictive_tasks  # noqa: F401
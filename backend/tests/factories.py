@@ -0,0 +1,78 @@
+"""
+Shared test data factories (plain functions, importable from any test module).
+"""
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.market_data.resample import TIMEFRAME_MINUTES
+
+
+def candles_df(n: int, seed: int = 0) -> pd.DataFrame:
+    """`n` random-walk M15 candles starting 2024-01-01, as load_candles_df returns them."""
+    rng = np.random.default_rng(seed)
+    close = 2000.0 + np.cumsum(rng.normal(0, 2.0, n))
+    return pd.DataFrame({
+        "time": pd.date_range("2024-01-01", periods=n, freq="15min"),
+        "open": close + rng.normal(0, 0.5, n),
+        "high": close + np.abs(rng.normal(0, 1.5, n)),
+        "low": close - np.abs(rng.normal(0, 1.5, n)),
+        "close": close,
+        "volume": rng.integers(100, 1000, n).astype(float),
+    })
+
+
+class FakeBridge:
+    """
+    RATES replies: `count` bars ending with the one forming at `now`, on a broker
+    clock `offset` seconds ahead of UTC. Bars are `step` seconds long (default:
+    the timeframe's); the forming bar closes at `tick`, the others at 1.5. The
+    next `errors` calls answer with a bridge error.
+    """
+
+    host = "127.0.0.1"
+
+    def __init__(self, now: float, offset: float = 0.0, step: Optional[int] = None, tick: float = 1.5):
+        self.now = now
+        self.offset = offset
+        self.step = step
+        self.tick = tick
+        self.errors = 0
+        self.calls = []
+
+    @property
+    def counts(self) -> List[int]:
+        return [c[2] for c in self.calls]
+
+    async def get_rates(self, symbol, timeframe, count=300, **kwargs):
+        self.calls.append((symbol, timeframe, count))
+        if self.errors:
+            self.errors -= 1
+            return {"error": "timeout"}
+        step = self.step or TIMEFRAME_MINUTES[timeframe] * 60
+        last = int((self.now + self.offset) // step) * step
+        return {"rates": [
+            {"time": last - i * step, "open": 1.0, "high": 2.0, "low": 0.5,
+             "close": self.tick if i == 0 else 1.5, "tick_volume": 3}
+            for i in reversed(range(count))
+        ]}
+
+
+class FakeSession:
+    """An AsyncSession stand-in that records the bound parameters of each statement."""
+
+    def __init__(self):
+        self.inserts = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, stmt, params=None):
+        self.inserts.append(stmt.compile().params)
+
+    async def commit(self):
+        pass
@@ -0,0 +1,71 @@
+"""
+Startup-time regression tests
+Guards API/Celery import cost with `python -X importtime`
+"""
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+
+# Cumulative import budget for the API entrypoint (microseconds)
+STARTUP_BUDGET_US = int(os.getenv("STARTUP_IMPORT_BUDGET_US", "6000000"))
+
+HEAVY_ML_MODULES = ("tensorflow", "keras", "xgboost", "lightgbm")
+
+
+def _import_profile(module: str) -> dict:
+    """Run a fresh interpreter with -X importtime and return {module: cumulative_us}."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    assert proc.returncode == 0, proc.stderr[-2000:]
+
+    profile = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue  # header row
+        profile[parts[2].strip()] = int(parts[1].strip())
+    return profile
+
+
+@pytest.mark.slow
+@pytest.mark.ai
+class TestStartupTime:
+    """Importing the app must not pay for ML backends."""
+
+    @pytest.mark.parametrize("module", ["app.main", "app.services.notification_service"])
+    def test_no_ml_backend_on_import(self, module):
+        profile = _import_profile(module)
+        loaded = [m for m in profile if m.split(".")[0] in HEAVY_ML_MODULES]
+        assert loaded == [], f"{module} eagerly imports: {sorted(loaded)[:10]}"
+
+    def test_api_import_within_budget(self):
+        profile = _import_profile("app.main")
+        assert "app.main" in profile
+        assert profile["app.main"] <= STARTUP_BUDGET_US, (
+            f"app.main import took {profile['app.main'] / 1000:.0f}ms "
+            f"(budget {STARTUP_BUDGET_US / 1000:.0f}ms)"
+        )
+
+    def test_ensemble_builds_on_demand(self):
+        from app.ai.ensemble import EnsembleFusion
+
+        ensemble = EnsembleFusion()
+        assert ensemble._lstm is None
+        assert ensemble._xgboost is None
+        assert ensemble._lightgbm is None
+
+        assert ensemble.lstm.is_trained is False
+        assert ensemble._lstm is not None
+        assert ensemble.lstm._model_built is False
@@ -0,0 +1,131 @@
+"""
+Unit Tests for the bridge's pushed tick / bar feed
+Gap backfill, duplicate bars, tick delivery and the ingestor's push path
+"""
+import asyncio
+import json
+
+import pytest
+import zmq
+import zmq.asyncio
+
+from app.market_data import candle_ingest as ingest_mod
+from app.market_data.bridge_feed import BridgeSubscriber
+from app.market_data.candle_ingest import CandleIngestor
+from tests.factories import FakeBridge, FakeSession
+
+T0 = 1_700_000_100  # epoch seconds, on a 5-minute boundary
+
+
+def _bar(seq, t):
+    return {"seq": seq, "time": t, "open": 1.0, "high": 2.0, "low": 0.5, "close": 1.5, "tick_volume": 3}
+
+
+@pytest.mark.unit
+class TestBridgeSubscriber:
+
+    async def test_seq_gap_backfills_before_delivering(self):
+        bridge = FakeBridge(now=T0 + 5 * 60 + 10)
+        got = []
+        feed = BridgeSubscriber(connector=bridge, on_bars=[got.extend])
+
+        await feed.handle("bar.XAUUSD.M1", _bar(1, T0))
+        await feed.handle("bar.XAUUSD.M1", _bar(2, T0 + 60))
+        await feed.handle("bar.XAUUSD.M1", _bar(2, T0 + 60))  # redelivered
+        assert bridge.calls == []
+
+        # seq 3..4 were lost while the SUB socket reconnected
+        await feed.handle("bar.XAUUSD.M1", _bar(5, T0 + 240))
+        assert bridge.calls == [("XAUUSD", "M1", 5)]
+        assert [r["epoch_ms"] // 1000 - T0 for r in got] == [0, 60, 120, 180, 240]
+        assert feed.stats()["gaps"] == 1 and feed.stats()["backfilled"] == 2
+        assert feed.stats()["duplicates"] == 1
+
+    async def test_failed_backfill_drops_the_bar_until_a_retry_fills_the_gap(self):
+        bridge = FakeBridge(now=T0 + 5 * 60 + 10)
+        got = []
+        feed = BridgeSubscriber(connector=bridge, on_bars=[got.extend])
+
+        await feed.handle("bar.XAUUSD.M1", _bar(1, T0))
+        bridge.errors = 1
+        await feed.handle("bar.XAUUSD.M1", _bar(4, T0 + 180))
+        assert [r["epoch_ms"] // 1000 - T0 for r in got] == [0]
+        assert feed.stats()["dropped"] == 1
+
+        # the next bar is in seq but still past the hole, so the backfill is retried
+        await feed.handle("bar.XAUUSD.M1", _bar(5, T0 + 240))
+        assert len(bridge.calls) == 2
+        assert [r["epoch_ms"] // 1000 - T0 for r in got] == [0, 60, 120, 180, 240]
+
+    async def test_first_bar_is_checked_against_the_consumers_last_bar(self):
+        bridge = FakeBridge(now=T0 + 3 * 60 + 10)
+        got = []
+        feed = BridgeSubscriber(connector=bridge, on_bars=[got.extend], last_bar=lambda pair: T0 * 1000)
+
+        await feed.handle("bar.XAUUSD.M1", _bar(40, T0 + 180))
+        assert [r["epoch_ms"] // 1000 - T0 for r in got] == [60, 120, 180]
+
+    async def test_ticks_and_failing_handlers(self):
+        ticks = []
+
+        def broken(tick):
+            raise RuntimeError("boom")
+
+        async def collect(tick):
+            ticks.append(tick)
+
+        feed = BridgeSubscriber(connector=FakeBridge(T0), on_tick=[broken, collect])
+        await feed.handle("tick.XAUUSD", {"seq": 1, "time": T0, "bid": 2000.1, "ask": 2000.4, "last": None})
+        await feed.handle("tick.XAUUSD", {"seq": 3, "time": T0 + 1, "bid": "2000.2", "ask": 2000.5})
+
+        assert [t["bid"] for t in ticks] == [2000.1, 2000.2] and ticks[0]["epoch_ms"] == T0 * 1000
+        stats = feed.stats()
+        assert stats["ticks"] == 2 and stats["tick_gaps"] == 1 and stats["errors"] == 2
+
+    async def test_subscribes_over_zmq(self):
+        ctx = zmq.asyncio.Context.instance()
+        pub = ctx.socket(zmq.PUB)
+        port = pub.bind_to_random_port("tcp://127.0.0.1")
+        got = asyncio.Event()
+        feed = BridgeSubscriber(connector=FakeBridge(T0), port=port, symbols=["XAUUSD"], bars=False,
+                                on_tick=[lambda tick: got.set()])
+        stop = asyncio.Event()
+        task = asyncio.ensure_future(feed.run_forever(stop))
+        try:
+            for seq in range(200):  # until the subscription has propagated
+                await pub.send_multipart([b"tick.XAUUSDm", json.dumps({"seq": seq, "bid": 1.0}).encode()])
+                await pub.send_multipart([b"tick.XAUUSD", json.dumps({"seq": seq, "bid": 1.0}).encode()])
+                if got.is_set():
+                    break
+                await asyncio.sleep(0.02)
+            assert got.is_set()
+        finally:
+            stop.set()
+            await asyncio.wait_for(task, 2)
+            pub.close(linger=0)
+
+
+@pytest.mark.unit
+class TestIngestorPush:
+
+    async def test_pushed_bars_are_stored_and_postpone_the_poll(self, monkeypatch):
+        async def no_candles(db, pairs):
+            return {}
+
+        monkeypatch.setattr(ingest_mod, "latest_bar_times", no_candles)
+        db = FakeSession()
+        bridge = FakeBridge(now=T0 + 30)
+        ing = CandleIngestor(connector=bridge, session_factory=lambda: db, backfill=10)
+        ing.pairs = pairs = [("XAUUSD", "M1")]
+        await ing.run_once(pairs, now=T0 + 30)
+
+        feed = BridgeSubscriber(connector=bridge, on_bars=[lambda rows: ing.push(rows, now=T0 + 61)],
+                                last_bar=ing._hwm.get)
+        await feed.handle("bar.XAUUSD.M1", _bar(7, T0))
+        await feed.handle("bar.EURUSD.M1", _bar(7, T0))  # not in the universe
+        assert ing.stats()["pushed"] == 1 and ing._hwm[pairs[0]] == T0 * 1000
+
+        # the bar the poll at T0 + 62 would have fetched is already stored
+        assert (await ing.run_once(pairs, now=T0 + 62))["polled"] == 0
+        assert ing._due[pairs[0]] > T0 + 120
+        assert len(bridge.calls) == 1
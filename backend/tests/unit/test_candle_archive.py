@@ -0,0 +1,105 @@
+"""
+Unit Tests for the Arrow candle archive
+Month partitions, pruned memory-mapped reads, incremental export
+"""
+import datetime
+
+import numpy as np
+import pytest
+
+from app.market_data import archive
+
+T0 = datetime.datetime(2024, 1, 1)
+
+
+@pytest.fixture
+def root(tmp_path, monkeypatch):
+    pytest.importorskip("pyarrow")
+    monkeypatch.setattr(archive.app_settings, "CANDLE_ARCHIVE_DIR", str(tmp_path), raising=False)
+    return str(tmp_path)
+
+
+def _rows(start: datetime.datetime, n: int, step=datetime.timedelta(hours=1), base=0.0):
+    return [(start + i * step, base + i, base + i + 1, base + i - 1, base + i + 0.5, 1.0) for i in range(n)]
+
+
+class FakeDB:
+    """Serves candle rows for the archive's min() and month-range queries."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = 0
+
+    async def execute(self, stmt, params=None):
+        self.queries += 1
+        p = stmt.compile().params
+        if "time_1" not in p:
+            return _Result([(min(r[0] for r in self.rows),)] if self.rows else [(None,)])
+        return _Result([r for r in self.rows if p["time_1"] < r[0] < p["time_2"]])
+
+
+class _Result:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def all(self):
+        return self._rows
+
+    def scalar(self):
+        return self._rows[0][0]
+
+
+@pytest.mark.unit
+class TestCandleArchive:
+
+    async def test_export_partitions_by_month_and_appends(self, root):
+        db = FakeDB(_rows(T0, 24 * 70))  # Jan 1 .. Mar 10
+        n = await archive.export_pair(db, "XAUUSD", "H1", until=datetime.datetime(2024, 3, 5))
+        assert n == 24 * (31 + 29 + 4)
+        assert [m.month for m, _ in archive.partitions("XAUUSD", "H1")] == [1, 2, 3]
+
+        # nothing new -> nothing written; later run appends only the tail of March
+        assert await archive.export_pair(db, "XAUUSD", "H1", until=datetime.datetime(2024, 3, 5)) == 0
+        assert await archive.export_pair(db, "XAUUSD", "H1", until=datetime.datetime(2024, 4, 1)) == 24 * 6
+        assert archive.last_archived("XAUUSD", "H1") == T0 + datetime.timedelta(hours=24 * 70 - 1)
+
+        df = archive.read_candles_df("XAUUSD", "H1")
+        assert len(df) == 24 * 70 and df["time"].is_monotonic_increasing and df["time"].is_unique
+        assert list(df.columns) == ["time", "open", "high", "low", "close", "volume"]
+
+    async def test_reads_prune_months_columns_and_rows(self, root, monkeypatch):
+        await archive.export_pair(FakeDB(_rows(T0, 24 * 90)), "XAUUSD", "H1", until=datetime.datetime(2024, 6, 1))
+
+        opened = []
+        real = archive._read_partition
+        monkeypatch.setattr(archive, "_read_partition", lambda path, cols: opened.append(path) or real(path, cols))
+
+        arrs = archive.read_arrays(
+            "XAUUSD", "H1",
+            start=datetime.datetime(2024, 2, 10), end=datetime.datetime(2024, 2, 11), columns=["close"],
+        )
+        assert len(opened) == 1 and opened[0].endswith("2024-02.arrow")
+        assert set(arrs) == {"time", "close"} and len(arrs["close"]) == 24
+        assert arrs["time"][0] == np.datetime64("2024-02-10T00:00")
+
+        opened.clear()
+        tail = archive.read_arrays("XAUUSD", "H1", limit=30)
+        assert len(opened) == 1  # March alone holds 30 bars
+        assert len(tail["close"]) == 30 and tail["time"][-1] == np.datetime64(T0 + datetime.timedelta(hours=24 * 90 - 1))
+
+    async def test_training_load_reads_archive_then_db_tail(self, root):
+        from app.ai.training import trainers
+
+        history = _rows(T0, 24 * 40)
+        await archive.export_pair(FakeDB(history), "XAUUSD", "H1", until=datetime.datetime(2024, 2, 1))
+        newer = _rows(datetime.datetime(2024, 2, 1), 24 * 9, base=10_000)
+
+        class TailDB:
+            async def execute(self, stmt, params=None):
+                since = stmt.compile().params["time_1"]
+                return _Result([r for r in newer if r[0] > since])
+
+        df = await trainers.load_candles_df(TailDB(), "XAUUSD", "H1", limit=500)
+        assert len(df) == 500 and df["time"].is_monotonic_increasing and df["time"].is_unique
+        assert df["time"].iloc[-1] == newer[-1][0]
+        assert df["open"].iloc[-24 * 9] == 10_000.0  # first bar from Postgres
@@ -0,0 +1,201 @@
+"""
+Unit Tests for MT5 candle ingestion
+RATES replies are normalized, deduped on epoch and written in batches
+"""
+import asyncio
+import datetime
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.market_data import candle_ingest as ingest_mod
+from app.market_data.candle_ingest import CandleIngestor, normalize_rates
+from tests.factories import FakeBridge, FakeSession
+
+T0 = 1_700_000_100  # epoch seconds, on a 5-minute boundary
+
+
+@pytest.fixture
+def session(monkeypatch):
+    db = FakeSession()
+
+    async def no_candles(db, pairs):
+        return {}
+
+    monkeypatch.setattr(ingest_mod, "latest_bar_times", no_candles)
+    return db
+
+
+def _rows_written(db):
+    return sum(1 for p in db.inserts for k in p if k.startswith("epoch_ms_m"))
+
+
+@pytest.mark.unit
+class TestNormalizeRates:
+
+    def test_time_formats_and_bad_bars(self):
+        resp = [
+            {"time": T0, "open": 1, "high": 2, "low": 0.5, "close": 1.5, "tick_volume": 7},
+            {"time": "2023-11-14T22:20:00Z", "open": 1, "high": 2, "low": 0.5, "close": 1.5},
+            {"timestamp": (T0 + 600) * 1000, "open": 1, "high": 2, "low": 0.5, "close": 1.5, "volume": 2},
+            {"time": T0, "open": 9, "high": 9, "low": 9, "close": 9},  # duplicate epoch: last wins
+            {"time": T0 + 900, "open": None, "high": 2, "low": 0.5, "close": 1.5},
+            "garbage",
+        ]
+        rows = normalize_rates(resp, "XAUUSD", "M5")
+
+        assert [r["epoch_ms"] for r in rows] == [T0 * 1000, (T0 + 300) * 1000, (T0 + 600) * 1000]
+        assert rows[0]["close"] == 9.0 and rows[0]["volume"] is None
+        assert rows[1]["time"] == datetime.datetime(2023, 11, 14, 22, 20)
+        assert rows[2]["volume"] == 2.0
+        assert normalize_rates({"error": "x"}, "XAUUSD", "M5") == []
+
+
+@pytest.mark.unit
+class TestCandleIngestor:
+
+    async def test_backfill_then_only_new_closed_bars(self, session):
+        bridge = FakeBridge(now=T0 + 30)
+        ing = CandleIngestor(connector=bridge, session_factory=lambda: session, backfill=10)
+        pairs = [("XAUUSD", "M1")]
+
+        out = await ing.run_once(pairs, now=T0 + 30)
+        assert out == {"polled": 1, "rows": 10}  # 11 fetched, forming bar dropped
+
+        # not due until the next minute boundary
+        assert (await ing.run_once(pairs, now=T0 + 45))["polled"] == 0
+
+        bridge.now = T0 + 62
+        out = await ing.run_once(pairs, now=T0 + 62)
+        assert out == {"polled": 1, "rows": 1}
+        assert bridge.calls[-1][2] < 10  # asks only for the gap since the high-water mark
+        assert _rows_written(session) == 11
+
+        row = {"time": datetime.datetime(2024, 1, 1), "symbol": "XAUUSD", "timeframe": "M1"}
+        sql = str(ingest_mod.candles_insert([row]).compile(dialect=postgresql.dialect()))
+        assert "ON CONFLICT (time, symbol, timeframe) DO NOTHING" in sql
+
+    async def test_missing_bar_backs_off(self, session):
+        bridge = FakeBridge(now=T0 + 30)
+        ing = CandleIngestor(connector=bridge, session_factory=lambda: session, backfill=5, retry_seconds=5)
+        pairs = [("XAUUSD", "M5")]
+        await ing.run_once(pairs, now=T0 + 30)
+
+        # boundary passed but the bridge hasn't rolled the bar yet
+        assert (await ing.run_once(pairs, now=T0 + 303))["rows"] == 0
+        assert ing._due[pairs[0]] == T0 + 308
+        assert (await ing.run_once(pairs, now=T0 + 305))["polled"] == 0
+
+    async def test_full_universe_single_worker(self, session):
+        symbols = [f"SYM{i:02d}" for i in range(30)]
+        pairs = [(s, tf) for s in symbols for tf in ingest_mod.TIMEFRAME_MINUTES]
+        bridge = FakeBridge(now=T0 + 30)
+        ing = CandleIngestor(connector=bridge, session_factory=lambda: session, backfill=50)
+
+        out = await ing.run_once(pairs, now=T0 + 30)
+
+        assert out == {"polled": 210, "rows": 210 * 50}
+        # one batch for the whole universe, in <= 3000-row statements
+        assert len(session.inserts) == 4 and _rows_written(session) == 210 * 50
+
+        stats = ing.stats()
+        assert stats["pairs"] == 210 and stats["rows"] == 210 * 50 and stats["rows_per_s"] > 0
+        assert ing._lag[("SYM00", "M1")] < 60  # seconds since the last closed M1 bar
+
+        # a minute later only the 30 M1 pairs are due
+        bridge.now = T0 + 62
+        assert (await ing.run_once(pairs, now=T0 + 62)) == {"polled": 30, "rows": 30}
+
+    async def test_derived_timeframes_built_from_m1(self, session, monkeypatch):
+        async def no_history(db, pairs, limit):
+            return {}
+
+        monkeypatch.setattr(ingest_mod, "load_universe_candles", no_history)
+        start = T0 - T0 % 3600 + 3600  # top of an hour
+        bridge = FakeBridge(now=start + 30)
+        ing = CandleIngestor(connector=bridge, session_factory=lambda: session, backfill=10, derived=["M5", "H1"])
+        pairs = [("XAUUSD", tf) for tf in ("M1", "M5", "H1")]
+
+        await ing.run_once(pairs, now=start + 30)
+        assert [c[1] for c in bridge.calls] == ["M1"]  # M5/H1 are not polled
+
+        for minute in range(1, 61):
+            bridge.now = start + minute * 60 + 2
+            await ing.run_once(pairs, now=bridge.now)
+            if minute == 30:
+                forming = ing.forming("XAUUSD", "H1")
+                assert forming[0] == start * 1000 and forming[5] == 30 * 3.0
+
+        assert all(c[1] == "M1" for c in bridge.calls)
+        # backfill 00:50..00:59 gives two M5 bars but only part of that hour: no H1 bar for it
+        assert ing.stats()["derived"] == 2 + 12 + 1
+        assert _rows_written(session) == 10 + 60 + 15
+        assert ing.forming("XAUUSD", "H1") is None
+        assert ing.next_wakeup(pairs, bridge.now) > 0
+
+    async def test_failed_write_does_not_lose_derived_bars(self, session, monkeypatch):
+        async def no_history(db, pairs, limit):
+            return {}
+
+        monkeypatch.setattr(ingest_mod, "load_universe_candles", no_history)
+        start = T0 - T0 % 3600 + 3600
+        bridge = FakeBridge(now=start + 2)
+        ing = CandleIngestor(connector=bridge, session_factory=lambda: session, backfill=1, derived=["M5"])
+        pairs = [("XAUUSD", "M1"), ("XAUUSD", "M5")]
+        await ing.run_once(pairs, now=start + 2)
+
+        for minute in range(1, 5):
+            bridge.now = start + minute * 60 + 2
+            await ing.run_once(pairs, now=bridge.now)
+
+        # the minute that closes the first M5 bar fails to commit, then is retried
+        async def lost(*args):
+            raise ConnectionError("db went away")
+
+        monkeypatch.setattr(session, "commit", lost)
+        bridge.now = start + 5 * 60 + 2
+        with pytest.raises(ConnectionError):
+            await ing.run_once(pairs, now=bridge.now)
+        monkeypatch.undo()
+        monkeypatch.setattr(ingest_mod, "load_universe_candles", no_history)
+
+        await ing.run_once(pairs, now=bridge.now + 1)
+        assert ing.stats()["derived"] == 1
+        assert ing.forming("XAUUSD", "M5") is None
+
+    async def test_failed_poll_write_keeps_a_concurrent_push(self, session):
+        start = T0 - T0 % 3600 + 3600
+        ing = CandleIngestor(connector=FakeBridge(now=start), session_factory=lambda: session, derived=["M5"])
+        minute = lambda m: normalize_rates([{"time": start + m * 60, "open": 1.0, "high": 2.0, "low": 0.5,
+                                             "close": 1.5, "tick_volume": 3}], "XAUUSD", "M1")
+        release = asyncio.Event()
+
+        class StalledSession(FakeSession):
+            async def commit(self):
+                await release.wait()
+                raise ConnectionError("db went away")
+
+        poll = asyncio.ensure_future(ing._accept(StalledSession(), {("XAUUSD", "M1"): minute(0)}))
+        await asyncio.sleep(0)
+        push = asyncio.ensure_future(ing._accept(session, {("XAUUSD", "M1"): minute(1)}))
+        await asyncio.sleep(0)
+        release.set()
+        with pytest.raises(ConnectionError):
+            await poll
+        await push
+
+        # the poll's rollback must not undo the minute the push stored
+        forming = ing.forming("XAUUSD", "M5")
+        assert forming is not None and forming[0] == start * 1000 and forming[5] == 3
+
+    async def test_lag_and_gap_use_the_broker_clock(self, session):
+        bridge = FakeBridge(now=T0 + 30, offset=3 * 3600)  # broker on UTC+3
+        ing = CandleIngestor(connector=bridge, session_factory=lambda: session, backfill=10)
+        pairs = [("XAUUSD", "M1")]
+        await ing.run_once(pairs, now=T0 + 30)
+        assert ing.stats()["clock_offset_s"] == 3 * 3600
+        assert 0 <= ing.stats()["lag_max_s"] < 60
+
+        bridge.now = T0 + 62
+        await ing.run_once(pairs, now=T0 + 62)
+        assert bridge.calls[-1][2] == 5  # two minutes + forming + overlap, not the backfill cap
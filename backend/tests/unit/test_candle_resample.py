@@ -0,0 +1,94 @@
+"""
+Unit Tests for the multi-timeframe resampler
+Vectorized and incremental M1 -> higher timeframe bars, session-aligned
+"""
+import numpy as np
+import pytest
+
+from app.market_data.resample import BarAggregator, CandleResampler, bucket_start, resample
+
+T0 = np.datetime64("2024-01-01T00:00", "ms")
+MIN = np.timedelta64(1, "m")
+
+
+def _m1(n: int, start: int = 0, skip=()):
+    idx = np.array([i for i in range(start, start + n) if i not in skip])
+    rng = np.random.default_rng(7)
+    close = 100 + np.cumsum(rng.normal(size=len(idx)))
+    return {
+        "time": T0 + MIN * idx,
+        "open": close - 0.1,
+        "high": close + rng.random(len(idx)),
+        "low": close - rng.random(len(idx)),
+        "close": close,
+        "volume": np.ones(len(idx)),
+    }
+
+
+@pytest.mark.unit
+class TestResample:
+
+    def test_vectorized_ohlcv_and_partial_bucket(self):
+        m1 = _m1(150)  # 2.5 hours
+        h1 = resample(m1, "H1")
+
+        assert h1["time"].tolist() == [T0.astype(object), (T0 + 60 * MIN).astype(object)]
+        assert h1["open"][1] == m1["open"][60] and h1["close"][1] == m1["close"][119]
+        assert h1["high"][0] == m1["high"][:60].max() and h1["low"][0] == m1["low"][:60].min()
+        assert h1["volume"].tolist() == [60.0, 60.0]
+
+        forming = resample(m1, "H1", partial=True)
+        assert len(forming["time"]) == 3 and forming["volume"][-1] == 30.0
+
+    def test_session_offset_and_gaps(self):
+        # a 22:00 UTC session day: the D1 bar holding 2024-01-01 00:00 opened at 22:00 the day before
+        start = bucket_start(np.int64(T0.astype(np.int64)), "D1", offset_min=-120)
+        assert np.datetime64(int(start), "ms") == np.datetime64("2023-12-31T22:00", "ms")
+
+        m1 = _m1(120, skip=range(10, 70))  # 00:10..01:09 missing
+        m15 = resample(m1, "M15", offset_min=-120)
+        assert (m15["time"] - T0).astype("timedelta64[m]").astype(int).tolist() == [0, 60, 75, 90, 105]
+        assert m15["volume"].tolist() == [10.0, 5.0, 15.0, 15.0, 15.0]
+
+    def test_incremental_matches_vectorized(self):
+        m1 = _m1(590, skip=(59, 200, 201))  # includes a missing final minute of an H1 bucket
+        res = CandleResampler(["M5", "H1", "H4"], offset_min=-240)  # 20:00 UTC sessions
+        closed = {"M5": [], "H1": [], "H4": []}
+        forming_h1 = []
+        for i, t in enumerate(m1["time"].astype(np.int64)):
+            out = res.update("XAUUSD", int(t), *(float(m1[k][i]) for k in ("open", "high", "low", "close", "volume")))
+            for tf, bars in out.items():
+                closed[tf].extend(bars)
+            forming_h1.append(res.forming("XAUUSD", "H1"))
+
+        for tf, bars in closed.items():
+            ref = resample(m1, tf, offset_min=-240)
+            got = np.array(bars)
+            assert len(got) == len(ref["time"]), tf
+            assert got[:, 0].tolist() == ref["time"].astype(np.int64).tolist()
+            for j, name in enumerate(("open", "high", "low", "close", "volume"), start=1):
+                assert np.allclose(got[:, j], ref[name]), (tf, name)
+
+        # the forming H1 bar follows every minute and is gone once its last minute closes
+        assert forming_h1[62][4] == m1["close"][62]
+        assert forming_h1[118] is None  # 01:59 closed the 01:00 bar
+        last = res.forming("XAUUSD", "H1")
+        assert last[0] == (T0 + 540 * MIN).astype(np.int64) and last[4] == m1["close"][-1]
+
+        agg = BarAggregator("M5")
+        assert agg.update(0, 1, 1, 1, 1) == [] and agg.update(0, 2, 2, 2, 2) == []  # repeated minute ignored
+        assert agg.forming == (0, 1, 1, 1, 1, 0.0)
+
+    def test_head_bucket_without_history_is_not_emitted(self):
+        m1 = _m1(90, start=30)  # 00:30 .. 01:59
+        res = CandleResampler(["H1"])
+        closed = [b for i, t in enumerate(m1["time"].astype(np.int64))
+                  for b in res.update("XAUUSD", int(t), 1, 2, 0, 1, 1)["H1"]]
+        assert [b[0] for b in closed] == [(T0 + 60 * MIN).astype(np.int64)]
+
+        # with the stored minutes of the forming bucket primed, it is emitted in full
+        primed = CandleResampler(["H1"])
+        primed.prime("XAUUSD", _m1(20, start=30))  # 00:30 .. 00:49
+        closed = [b for t in (T0 + MIN * np.arange(50, 60)).astype(np.int64)
+                  for b in primed.update("XAUUSD", int(t), 1, 2, 0, 1, 1)["H1"]]
+        assert len(closed) == 1 and closed[0][0] == T0.astype(np.int64) and closed[0][5] == 30.0
@@ -0,0 +1,151 @@
+"""
+Unit Tests for the in-memory candle store
+Fixed-capacity rings with O(1) appends and zero-copy trailing views
+"""
+import json
+
+import numpy as np
+import pytest
+
+from app.market_data.candle_store import CANDLE_DTYPE, CandleRing, CandleStore
+from app.scanner import opportunity_scanner as scanner_mod
+from app.scanner.opportunity_scanner import SmartOpportunityScanner
+
+T0 = np.datetime64("2024-01-01T00:00", "ms")
+STEP = np.timedelta64(5, "m")
+
+
+def _bars(start: int, n: int):
+    times = T0 + STEP * np.arange(start, start + n)
+    closes = np.arange(start, start + n, dtype=np.float64)
+    out = {"time": times, "volume": np.zeros(n)}
+    for name in ("open", "high", "low", "close"):
+        out[name] = closes
+    return out
+
+
+@pytest.mark.unit
+class TestCandleRing:
+
+    def test_append_wraps_and_keeps_order(self):
+        ring = CandleRing(4)
+        for i in range(6):
+            assert ring.append(T0 + STEP * i, i, i, i, i, 1.0)
+
+        assert len(ring) == 4
+        assert ring.last()["close"].tolist() == [2.0, 3.0, 4.0, 5.0]
+        assert ring.last(2)["close"].tolist() == [4.0, 5.0]
+        assert ring.last(10)["close"].tolist() == [2.0, 3.0, 4.0, 5.0]
+
+    def test_forming_bar_replaced_and_old_bars_ignored(self):
+        ring = CandleRing(3)
+        ring.append(T0, 1, 1, 1, 1)
+        ring.append(T0 + STEP, 2, 2, 2, 2)
+        assert ring.append(T0 + STEP, 2, 3, 2, 2.5)
+        assert not ring.append(T0, 9, 9, 9, 9)
+        assert ring.last()["close"].tolist() == [1.0, 2.5]
+
+    def test_views_are_zero_copy_and_read_only(self):
+        ring = CandleRing(8)
+        ring.extend(_bars(0, 6))
+        view = ring.last(5)
+
+        assert view.dtype == CANDLE_DTYPE
+        assert np.shares_memory(view, ring._buf)
+        assert not view.flags.writeable
+
+    def test_arrays_are_copies_that_outlive_writes(self):
+        ring = CandleRing(5)
+        ring.extend(_bars(0, 5))
+        arrays = ring.arrays()
+        assert not np.shares_memory(arrays["close"], ring._buf)
+
+        ring.append(T0 + STEP * 4, 9, 9, 9, 9)  # forming bar replaced in place
+        ring.append(T0 + STEP * 5, 7, 7, 7, 7)  # full ring: the oldest slot is reused
+        assert arrays["close"].tolist() == [0.0, 1.0, 2.0, 3.0, 4.0]
+        assert arrays["time"][-1] == T0 + STEP * 4
+
+    def test_extend_wraps_and_skips_known_bars(self):
+        ring = CandleRing(5)
+        ring.extend(_bars(0, 3))
+        assert ring.extend(_bars(1, 6)) == 4  # bars 0..2 already held
+        assert ring.last()["close"].tolist() == [2.0, 3.0, 4.0, 5.0, 6.0]
+        assert ring.extend(_bars(0, 12)) == 5  # only the newest capacity bars
+        assert ring.last()["close"].tolist() == [7.0, 8.0, 9.0, 10.0, 11.0]
+
+
+@pytest.mark.unit
+class TestCandleStore:
+
+    def test_memory_budget_evicts_least_recently_used(self):
+        per_ring = 2 * 100 * CANDLE_DTYPE.itemsize
+        store = CandleStore(capacity=100, max_mb=(2.5 * per_ring) / (1024 * 1024))
+        store.append("XAUUSD", "M5", T0, 1, 1, 1, 1)
+        store.append("EURUSD", "M5", T0, 1, 1, 1, 1)
+        store.last("XAUUSD", "M5")  # touch
+        store.append("GBPUSD", "M5", T0, 1, 1, 1, 1)
+
+        assert ("EURUSD", "M5") not in store and ("XAUUSD", "M5") in store
+        assert store.nbytes <= store.max_bytes and store.evictions == 1
+
+
+UNIVERSE = {"symbols": [{"symbol": "XAUUSD"}, {"symbol": "EURUSD"}], "timeframes": ["M5"], "min_candles": 50}
+
+
+class FakeSession:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, stmt, params=None):
+        pass
+
+    async def commit(self):
+        pass
+
+
+class RecordingEngine:
+    def __init__(self):
+        self.windows = []
+
+    async def analyze_market(self, data, symbol, timeframe, extra_context=None, db=None, offload=False):
+        self.windows.append((symbol, [c["close"] for c in data]))
+        return {"signal": {"action": "BUY", "confidence": 60, "score": 10}}
+
+
+@pytest.mark.unit
+class TestScannerWithStore:
+
+    async def test_warm_pairs_only_read_newest_bars(self, monkeypatch):
+        newest = {"n": 200}
+        loads = []
+
+        async def fake_get(self, key):
+            return json.dumps(UNIVERSE)
+
+        async def fake_candles(db, pairs, limit):
+            loads.append((sorted(pairs), limit))
+            return {pair: {k: v[-limit:] for k, v in _bars(0, newest["n"]).items()} for pair in pairs}
+
+        async def fake_latest(db, pairs):
+            return {pair: (T0 + STEP * (newest["n"] - 1)).astype(object) for pair in pairs}
+
+        monkeypatch.setattr(scanner_mod.SettingsService, "get", fake_get)
+        monkeypatch.setattr(scanner_mod, "load_universe_candles", fake_candles)
+        monkeypatch.setattr(scanner_mod, "latest_bar_times", fake_latest)
+
+        engine = RecordingEngine()
+        scanner = SmartOpportunityScanner(engine, session_factory=FakeSession, store=CandleStore(capacity=100))
+        await scanner.scan_once(FakeSession(), user_id="u1")
+        assert loads == [([("EURUSD", "M5"), ("XAUUSD", "M5")], 50)]
+
+        newest["n"] = 202  # two new bars
+        loads.clear()
+        engine.windows.clear()
+        await scanner.scan_once(FakeSession(), user_id="u1")
+
+        assert loads == [([("EURUSD", "M5"), ("XAUUSD", "M5")], 8)]  # top-up only
+        window = dict(engine.windows)["XAUUSD"]
+        assert window == [float(i) for i in range(152, 202)]
@@ -0,0 +1,151 @@
+"""
+Unit Tests for the chart candle feed behind /candles/mt5
+Delta fetches from the bridge, `since` windows and ETag revalidation
+"""
+import asyncio
+import json
+import types
+
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.v1 import candles as candles_api
+from app.auth.dependencies import require_trader
+from app.database.connection import get_db
+from app.market_data import chart_feed as feed_mod
+from app.market_data.candle_store import CandleStore
+from app.market_data.chart_feed import ChartFeed
+from tests.factories import FakeBridge
+
+T0 = 1_700_000_100  # epoch seconds, on a 5-minute boundary
+
+
+@pytest.mark.unit
+class TestChartFeed:
+
+    async def test_delta_fetch_and_refresh_window(self):
+        bridge = FakeBridge(now=T0 + 30)
+        feed = ChartFeed(connector=bridge, refresh_seconds=1.0)
+
+        await feed.refresh("XAUUSD", "M5", 300, now=T0 + 30)
+        await feed.refresh("XAUUSD", "M5", 300, now=T0 + 30.5)  # served from memory
+        assert bridge.counts == [300]
+
+        bridge.now, bridge.tick = T0 + 310, 1.7
+        await feed.refresh("XAUUSD", "M5", 300, now=T0 + 310)
+        assert bridge.counts == [300, 2]  # the old forming bar and the new one
+
+        bars, _ = feed.window("XAUUSD", "M5", 300, since=(T0 - T0 % 300) * 1000)
+        assert len(bars) == 2 and bars["close"].tolist() == [1.5, 1.7]  # old forming bar closed at 1.5
+        assert len(feed.window("XAUUSD", "M5", 300)[0]) == 300
+
+    async def test_gap_larger_than_window_reloads(self):
+        bridge = FakeBridge(now=T0 + 30)
+        feed = ChartFeed(connector=bridge, refresh_seconds=0)
+        await feed.refresh("XAUUSD", "M5", 50, now=T0 + 30)
+        _, etag = feed.window("XAUUSD", "M5", 50)
+
+        bridge.now = T0 + 300 * 100
+        await feed.refresh("XAUUSD", "M5", 50, now=bridge.now)
+        bars, etag2 = feed.window("XAUUSD", "M5", 50)
+        assert bridge.counts == [50, 50] and etag2 != etag
+        assert int(bars["time"][-1].astype("int64")) == (bridge.now - bridge.now % 300) * 1000
+
+    async def test_delta_fetch_with_a_broker_ahead_of_utc(self):
+        bridge = FakeBridge(now=T0 + 30, offset=3 * 3600)  # broker on UTC+3
+        feed = ChartFeed(connector=bridge, refresh_seconds=0)
+        await feed.refresh("XAUUSD", "M5", 300, now=T0 + 30)
+        for now in (T0 + 40, T0 + 50, T0 + 650):  # the last poll comes two bars later
+            bridge.now = now
+            await feed.refresh("XAUUSD", "M5", 300, now=now)
+        assert bridge.counts == [300, 2, 2, 3]
+
+        bars, _ = feed.window("XAUUSD", "M5", 300)
+        assert len(bars) == 300
+        assert (np.diff(bars["time"].astype("int64")) == 300_000).all()
+        assert int(bars["time"][-1].astype("int64")) == (T0 + 3 * 3600 + 600) * 1000
+
+    async def test_delta_that_misses_the_ring_reloads(self):
+        bridge = FakeBridge(now=T0 + 30)
+        feed = ChartFeed(connector=bridge, refresh_seconds=0)
+        await feed.refresh("XAUUSD", "M5", 300, now=T0 + 30)
+
+        bridge.now = T0 + 3000  # the bridge moved on by more than the wall clock says
+        await feed.refresh("XAUUSD", "M5", 300, now=T0 + 40)
+        bars, _ = feed.window("XAUUSD", "M5", 300)
+        assert bridge.counts == [300, 2, 300] and len(bars) == 300
+        assert (np.diff(bars["time"].astype("int64")) == 300_000).all()
+
+    async def test_concurrent_polls_share_one_bridge_call(self):
+        bridge = FakeBridge(now=T0 + 30)
+        feed = ChartFeed(connector=bridge, refresh_seconds=1.0)
+        await asyncio.gather(*(feed.refresh("XAUUSD", "M5", 300, now=T0 + 30) for _ in range(5)))
+        assert bridge.counts == [300]
+
+    async def test_etag_varies_with_the_query(self):
+        feed = ChartFeed(connector=FakeBridge(now=T0 + 30), refresh_seconds=1.0)
+        await feed.refresh("XAUUSD", "M5", 300, now=T0 + 30)
+        since = (T0 - T0 % 300) * 1000
+        tags = {feed.window("XAUUSD", "M5", count, since=s)[1] for count in (100, 300) for s in (None, since)}
+        assert len(tags) == 4
+
+    async def test_count_beyond_capacity_is_fetched_directly(self):
+        bridge = FakeBridge(now=T0 + 30)
+        feed = ChartFeed(connector=bridge, store=CandleStore(capacity=100), refresh_seconds=1.0)
+        bars, etag = await feed.query("XAUUSD", "M5", 250)
+        assert len(bars) == 250 and bridge.counts == [250]
+        assert feed.store.ring("XAUUSD", "M5", create=False) is None  # not cached
+
+        bars, etag2 = await feed.query("XAUUSD", "M5", 250, since=(T0 - T0 % 300) * 1000)
+        assert len(bars) == 1 and etag2 != etag
+
+
+@pytest.fixture
+def client(monkeypatch):
+    bridge = FakeBridge(now=T0 + 30)
+    feed = ChartFeed(connector=bridge, refresh_seconds=0)
+    monkeypatch.setattr(feed_mod, "_feed", feed)
+    monkeypatch.setattr(feed_mod, "time", types.SimpleNamespace(time=lambda: bridge.now))
+
+    async def no_override(self, key):
+        return None
+
+    monkeypatch.setattr(candles_api.SettingsService, "get", no_override)
+
+    app = FastAPI()
+    app.include_router(candles_api.router, prefix="/candles")
+    app.dependency_overrides[get_db] = lambda: None
+    app.dependency_overrides[require_trader] = lambda: None
+    return TestClient(app), bridge
+
+
+@pytest.mark.unit
+class TestCandlesEndpoint:
+
+    def test_since_delta_and_not_modified(self, client):
+        http, bridge = client
+        first = http.get("/candles/mt5", params={"symbol": "XAUUSD", "timeframe": "M5"})
+        assert first.status_code == 200 and first.json()["count"] == 300
+        full_size = len(first.content)
+        since = first.json()["last"]
+
+        bridge.now = T0 + 40
+        poll = http.get("/candles/mt5", params={"timeframe": "M5", "since": since})
+        assert poll.json()["count"] == 1 and poll.json()["candles"][0]["time"] == since // 1000
+        assert len(poll.content) * 50 < full_size
+
+        same = http.get(
+            "/candles/mt5", params={"timeframe": "M5", "since": since},
+            headers={"If-None-Match": poll.headers["etag"]},
+        )
+        assert same.status_code == 304 and same.content == b""
+
+        bridge.tick = 1.9  # forming bar moved
+        changed = http.get(
+            "/candles/mt5", params={"timeframe": "M5", "since": since},
+            headers={"If-None-Match": poll.headers["etag"]},
+        )
+        assert changed.status_code == 200 and json.loads(changed.content)["candles"][0]["close"] == 1.9
+        assert bridge.counts[1:] == [2, 2, 2]  # steady state: the forming bar and slack
@@ -0,0 +1,81 @@
+"""
+Unit Tests for vectorized ensemble fusion
+fuse_batch must reproduce the per-row weighted vote
+"""
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from app.ai.ensemble import EnsembleFusion, SignalStrength
+from app.ai.lstm_model import LSTMPrediction
+from app.ai.xgboost_model import XGBoostPrediction
+from app.ai.lightgbm_model import LightGBMPrediction
+
+
+def _reference_row(signals, scores, weights):
+    """Original scalar rules"""
+    vote = sum(s * w * c for s, w, c in zip(signals, weights, scores))
+    total = sum(c * w for w, c in zip(weights, scores))
+    if total > 0:
+        vote /= total
+    final = 1 if vote > 0.3 else (-1 if vote < -0.3 else 0)
+    consensus = 1.0 if len(set(signals)) == 1 else Counter(signals).most_common(1)[0][1] / len(signals)
+    a = abs(vote)
+    if a > 0.7 and consensus > 0.8:
+        strength = 2 if vote > 0 else -2
+    elif a > 0.5 and consensus > 0.6:
+        strength = 1 if vote > 0 else -1
+    else:
+        strength = 0
+    confidence = (a + consensus) / 2
+    risk = 2 if consensus < 0.6 else (1 if confidence < 0.6 else 0)
+    return final, strength, consensus, confidence, risk
+
+
+@pytest.mark.unit
+@pytest.mark.ai
+class TestEnsembleFusionBatch:
+
+    def test_batch_matches_row_by_row(self):
+        fusion = EnsembleFusion()
+        rng = np.random.default_rng(0)
+        signals = rng.integers(-1, 2, (500, 3))
+        scores = rng.uniform(0, 1, (500, 3))
+        batch = fusion.fuse_batch(signals, scores)
+
+        for i in range(len(signals)):
+            final, strength, consensus, confidence, risk = _reference_row(
+                signals[i].tolist(), scores[i].tolist(), fusion.weights.tolist())
+            assert batch.signal[i] == final
+            assert batch.strength[i] == strength
+            assert batch.risk[i] == risk
+            assert batch.consensus[i] == pytest.approx(consensus)
+            assert batch.confidence[i] == pytest.approx(confidence)
+
+    def test_proba_matrices(self):
+        fusion = EnsembleFusion()
+        buy = np.array([[0.05, 0.05, 0.9], [0.8, 0.1, 0.1]])
+        batch = fusion.fuse_proba_batch([buy, buy, buy])
+        assert batch.signal.tolist() == [1, -1]
+        assert batch.strength_enum(0) is SignalStrength.STRONG_BUY
+        assert batch.strength_enum(1) is SignalStrength.STRONG_SELL
+        assert batch.consensus.tolist() == [1.0, 1.0]
+
+    def test_shape_mismatch_raises(self):
+        with pytest.raises(ValueError):
+            EnsembleFusion().fuse_batch(np.zeros((2, 3)), np.zeros((2, 2)))
+
+    def test_scalar_wrapper(self):
+        fusion = EnsembleFusion()
+        result = fusion.fuse_predictions(
+            LSTMPrediction(direction="up", confidence=0.9, predicted_price=2010.0,
+                           sequence_probabilities=[0.9, 0.05, 0.05]),
+            XGBoostPrediction(signal="buy", probability=0.8, feature_importance={"rsi": 0.3}, confidence_score=0.8),
+            LightGBMPrediction(signal="buy", probability=0.85, prediction_speed_ms=1.0, agreement_with_xgboost=True),
+        )
+        assert result.final_signal == "buy"
+        assert result.signal_strength is SignalStrength.STRONG_BUY
+        assert result.consensus_score == 1.0
+        assert result.risk_level == "low"
+        assert result.recommended_action == "Enter Long Position Immediately"
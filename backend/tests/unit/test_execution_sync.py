@@ -0,0 +1,69 @@
+"""
+Unit Tests for /execution/sync position upserts
+A sync is a fixed number of statements, not one round trip per position
+"""
+import uuid
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.api.v1.execution import _position_values, _upsert_positions
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def all(self):
+        return self._rows
+
+
+class FakeSession:
+    def __init__(self, existing):
+        self.existing = existing
+        self.calls = []
+
+    async def execute(self, stmt, params=None):
+        self.calls.append((stmt, params))
+        return FakeResult(list(self.existing.items()) if len(self.calls) == 1 else [])
+
+
+def _positions(n):
+    return [{"ticket": 1000 + i, "symbol": "XAUUSD", "type": i % 2, "volume": 0.1, "sl": 1.0} for i in range(n)]
+
+
+@pytest.mark.unit
+class TestPositionSync:
+
+    def test_position_values_normalizes(self):
+        v = _position_values({"position": 7, "side": "short", "lots": "0.5", "time": 0, "magic": 42})
+        assert v["ticket"] == "7" and v["side"] == "SELL" and v["volume"] == 0.5
+        assert v["magic"] == "42" and v["open_time"] is None
+        assert _position_values({"symbol": "XAUUSD"}) is None
+        assert _position_values("bad") is None
+
+    async def test_three_statements_for_any_batch(self):
+        rows = [_position_values(p) for p in _positions(50)]
+        existing = {"1000": uuid.uuid4(), "1001": uuid.uuid4()}
+        db = FakeSession(existing)
+
+        assert await _upsert_positions(db, "123", rows) == 50
+        assert len(db.calls) == 3
+
+        _, (insert_stmt, _), (update_stmt, update_params) = db.calls
+        assert insert_stmt.compile(dialect=postgresql.dialect()).string.count("VALUES") == 1
+        assert len(update_params) == 2
+        assert {p["b_id"] for p in update_params} == set(existing.values())
+        assert "coalesce(nullif" in str(update_stmt.compile(dialect=postgresql.dialect()))
+
+    async def test_null_account_matches_is_null(self):
+        db = FakeSession({})
+        await _upsert_positions(db, None, [_position_values(p) for p in _positions(1)])
+        lookup = str(db.calls[0][0].compile(dialect=postgresql.dialect()))
+        assert "account_id IS NULL" in lookup
+        assert len(db.calls) == 2  # no UPDATE when nothing exists
+
+    async def test_empty_sync_is_free(self):
+        db = FakeSession({})
+        assert await _upsert_positions(db, "1", []) == 0
+        assert db.calls == []
@@ -0,0 +1,137 @@
+"""
+Unit Tests for the multiplexed MT5 connector
+DEALER transport against local REP / ROUTER bridges: concurrency, ids, timeouts
+"""
+import asyncio
+import json
+
+import pytest
+import zmq
+import zmq.asyncio
+
+from app.mt5.connector import MT5Connector
+
+
+@pytest.fixture
+def zctx():
+    ctx = zmq.asyncio.Context()
+    yield ctx
+    ctx.destroy(linger=0)
+
+
+def _connector(port: int, bulk_max_in_flight: int = 0) -> MT5Connector:
+    conn = MT5Connector()
+    conn.host, conn.port, conn.order_port = "127.0.0.1", port, 0
+    for lane in conn.lanes.values():
+        lane.transport = "dealer"
+    conn.lanes["bulk"].max_in_flight = bulk_max_in_flight
+    return conn
+
+
+async def _router_bridge(sock, batch: int, delays=None):
+    """Collects `batch` requests, then answers them newest first (optionally after a delay)."""
+    while True:
+        got = [await sock.recv_multipart() for _ in range(batch)]
+        for frames in reversed(got):
+            req = json.loads(frames[-1])
+            await asyncio.sleep((delays or {}).get(req.get("symbol"), 0))
+            await sock.send_multipart(frames[:-1] + [json.dumps({"echo": req}).encode()])
+
+
+@pytest.mark.unit
+class TestMT5Connector:
+
+    async def test_concurrent_requests_matched_by_id(self, zctx):
+        router = zctx.socket(zmq.ROUTER)
+        port = router.bind_to_random_port("tcp://127.0.0.1")
+        server = asyncio.ensure_future(_router_bridge(router, batch=10))
+        conn = _connector(port)
+        try:
+            calls = [conn.get_rates(f"SYM{i}", "M5", count=i + 1) for i in range(9)]
+            calls.append(conn.send_order("XAUUSD", "BUY", 0.1, None, None))
+            results = await asyncio.wait_for(asyncio.gather(*calls), 5)
+
+            assert [r["echo"]["symbol"] for r in results[:9]] == [f"SYM{i}" for i in range(9)]
+            assert results[9]["echo"]["action"] == "SEND_ORDER"
+            # all ten were out before any reply: nine reads on the bulk lane, the order on its own
+            assert conn.lanes["bulk"].counters["in_flight_max"] == 9
+            assert conn.lanes["order"].counters["sent"] == 1
+        finally:
+            server.cancel()
+            conn._reset("test done")
+            router.close(linger=0)
+
+    async def test_timeout_leaves_socket_usable(self, zctx):
+        router = zctx.socket(zmq.ROUTER)
+        port = router.bind_to_random_port("tcp://127.0.0.1")
+        server = asyncio.ensure_future(_router_bridge(router, batch=1, delays={"SLOW": 0.3}))
+        conn = _connector(port)
+        try:
+            slow = await conn.get_rates("SLOW", "M5", timeout_ms=50)
+            assert "timeout" in slow["error"] and conn.lanes["bulk"].counters["timeouts"] == 1
+            assert conn.connected is False
+
+            # the late SLOW reply arrives first and is dropped; the socket keeps working
+            fast = await asyncio.wait_for(conn.get_rates("FAST", "M5", timeout_ms=2000), 5)
+            assert fast["echo"]["symbol"] == "FAST" and conn.lanes["bulk"].counters["late"] == 1
+            assert conn.connected is True
+        finally:
+            server.cancel()
+            conn._reset("test done")
+            router.close(linger=0)
+
+    async def test_plain_rep_bridge_echoes_the_id_envelope(self, zctx):
+        rep = zctx.socket(zmq.REP)
+        port = rep.bind_to_random_port("tcp://127.0.0.1")
+
+        async def serve():
+            while True:
+                req = await rep.recv_json()
+                await rep.send_json({"ok": True, "action": req["action"]})
+
+        server = asyncio.ensure_future(serve())
+        conn = _connector(port)
+        try:
+            results = await asyncio.wait_for(
+                asyncio.gather(conn.get_positions(), conn.get_rates("XAUUSD", "H1"), conn.ping()), 5
+            )
+            assert [results[0]["action"], results[1]["action"]] == ["GET_POSITIONS", "RATES"]
+            assert results[2]["ok"] is True
+        finally:
+            server.cancel()
+            conn._reset("test done")
+            rep.close(linger=0)
+
+    async def test_order_does_not_queue_behind_backfill(self, zctx):
+        # a single-threaded bridge: one request at a time, fair-queued between connections
+        router = zctx.socket(zmq.ROUTER)
+        port = router.bind_to_random_port("tcp://127.0.0.1")
+
+        async def serve():
+            while True:
+                frames = await router.recv_multipart()
+                req = json.loads(frames[-1])
+                await asyncio.sleep(0.05 if req["action"] == "RATES" else 0.001)
+                await router.send_multipart(frames[:-1] + [json.dumps({"ok": True}).encode()])
+
+        server = asyncio.ensure_future(serve())
+        conn = _connector(port, bulk_max_in_flight=2)
+        try:
+            backfill = [asyncio.ensure_future(conn.get_rates(f"SYM{i}", "M1", count=5000)) for i in range(10)]
+            await asyncio.sleep(0.02)
+            bulk = conn.lane_stats()["bulk"]
+            assert bulk["in_flight"] == 2 and bulk["waiting"] == 8
+
+            t0 = asyncio.get_running_loop().time()
+            assert (await conn.send_order("XAUUSD", "BUY", 0.1, None, None))["ok"] is True
+            order_s = asyncio.get_running_loop().time() - t0
+            await asyncio.wait_for(asyncio.gather(*backfill), 5)
+
+            # at most the read being processed, not the ~0.5 s backfill queue
+            assert order_s < 0.15
+            stats = conn.lane_stats()
+            assert stats["order"]["latency_ms"]["max"] < 150 and stats["bulk"]["latency_ms"]["max"] > 300
+        finally:
+            server.cancel()
+            conn._reset("test done")
+            router.close(linger=0)
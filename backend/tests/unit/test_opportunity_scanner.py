@@ -0,0 +1,380 @@
+"""
+Unit Tests for the opportunity scanner fan-out
+Pairs are analyzed concurrently (bounded) with a session per worker
+"""
+import asyncio
+import json
+import time
+
+import numpy as np
+import pytest
+
+from app.scanner import opportunity_scanner as scanner_mod
+from app.scanner.opportunity_scanner import SmartOpportunityScanner
+
+UNIVERSE = {
+    "symbols": [{"symbol": "XAUUSD", "weight": 1.0}, {"symbol": "XAGUSD", "weight": 0.5}, {"symbol": "EURUSD"}],
+    "timeframes": ["M5", "M15", "H1"],
+    "min_candles": 3,
+    "top_k": 4,
+}
+
+
+class FakeSession:
+    opened = 0
+
+    def __init__(self):
+        self.statements = []
+        self.commits = 0
+
+    async def __aenter__(self):
+        FakeSession.opened += 1
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, stmt, params=None):
+        self.statements.append((stmt, params))
+
+    async def commit(self):
+        self.commits += 1
+
+    async def rollback(self):
+        self.rollbacks = getattr(self, "rollbacks", 0) + 1
+
+    def writes(self, table):
+        return [stmt for stmt, _ in self.statements if stmt.table.name == table]
+
+
+class SlowEngine:
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.sessions = set()
+
+    async def analyze_market(self, data, symbol, timeframe, extra_context=None, db=None, offload=False):
+        self.sessions.add(id(db))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.delay)
+        self.in_flight -= 1
+        score = 50.0 if symbol == "XAUUSD" else 10.0
+        return {"signal": {"action": "BUY", "confidence": 60, "score": score}}
+
+
+@pytest.fixture
+def patched(monkeypatch):
+    async def fake_get(self, key):
+        return json.dumps(UNIVERSE)
+
+    async def fake_candles(db, pairs, limit):
+        arrays = {k: np.ones(limit) for k in ("open", "high", "low", "close", "volume")}
+        arrays["time"] = np.arange(limit).astype("datetime64[m]").astype("datetime64[ms]")
+        return {pair: arrays for pair in pairs}
+
+    bars = {}
+
+    async def fake_latest(db, pairs):
+        return {pair: bars.get(pair, 0) for pair in pairs}
+
+    monkeypatch.setattr(scanner_mod.SettingsService, "get", fake_get)
+    monkeypatch.setattr(scanner_mod, "load_universe_candles", fake_candles)
+    monkeypatch.setattr(scanner_mod, "latest_bar_times", fake_latest)
+    return bars
+
+
+@pytest.mark.unit
+class TestScanOnceFanOut:
+
+    async def test_wall_time_close_to_slowest_pair(self, patched):
+        engine = SlowEngine(delay=0.2)
+        scanner = SmartOpportunityScanner(engine, concurrency=9, session_factory=FakeSession)
+        db = FakeSession()
+
+        t0 = time.perf_counter()
+        out = await scanner.scan_once(db, user_id="u1")
+        elapsed = time.perf_counter() - t0
+
+        assert out["count"] == 9
+        assert elapsed < 0.2 * 3  # serial would be ~1.8s
+        assert len(engine.sessions) == 9  # a session per worker, never the caller's
+        assert id(db) not in engine.sessions
+
+    async def test_concurrency_is_bounded(self, patched):
+        engine = SlowEngine(delay=0.02)
+        scanner = SmartOpportunityScanner(engine, concurrency=2, session_factory=FakeSession)
+        await scanner.scan_once(FakeSession(), user_id="u1")
+        assert engine.max_in_flight == 2
+
+    async def test_rows_written_once_and_ranked(self, patched):
+        scanner = SmartOpportunityScanner(SlowEngine(delay=0), concurrency=4, session_factory=FakeSession)
+        db = FakeSession()
+        out = await scanner.scan_once(db, user_id="u1")
+
+        # every signal in a single multi-row INSERT, ids assigned client-side
+        assert len(db.writes("trading_signals")) == 1 and db.commits == 1
+        stmt = db.writes("trading_signals")[0]
+        inserted = stmt.compile().params
+        assert sum(1 for k in inserted if k.startswith("id_m")) == 9
+        assert [t["symbol"] for t in out["top"][:3]] == ["XAUUSD"] * 3
+        assert len(out["top"]) == 4
+        assert {t["signal_id"] for t in out["top"]} <= {str(v) for k, v in inserted.items() if k.startswith("id_m")}
+
+
+@pytest.mark.unit
+class TestIncrementalScan:
+
+    async def test_unchanged_pairs_are_carried_forward(self, patched):
+        engine = SlowEngine(delay=0)
+        scanner = SmartOpportunityScanner(engine, concurrency=4, session_factory=FakeSession)
+
+        first = await scanner.scan_once(FakeSession(), user_id="u1")
+        assert first["analyzed"] == 9 and first["skipped"] == 0
+
+        patched[("XAUUSD", "M5")] = 1  # one new bar
+        db = FakeSession()
+        second = await scanner.scan_once(db, user_id="u1")
+
+        assert second["analyzed"] == 1 and second["skipped"] == 8
+        assert second["count"] == 9
+        # only the re-analyzed pair is written; every pair's latest-signal row is refreshed
+        assert len(db.writes("trading_signals")) == 1
+        assert len(db.writes("scanner_latest_signals")) == 1
+        assert scanner.stats() == {"scans": 2, "analyzed": 10, "skipped": 8}
+
+        carried = {(t["symbol"], t["timeframe"]): t for t in second["top"] if t.get("carried")}
+        fresh = {(t["symbol"], t["timeframe"]): t for t in first["top"]}
+        for key, item in carried.items():
+            assert item["signal_id"] == fresh[key]["signal_id"]
+
+    async def test_force_reanalyzes(self, patched):
+        scanner = SmartOpportunityScanner(SlowEngine(delay=0), concurrency=4, session_factory=FakeSession)
+        await scanner.scan_once(FakeSession(), user_id="u1")
+
+        forced = await scanner.scan_once(FakeSession(), user_id="u1", force=True)
+        assert forced["analyzed"] == 9 and forced["written"] == 9
+
+        db = FakeSession()
+        out = await scanner.scan_once(db, user_id="u1")
+        assert out["analyzed"] == 0 and out["skipped"] == 9 and out["written"] == 0
+        assert db.writes("trading_signals") == []
+
+
+class FailingSession(FakeSession):
+    async def commit(self):
+        raise RuntimeError("connection lost")
+
+
+@pytest.mark.unit
+class TestCarryForwardOnlyCommittedIds:
+
+    async def test_stream_closed_before_write_carries_nothing(self, patched):
+        scanner = SmartOpportunityScanner(SlowEngine(delay=0), concurrency=4, session_factory=FakeSession)
+        db = FakeSession()
+        stream = scanner.scan_stream(db, user_id="u1")
+        first = await stream.__anext__()
+        assert first["type"] == "result"
+        await stream.aclose()  # client went away mid-scan
+        assert db.statements == [] and scanner._last == {}
+
+        db = FakeSession()
+        out = await scanner.scan_once(db, user_id="u1")
+        assert out["written"] == 9 and not any(t.get("carried") for t in out["top"])
+        written = {str(v) for k, v in db.writes("trading_signals")[0].compile().params.items() if k.startswith("id_m")}
+        assert first["item"]["signal_id"] not in written  # a fresh row, not the lost id
+
+    async def test_failed_write_is_not_reused_by_the_next_scan(self, patched):
+        scanner = SmartOpportunityScanner(SlowEngine(delay=0), concurrency=4, session_factory=FakeSession)
+        db = FailingSession()
+        with pytest.raises(RuntimeError):
+            await scanner.scan_once(db, user_id="u1")
+        assert db.rollbacks == 1 and scanner._last == {}
+
+        out = await scanner.scan_once(FakeSession(), user_id="u1")
+        assert out["written"] == 9 and not any(t.get("carried") for t in out["top"])
+
+        again = await scanner.scan_once(FakeSession(), user_id="u1")
+        assert again["written"] == 0 and all(t.get("carried") for t in again["top"])
+
+
+class CountingEngine(SlowEngine):
+    def __init__(self):
+        super().__init__(delay=0)
+        self.calls = 0
+
+    async def analyze_market(self, *args, **kwargs):
+        self.calls += 1
+        return await super().analyze_market(*args, **kwargs)
+
+
+@pytest.mark.unit
+class TestSharedAnalysis:
+
+    async def test_analysis_is_shared_across_users(self, patched):
+        engine = CountingEngine()
+        scanner = SmartOpportunityScanner(engine, concurrency=4, session_factory=FakeSession)
+
+        outs = await asyncio.gather(*(scanner.scan_once(FakeSession(), user_id=f"u{i}") for i in range(5)))
+
+        assert engine.calls == 9  # symbols x timeframes, not x users
+        assert sum(o["analyzed"] for o in outs) == 9
+        # every user still owns a signal row per pair
+        assert all(o["written"] == 9 for o in outs)
+        ids = {t["signal_id"] for o in outs for t in o["top"]}
+        assert len(ids) == sum(len(o["top"]) for o in outs)
+
+    async def test_per_user_weights_and_thresholds(self, patched):
+        scanner = SmartOpportunityScanner(CountingEngine(), concurrency=4, session_factory=FakeSession)
+        await scanner.scan_once(FakeSession(), user_id="u1")
+
+        # EURUSD base score 10 -> 100 with weight 10, ahead of XAUUSD (50)
+        out = await scanner.scan_once(FakeSession(), user_id="u2", weights={"EURUSD": 10.0})
+        assert out["top"][0]["symbol"] == "EURUSD" and out["top"][0]["score"] == 100.0
+
+        out = await scanner.scan_once(FakeSession(), user_id="u3", min_score=40)
+        assert out["count"] == 3 and {t["symbol"] for t in out["top"]} == {"XAUUSD"}
+        assert out["written"] == 3
+
+
+class StaggeredEngine(SlowEngine):
+    """H1 pairs finish last, so results arrive out of universe order."""
+
+    def __init__(self):
+        super().__init__(delay=0)
+
+    async def analyze_market(self, data, symbol, timeframe, extra_context=None, db=None, offload=False):
+        await asyncio.sleep({"M5": 0.0, "M15": 0.02, "H1": 0.05}[timeframe])
+        return await super().analyze_market(data, symbol, timeframe, extra_context, db, offload)
+
+
+@pytest.mark.unit
+class TestStreaming:
+
+    def test_topk_reports_changes_only(self):
+        from app.scanner.streaming import TopK
+
+        top = TopK(2)
+        assert top.push({"score": 10}) and top.push({"score": 30})
+        assert not top.push({"score": 5})
+        assert top.push({"score": 20})
+        assert [i["score"] for i in top.items()] == [30, 20] and len(top) == 2
+
+    async def test_hub_drops_oldest_for_slow_subscribers(self):
+        from app.scanner.streaming import ScanHub, sse_event
+
+        hub = ScanHub(max_queue=2)
+        async with hub.subscribe() as q:
+            for i in range(3):
+                hub.publish({"type": "topk", "n": i})
+            assert hub.subscribers == 1
+            assert [q.get_nowait()["n"] for _ in range(2)] == [1, 2]
+        assert hub.subscribers == 0
+        assert sse_event({"type": "done", "count": 1}) == 'event: done\ndata: {"type": "done", "count": 1}\n\n'
+
+    async def test_results_stream_before_scan_finishes(self, patched):
+        scanner = SmartOpportunityScanner(StaggeredEngine(), concurrency=9, session_factory=FakeSession)
+        db = FakeSession()
+
+        events = [ev async for ev in scanner.scan_stream(db, user_id="u1")]
+        kinds = [ev["type"] for ev in events]
+
+        assert kinds.count("result") == 9 and kinds[-1] == "done"
+        assert [ev["item"]["timeframe"] for ev in events if ev["type"] == "result"][:3] == ["M5"] * 3
+        assert "topk" in kinds
+        done = events[-1]
+        assert done["count"] == 9 and done["written"] == 9 and len(done["top"]) == 4
+        assert [ev for ev in events if ev["type"] == "topk"][-1]["top"] == done["top"]
+        assert len(db.writes("trading_signals")) == 1 and db.commits == 1  # still one INSERT
+
+    async def test_cached_pairs_stream_first_and_hub_sees_events(self, patched):
+        scanner = SmartOpportunityScanner(StaggeredEngine(), concurrency=9, session_factory=FakeSession)
+        await scanner.scan_once(FakeSession(), user_id="u1")
+        patched[("XAUUSD", "M5")] = 1
+
+        async with scanner.hub.subscribe() as q:
+            events = [ev async for ev in scanner.scan_stream(FakeSession(), user_id="u1")]
+            published = [q.get_nowait()["type"] for _ in range(q.qsize())]
+
+        results = [ev["item"] for ev in events if ev["type"] == "result"]
+        assert (results[-1]["symbol"], results[-1]["timeframe"]) == ("XAUUSD", "M5")
+        assert events[-1]["analyzed"] == 1 and events[-1]["skipped"] == 8
+        assert published[-1] == "done" and "topk" in published and "result" not in published
+
+
+@pytest.mark.unit
+class TestLatestSignalIndex:
+
+    async def test_scan_upserts_one_row_per_pair(self, patched):
+        from sqlalchemy.dialects import postgresql
+
+        scanner = SmartOpportunityScanner(SlowEngine(delay=0), concurrency=4, session_factory=FakeSession)
+        first = await scanner.scan_once(FakeSession(), user_id="u1")
+
+        patched[("XAUUSD", "M5")] = 1
+        db = FakeSession()
+        await scanner.scan_once(db, user_id="u1")
+
+        (stmt,) = db.writes("scanner_latest_signals")
+        sql = str(stmt.compile(dialect=postgresql.dialect()))
+        assert "ON CONFLICT (user_id, symbol, timeframe) DO UPDATE" in sql
+        params = stmt.compile(dialect=postgresql.dialect()).params
+        assert sum(1 for k in params if k.startswith("signal_id_m")) == 9
+        # carried-forward pairs keep pointing at their original row
+        first_ids = {(t["symbol"], t["timeframe"]): t["signal_id"] for t in first["top"]}
+        key = next(k for k in first_ids if k != ("XAUUSD", "M5"))
+        n = next(i for i in range(9) if (params[f"symbol_m{i}"], params[f"timeframe_m{i}"]) == key)
+        assert params[f"signal_id_m{n}"] == first_ids[key]
+
+    def test_best_signal_reads_latest_rows_only(self):
+        import datetime
+        from sqlalchemy.dialects import postgresql
+        from app.scanner.execution_service import ScannerExecutionService
+
+        q = ScannerExecutionService.best_signal_query(
+            "u1", "XAUUSD", None, 65, 70, datetime.datetime(2024, 1, 1),
+        )
+        sql = str(q.compile(dialect=postgresql.dialect()))
+        assert "JOIN scanner_latest_signals ON scanner_latest_signals.signal_id = trading_signals.id" in sql
+        assert "scanner_latest_signals.updated_at >=" in sql
+        assert "ORDER BY scanner_latest_signals.score DESC" in sql
+        assert "trading_signals.score" not in sql.split("FROM", 1)[1]
+
+
+@pytest.mark.unit
+class TestUniverseCandles:
+
+    def test_queries_probe_each_pair_with_a_limit(self):
+        from sqlalchemy.dialects import postgresql
+        from app.scanner.candles import last_candles_query, latest_bars_query
+
+        pairs = [("XAUUSD", "M5"), ("XAGUSD", "H1")]
+        for query, limit in ((last_candles_query(pairs, 200), 200), (latest_bars_query(pairs), 1)):
+            compiled = query.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+            sql = " ".join(str(compiled).split())
+            assert sql.count("FROM candles") == 1 and "JOIN LATERAL" in sql
+            assert "(VALUES ('XAUUSD', 'M5'), ('XAGUSD', 'H1'))" in sql
+            assert f"ORDER BY candles.time DESC LIMIT {limit}" in sql
+            assert "row_number" not in sql and "GROUP BY" not in sql
+
+    def test_decode_rows_groups_by_pair(self):
+        import datetime
+        from app.scanner.candles import decode_rows, to_candle_dicts
+
+        t0 = datetime.datetime(2024, 1, 1)
+        rows = [
+            ("XAGUSD", "H1", t0, 1.0, 2.0, 0.5, 1.5, 10.0),
+            ("XAUUSD", "M5", t0, 3.0, 4.0, 2.5, 3.5, 0.0),
+            ("XAUUSD", "M5", t0 + datetime.timedelta(minutes=5), 3.5, 4.5, 3.0, 4.0, 7.0),
+        ]
+        out = decode_rows(rows)
+
+        assert set(out) == {("XAGUSD", "H1"), ("XAUUSD", "M5")}
+        gold = out[("XAUUSD", "M5")]
+        assert gold["close"].tolist() == [3.5, 4.0]
+        assert gold["close"].dtype == np.float64
+        assert to_candle_dicts(gold)[1] == {
+            "timestamp": "2024-01-01T00:05:00", "open": 3.5, "high": 4.5, "low": 3.0, "close": 4.0, "volume": 7.0,
+        }
+        assert decode_rows([]) == {}
@@ -0,0 +1,71 @@
+"""
+Unit Tests for the sharded scanner
+"""
+import datetime
+
+import pytest
+
+from app.scanner.candles import universe_pairs
+from app.scanner.sharding import plan_shards, shard_of, shard_queue
+from app.scanner.universe import DEFAULT_UNIVERSE
+
+PAIRS = universe_pairs(DEFAULT_UNIVERSE)
+
+
+@pytest.mark.unit
+class TestPlanShards:
+
+    def test_every_pair_lands_in_exactly_one_shard(self):
+        for affinity in (True, False):
+            shards = plan_shards(PAIRS, 4, affinity=affinity)
+            flat = [p for s in shards for p in s]
+            assert sorted(flat) == sorted(PAIRS)
+
+    def test_affinity_keeps_symbol_together_and_stable(self):
+        shards = plan_shards(PAIRS, 3, affinity=True)
+        for idx, shard in enumerate(shards):
+            for symbol, _ in shard:
+                assert shard_of(symbol, 3) == idx
+        # input order doesn't move symbols between shards
+        reordered = plan_shards(list(reversed(PAIRS)), 3, affinity=True)
+        assert [sorted(s) for s in reordered] == [sorted(s) for s in shards]
+
+    def test_round_robin_is_even(self):
+        sizes = [len(s) for s in plan_shards(PAIRS, 4, affinity=False)]
+        assert max(sizes) - min(sizes) <= 1
+
+    def test_shard_queue(self):
+        assert shard_queue(2, True, "scanner.shard.") == "scanner.shard.2"
+        assert shard_queue(2, False, "scanner.shard.") is None
+
+
+@pytest.mark.unit
+class TestShardedScan:
+
+    def test_chord_routes_shards_to_affinity_queues(self):
+        from app.scanner.scanner_tasks import build_sharded_scan
+
+        sig = build_sharded_scan(DEFAULT_UNIVERSE, "u1", n_shards=3, affinity=True)
+        header = list(sig.tasks)
+        queues = {t.options.get("queue") for t in header}
+        assert queues <= {"scanner.shard.0", "scanner.shard.1", "scanner.shard.2"}
+        assert sum(len(t.args[0]) for t in header) == len(PAIRS)
+        assert sig.body.kwargs == {"user_id": "u1", "force": False}
+
+    def test_export_ingest_roundtrip(self):
+        from app.scanner.opportunity_scanner import SmartOpportunityScanner
+
+        bar = datetime.datetime(2024, 1, 1, 12, 15)
+        worker = SmartOpportunityScanner(engine=None, concurrency=1, session_factory=object)
+        worker._analysis[("XAUUSD", "M15")] = {"bar": bar, "signal": {"score": 50, "action": "BUY", "at": bar}}
+
+        items = worker.export_analysis([("XAUUSD", "M15"), ("XAGUSD", "H1")])
+        assert len(items) == 1 and items[0]["bar"] == "2024-01-01T12:15:00"
+
+        merger = SmartOpportunityScanner(engine=None, concurrency=1, session_factory=object)
+        assert merger.ingest_analysis(items) == [("XAUUSD", "M15")]
+        cached = merger._analysis[("XAUUSD", "M15")]
+        assert cached["bar"] == bar and cached["signal"]["score"] == 50
+
+        rows, results = merger.project("u1", [("XAUUSD", "M15")], {"XAUUSD": 0.5})
+        assert len(rows) == 1 and results[0]["score"] == 25.0
@@ -0,0 +1,42 @@
+"""
+Unit Tests for the scanner's Celery entry points
+The system user that scanner rows are written under
+"""
+import uuid
+
+import pytest
+
+from app.scanner import scanner_tasks as tasks
+
+
+@pytest.fixture
+def system_user(monkeypatch):
+    value = {"AUTO_SELECT_SYSTEM_USER_ID": None}
+
+    async def fake_db():
+        yield object()
+
+    async def get(self, key):
+        return value.get(key)
+
+    def no_scanner():
+        raise AssertionError("the scan must not run")
+
+    monkeypatch.setattr(tasks, "get_db", fake_db)
+    monkeypatch.setattr(tasks.SettingsService, "get", get)
+    monkeypatch.setattr(tasks, "_get_scanner", no_scanner)
+    return value
+
+
+@pytest.mark.unit
+class TestSystemUser:
+
+    @pytest.mark.parametrize("configured", [None, "", "system"])
+    async def test_scan_is_skipped_without_a_user_id(self, system_user, configured):
+        system_user["AUTO_SELECT_SYSTEM_USER_ID"] = configured
+        assert await tasks._run_scan_once() == {"ok": False, "error": "system_user_not_configured"}
+
+    async def test_user_id_is_normalized(self, system_user):
+        user_id = uuid.uuid4()
+        system_user["AUTO_SELECT_SYSTEM_USER_ID"] = str(user_id).upper()
+        assert await tasks._system_user_id(tasks.SettingsService(None)) == str(user_id)
@@ -0,0 +1,120 @@
+"""
+Unit Tests for the shared-memory candle store
+One writer, lock-free readers in other processes (seqlock)
+"""
+import multiprocessing as mp
+import uuid
+
+import numpy as np
+import pytest
+
+from app.market_data.shared_candles import SharedCandleStore
+
+T0 = np.datetime64("2024-01-01T00:00", "ms")
+STEP = np.timedelta64(1, "m")
+
+
+@pytest.fixture
+def prefix():
+    return f"rxtest_{uuid.uuid4().hex[:8]}_"
+
+
+@pytest.fixture
+def writer(prefix):
+    w = SharedCandleStore(writer=True, capacity=16, prefix=prefix)
+    yield w
+    w.unlink_all()
+
+
+def _fill(store, n, symbol="XAUUSD", tf="M1"):
+    for i in range(n):
+        store.append(symbol, tf, T0 + STEP * i, i, i, i, float(i), 1.0)
+
+
+def _read_in_child(prefix, n, out):
+    store = SharedCandleStore(writer=False, prefix=prefix)
+    snap = store.ring("XAUUSD", "M1").snapshot(n)
+    out.put(snap["close"].tolist())
+    store.close()
+
+
+@pytest.mark.unit
+class TestSharedCandleStore:
+
+    def test_reader_sees_writer_bars_in_place(self, writer, prefix):
+        _fill(writer, 20)
+        reader = SharedCandleStore(writer=False, prefix=prefix)
+
+        assert ("XAUUSD", "M1") in reader and ("EURUSD", "M1") not in reader
+        view = reader.last("XAUUSD", "M1", 3)
+        assert view["close"].tolist() == [17.0, 18.0, 19.0]
+        assert reader.ring("XAUUSD", "M1").capacity == 16  # adopted from the segment
+
+        # forming bar updated by the writer shows through the reader's view, no re-read
+        writer.append("XAUUSD", "M1", T0 + STEP * 19, 0, 0, 0, 42.0)
+        assert view["close"][-1] == 42.0
+        assert reader.covers(("XAUUSD", "M1"), (T0 + STEP * 19).astype(object), 10)
+
+        with pytest.raises(PermissionError):
+            reader.append("XAUUSD", "M1", T0, 1, 1, 1, 1)
+        reader.close()
+
+    def test_reader_in_another_process(self, writer, prefix):
+        _fill(writer, 40)
+        ctx = mp.get_context("spawn")
+        out = ctx.Queue()
+        proc = ctx.Process(target=_read_in_child, args=(prefix, 4, out))
+        proc.start()
+        closes = out.get(timeout=60)
+        proc.join(timeout=60)
+        assert closes == [36.0, 37.0, 38.0, 39.0]
+
+    def test_reader_retries_while_write_in_progress(self, writer, prefix):
+        _fill(writer, 5)
+        reader = SharedCandleStore(writer=False, prefix=prefix)
+        ring = writer.ring("XAUUSD", "M1")
+
+        ring._begin()  # writer stalled mid-write: sequence is odd
+        with pytest.raises(RuntimeError):
+            reader.ring("XAUUSD", "M1").snapshot(3, retries=5)
+        ring._commit(ring._w, len(ring))
+        assert reader.ring("XAUUSD", "M1").snapshot(3)["close"].tolist() == [2.0, 3.0, 4.0]
+        reader.close()
+
+    def test_writer_restart_reuses_or_retires_segments(self, writer, prefix):
+        _fill(writer, 5)
+        reader = SharedCandleStore(writer=False, prefix=prefix)
+        assert len(reader.ring("XAUUSD", "M1")) == 5
+
+        same = SharedCandleStore(writer=True, capacity=16, prefix=prefix)
+        assert len(same.ring("XAUUSD", "M1")) == 5  # reattached, data kept
+        same.close()
+
+        bigger = SharedCandleStore(writer=True, capacity=32, prefix=prefix)
+        _fill(bigger, 2)
+        # the reader notices its segment was retired and attaches the new one
+        ring = reader.ring("XAUUSD", "M1")
+        assert ring.capacity == 32 and len(ring) == 2
+        reader.close()
+        bigger.unlink_all()
+
+
+@pytest.mark.unit
+def test_missing_pairs_are_not_reopened_until_the_ttl(writer, prefix, monkeypatch):
+    from app.market_data import shared_candles as shm_mod
+
+    opens = []
+    real_open = shm_mod._open
+    monkeypatch.setattr(shm_mod, "_open", lambda name, create, size=0: opens.append(name) or real_open(name, create, size))
+    reader = SharedCandleStore(writer=False, prefix=prefix, miss_ttl=60)
+
+    for _ in range(100):
+        assert ("XAUUSD", "M1") not in reader
+    assert len(opens) == 1
+
+    _fill(writer, 3)
+    del opens[:]
+    reader._missing.clear()  # as if the ttl had passed
+    assert reader.last("XAUUSD", "M1", 3)["close"].tolist() == [0.0, 1.0, 2.0]
+    assert reader.last("XAUUSD", "M1", 3) is not None and len(opens) == 1
+    reader.close()
@@ -0,0 +1,82 @@
+"""
+Unit Tests for bridge request coalescing
+Identical concurrent reads share one MT5 call; orders never do
+"""
+import asyncio
+
+import pytest
+
+from app.mt5.connector import MT5Connector
+from app.mt5.singleflight import SingleFlight
+
+
+class SlowBridge:
+    def __init__(self):
+        self.calls = []
+        self.release = asyncio.Event()
+
+    async def __call__(self, payload, *, timeout_ms=2000):
+        self.calls.append(payload)
+        await self.release.wait()
+        return {"ok": True, "echo": payload}
+
+
+@pytest.fixture
+def connector(monkeypatch):
+    conn = MT5Connector()
+    bridge = SlowBridge()
+    monkeypatch.setattr(conn, "_call", bridge)
+    return conn, bridge
+
+
+@pytest.mark.unit
+class TestSingleFlight:
+
+    async def test_concurrent_identical_reads_share_one_call(self, connector):
+        conn, bridge = connector
+        viewers = [asyncio.create_task(conn.get_rates("XAUUSD", "M5", 300)) for _ in range(50)]
+        viewers += [asyncio.create_task(conn.get_positions()) for _ in range(20)]
+        other = asyncio.create_task(conn.get_rates("EURUSD", "M5", 300))
+        await asyncio.sleep(0)
+        bridge.release.set()
+        results = await asyncio.gather(*viewers, other)
+
+        assert len(bridge.calls) == 3  # distinct queries, not viewers
+        assert results[0] is results[49] and results[0]["echo"]["symbol"] == "XAUUSD"
+        assert results[-1]["echo"]["symbol"] == "EURUSD"
+        assert conn.reads.stats == {"calls": 3, "shared": 68, "cached": 0}
+
+        # once settled, the next read goes to the bridge again (no ttl)
+        await conn.get_positions()
+        assert len(bridge.calls) == 4
+
+    async def test_orders_are_never_coalesced(self, connector):
+        conn, bridge = connector
+        bridge.release.set()
+        await asyncio.gather(*(conn.send_order("XAUUSD", "BUY", 0.1, None, None) for _ in range(3)))
+        assert len(bridge.calls) == 3
+
+    async def test_ttl_keeps_successes_only(self):
+        n = {"calls": 0}
+
+        async def reply(value):
+            n["calls"] += 1
+            return value
+
+        flight = SingleFlight(ttl_ms=60_000, cacheable=lambda r: "error" not in r)
+        assert await flight.do("k", lambda: reply({"error": "timeout"})) == {"error": "timeout"}
+        assert await flight.do("k", lambda: reply({"ok": 1})) == {"ok": 1}
+        assert await flight.do("k", lambda: reply({"ok": 2})) == {"ok": 1}
+        assert n["calls"] == 2 and flight.stats["cached"] == 1
+
+    async def test_cancelled_waiter_does_not_cancel_the_shared_call(self, connector):
+        conn, bridge = connector
+        first = asyncio.create_task(conn.get_positions())
+        second = asyncio.create_task(conn.get_positions())
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        bridge.release.set()
+
+        assert (await second)["ok"] is True
+        assert first.cancelled() and len(bridge.calls) == 1
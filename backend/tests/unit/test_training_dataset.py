@@ -0,0 +1,65 @@
+"""
+Unit Tests for training dataset helpers
+Strided sequence builders must match the original loop-based construction
+"""
+import numpy as np
+import pytest
+
+from app.ai.training.dataset import return_sequences, sliding_windows, threshold_labels
+
+
+def _loop_return_sequences(ret, window, thr=0.0008):
+    X, y = [], []
+    for i in range(window, len(ret) - 1):
+        X.append(ret[i - window:i])
+        r = ret[i + 1]
+        y.append(2 if r > thr else (0 if r < -thr else 1))
+    return np.array(X), np.array(y)
+
+
+@pytest.mark.unit
+@pytest.mark.ai
+class TestSequenceBuilders:
+
+    def test_return_sequences_matches_loop(self):
+        ret = (np.random.default_rng(1).normal(0, 0.001, 2000)).astype("float32")
+        X, y = return_sequences(ret, 64)
+        X_ref, y_ref = _loop_return_sequences(ret, 64)
+
+        assert np.array_equal(X, X_ref)
+        assert np.array_equal(y, y_ref)
+
+    def test_return_sequences_is_a_view(self):
+        ret = np.zeros(1000, dtype="float32")
+        X, _ = return_sequences(ret, 64)
+        assert np.shares_memory(X, ret)
+
+    def test_return_sequences_short_input(self):
+        X, y = return_sequences(np.zeros(10, dtype="float32"), 64)
+        assert len(X) == 0 and len(y) == 0
+
+    def test_sliding_windows_multifeature_shape(self):
+        data = np.arange(100 * 5, dtype=float).reshape(100, 5)
+        w = sliding_windows(data, 10)
+        assert w.shape == (91, 10, 5)
+        assert np.array_equal(w[3], data[3:13])
+
+    def test_threshold_labels(self):
+        r = np.array([0.01, -0.01, 0.0, 0.0008, -0.0009])
+        assert threshold_labels(r, 0.0008).tolist() == [2, 0, 1, 1, 0]
+
+    def test_lstm_model_create_sequences_matches_loop(self):
+        from app.ai.lstm_model import LSTMModel
+
+        model = LSTMModel(sequence_length=10, n_features=5)
+        data = np.random.default_rng(2).normal(0, 0.002, (200, 5))
+        X, y = model.create_sequences(data)
+
+        X_ref, y_ref = [], []
+        for i in range(len(data) - 10):
+            X_ref.append(data[i:i + 10])
+            f = data[i + 10][0]
+            y_ref.append([1, 0, 0] if f > 0.001 else ([0, 1, 0] if f < -0.001 else [0, 0, 1]))
+
+        assert np.array_equal(X, np.array(X_ref))
+        assert np.array_equal(y, np.array(y_ref))
@@ -0,0 +1,108 @@
+"""
+Unit Tests for incremental (warm-start) boosted retraining
+"""
+import types
+
+import pandas as pd
+import pytest
+
+from app.ai.training import incremental
+from tests.factories import candles_df
+
+
+@pytest.fixture
+def artifact_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(incremental, "ARTIFACT_DIR", str(tmp_path))
+    return tmp_path
+
+
+@pytest.mark.unit
+@pytest.mark.ai
+@pytest.mark.parametrize("model_type", ["xgboost", "lightgbm"])
+class TestFitBoosted:
+
+    def test_incremental_continues_previous_booster(self, artifact_dir, model_type):
+        pytest.importorskip(model_type)
+        df = candles_df(2000)
+
+        full = incremental.fit_boosted(model_type, df.iloc[:1500].reset_index(drop=True), "XAUUSD", "M15")
+        assert full["ok"] and full["activated"]
+        assert full["metrics"]["mode"] == "full"
+
+        inc = incremental.fit_boosted(
+            model_type, df, "XAUUSD", "M15",
+            mode="incremental",
+            since=full["metrics"]["trained_through"],
+            prev_artifact=full["artifact"],
+            rounds=5,
+            tolerance=1.0,
+        )
+        assert inc["ok"] and inc["metrics"]["mode"] == "incremental"
+        # only bars after the previous cut are used
+        assert inc["metrics"]["samples"] < 700
+        assert inc["metrics"]["rounds_since_full"] == 1
+        assert inc["metrics"]["holdout"]["prev_logloss"] is not None
+
+    def test_rejected_candidate_keeps_artifact(self, artifact_dir, model_type):
+        pytest.importorskip(model_type)
+        df = candles_df(2000, seed=3)
+        full = incremental.fit_boosted(model_type, df.iloc[:1500].reset_index(drop=True), "XAUUSD", "M15")
+        before = open(full["artifact"], "rb").read()
+
+        inc = incremental.fit_boosted(
+            model_type, df, "XAUUSD", "M15",
+            mode="incremental",
+            since=full["metrics"]["trained_through"],
+            prev_artifact=full["artifact"],
+            rounds=5,
+            tolerance=-1.0,  # nothing can pass
+        )
+        assert inc["ok"] and not inc["activated"]
+        assert inc["artifact"] is None
+        assert open(full["artifact"], "rb").read() == before
+
+    def test_full_refit_is_judged_on_bars_the_previous_model_never_saw(self, artifact_dir, model_type):
+        pytest.importorskip(model_type)
+        df = candles_df(2000, seed=5)
+        first = incremental.fit_boosted(model_type, df.iloc[:1500].reset_index(drop=True), "XAUUSD", "M15")
+        since = first["metrics"]["trained_through"]
+        unseen = int((df["time"] > pd.Timestamp(since)).sum()) - incremental.LABEL_HORIZON
+
+        refit = incremental.fit_boosted(model_type, df, "XAUUSD", "M15", mode="full",
+                                        since=since, prev_artifact=first["artifact"], tolerance=1.0)
+        assert refit["ok"] and refit["metrics"]["mode"] == "full"
+        assert 0 < refit["metrics"]["holdout"]["bars"] <= unseen
+        assert refit["metrics"]["holdout"]["prev_logloss"] is not None
+
+        # nothing new since the previous model: no fair comparison, no refit
+        again = incremental.fit_boosted(model_type, df, "XAUUSD", "M15", mode="full",
+                                        since=df["time"].iloc[-1].isoformat(), prev_artifact=refit["artifact"])
+        assert again["skipped"] and again["reason"] == "not_enough_new_bars"
+
+    def test_falls_back_to_full_without_previous_model(self, artifact_dir, model_type):
+        pytest.importorskip(model_type)
+        res = incremental.fit_boosted(model_type, candles_df(1200), "XAUUSD", "M15",
+                                      mode="incremental", since="2024-01-05T00:00:00")
+        assert res["ok"] and res["metrics"]["mode"] == "full"
+
+
+@pytest.mark.unit
+def test_boosted_run_status():
+    assert incremental.boosted_run_status({"ok": False}) == "failed"
+    assert incremental.boosted_run_status({"ok": True, "skipped": True}) == "skipped"
+    assert incremental.boosted_run_status({"ok": True, "activated": False}) == "rejected"
+    assert incremental.boosted_run_status({"ok": True, "activated": True}) == "success"
+
+
+@pytest.mark.unit
+def test_rejected_full_refit_restarts_the_count():
+    def run(status, mode):
+        return types.SimpleNamespace(status=status, metrics={"mode": mode})
+
+    newest_first = [run("success", "incremental"), run("rejected", "incremental"),
+                    run("success", "incremental"), run("rejected", "full"),
+                    run("success", "incremental"), run("success", "incremental")]
+    assert incremental.count_rounds_since_full(newest_first, fallback=6) == 2
+    assert incremental.count_rounds_since_full([run("success", "full")], fallback=6) == 0
+    # no full attempt in the window: the active artifact's counter stands
+    assert incremental.count_rounds_since_full(newest_first[:3], fallback=6) == 6
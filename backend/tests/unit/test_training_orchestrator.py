@@ -0,0 +1,50 @@
+"""
+Unit Tests for the universe training orchestrator
+"""
+import os
+import time
+
+import pytest
+
+from app.ai.training.orchestrator import MODEL_TYPES, _run_job, plan_jobs
+from app.ai.training.workers import WorkerFailed, WorkerTimeout, run_isolated
+from app.scanner.universe import DEFAULT_UNIVERSE
+
+
+@pytest.mark.unit
+@pytest.mark.ai
+class TestTrainingOrchestrator:
+
+    def test_plan_covers_whole_universe(self):
+        jobs = plan_jobs(DEFAULT_UNIVERSE)
+        n_pairs = len(DEFAULT_UNIVERSE["symbols"]) * len(DEFAULT_UNIVERSE["timeframes"])
+
+        assert n_pairs >= 18
+        assert len(jobs) == n_pairs * len(MODEL_TYPES)
+        assert len(set(jobs)) == len(jobs)
+
+    def test_plan_respects_model_types(self):
+        jobs = plan_jobs(DEFAULT_UNIVERSE, model_types=("xgboost",))
+        assert {mt for _, _, mt in jobs} == {"xgboost"}
+
+    def test_run_job_reports_failures_instead_of_raising(self):
+        import pandas as pd
+
+        res = _run_job("xgboost", "XAUUSD", "M15", pd.DataFrame(), threads=1)
+        assert res["ok"] is False
+        assert res["reason"] == "not_enough_data"
+        assert "fit_s" in res and "pid" in res
+
+        res = _run_job("prophet", "XAUUSD", "M15", pd.DataFrame(), threads=1)
+        assert res["ok"] is False
+
+    def test_isolated_job_runs_in_its_own_process(self):
+        assert run_isolated(os.getpid) != os.getpid()
+        with pytest.raises(WorkerFailed, match="ZeroDivisionError"):
+            run_isolated(divmod, (1, 0))
+
+    def test_timeout_kills_the_job(self):
+        t0 = time.perf_counter()
+        with pytest.raises(WorkerTimeout):
+            run_isolated(time.sleep, (30,), timeout_s=2)
+        assert time.perf_counter() - t0 < 10
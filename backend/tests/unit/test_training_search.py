@@ -0,0 +1,57 @@
+"""
+Unit Tests for the boosted-model hyperparameter search
+"""
+import numpy as np
+import pytest
+
+from app.ai.training import search
+from tests.factories import candles_df
+
+
+@pytest.mark.unit
+class TestPurgedFolds:
+
+    def test_validation_blocks_are_contiguous_and_ordered(self):
+        folds = list(search.purged_folds(1000, n_splits=4, purge=5, embargo=0, min_train=10))
+        assert len(folds) == 4
+        starts = [va[0] for _, va in folds]
+        assert starts == sorted(starts)
+        for _, va in folds:
+            assert np.array_equal(va, np.arange(va[0], va[-1] + 1))
+
+    def test_purge_and_embargo_are_dropped_from_train(self):
+        for tr, va in search.purged_folds(1000, n_splits=4, purge=5, embargo=10, min_train=10):
+            v0, v1 = va[0], va[-1] + 1
+            assert not np.isin(np.arange(v0 - 5, v1 + 10), tr).any()
+            assert np.isin(np.arange(0, v0 - 5), tr).all()
+
+    def test_scoring_rows_are_not_the_early_stopping_rows(self):
+        va = np.arange(300, 600)
+        stop, score = search.split_validation(va, stop_frac=1 / 3, gap=5)
+        assert stop[0] == 300 and stop[-1] < score[0] - 5
+        assert score[-1] == 599 and not np.isin(stop, score).any()
+
+    def test_sample_params_unique_and_default_first(self):
+        trials = search.sample_params("xgboost", 8, seed=1)
+        assert len(trials) == 8
+        assert trials[0]["max_depth"] == 6 and trials[0]["learning_rate"] == 0.1
+        assert len({tuple(sorted(t.items())) for t in trials}) == 8
+
+
+@pytest.mark.unit
+@pytest.mark.ai
+@pytest.mark.parametrize("model_type", ["xgboost", "lightgbm"])
+def test_search_registers_best_config(tmp_path, monkeypatch, model_type):
+    pytest.importorskip(model_type)
+    monkeypatch.setattr(search, "ARTIFACT_DIR", str(tmp_path))
+
+    res = search.search_hyperparams(
+        model_type, candles_df(1500), "XAUUSD", "M15",
+        n_trials=3, n_splits=3, max_workers=1, threads_per_trial=1, max_rounds=200, early_stopping=10,
+    )
+    assert res["ok"], res
+    s = res["metrics"]["search"]
+    assert s["trials_ok"] == 3 and s["folds"] == 3
+    assert 1 <= s["n_estimators"] <= 200
+    assert s["leaderboard"][0]["cv_logloss"] == s["cv_logloss"]
+    assert res["metrics"]["trained_through"]